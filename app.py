@@ -1,10 +1,35 @@
-from flask import Flask, render_template, request, redirect, url_for, flash
+from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, abort, Response, stream_with_context, g, has_request_context, send_file
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager, login_user, logout_user, login_required, UserMixin, current_user
 from werkzeug.security import generate_password_hash, check_password_hash
+from markupsafe import Markup
 from flask_migrate import Migrate
+from sqlalchemy import event as sa_event, inspect as sa_inspect
+from sqlalchemy.exc import IntegrityError
+from scheduling import EventIndex, Recurrence, FREQUENCIES, merge_intervals, free_slots
+from caching import TTLCache
+from search import ENTITIES as SEARCH_ENTITIES, search_index_for
+from geo import ZipCentroids, LocationIndex
+from collections import namedtuple
+from pagination import keyset_paginate, KeysetPage, encode_cursor, decode_cursor
+import querywatch
+from querywatch import RequestQueries, query_profile, profile_for
+import ical
+from exports import csv_chunks, xlsx_chunks, gzip_chunks
+from jobs import ReportJobs, REPORTS as REPORT_JOB_TYPES, normalize_spec as normalize_report_spec
+from werkzeug.http import is_resource_modified
+import heapq
+from itertools import islice
 import os
-from datetime import date, datetime
+import time as time_module
+import csv
+import io
+import json
+import hashlib
+import secrets
+import click
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from datetime import date, datetime, time, timedelta, timezone
 
 app = Flask(__name__)
 app.config["SECRET_KEY"] = os.environ.get("SECRET_KEY", "dev-key")
@@ -21,6 +46,22 @@ app.config["SQLALCHEMY_DATABASE_URI"] = os.getenv(
 )
 
 app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+app.config["EVENT_IMPORT_BATCH_SIZE"] = int(os.getenv("EVENT_IMPORT_BATCH_SIZE", 1000))
+app.config["EXPORT_BATCH_SIZE"] = int(os.getenv("EXPORT_BATCH_SIZE", 1000))  # rows fetched per cursor round trip
+app.config["DASHBOARD_CACHE_TTL"] = int(os.getenv("DASHBOARD_CACHE_TTL", 30))  # seconds
+app.config["ACCESS_CACHE_TTL"] = int(os.getenv("ACCESS_CACHE_TTL", 60))  # seconds; entries are version-checked, this only bounds memory
+app.config["PROJECT_DETAIL_CACHE_TTL"] = int(os.getenv("PROJECT_DETAIL_CACHE_TTL", 60))  # seconds; occurrence windows move with time
+app.config["REMINDER_LEAD_MINUTES"] = int(os.getenv("REMINDER_LEAD_MINUTES", 24 * 60))
+app.config["REMINDER_HORIZON_MINUTES"] = int(os.getenv("REMINDER_HORIZON_MINUTES", 6 * 60))
+app.config["REMINDER_BATCH_SIZE"] = int(os.getenv("REMINDER_BATCH_SIZE", 200))
+app.config["FREEBUSY_DEFAULT_MINUTES"] = int(os.getenv("FREEBUSY_DEFAULT_MINUTES", 60))  # events without an end
+app.config["DEFAULT_TIMEZONE"] = os.getenv("DEFAULT_TIMEZONE", "America/New_York")  # users/events without a zone
+app.config["FISCAL_YEAR_START_MONTH"] = int(os.getenv("FISCAL_YEAR_START_MONTH", 1))  # 7 = fiscal year runs July-June
+app.config["REPORT_JOBS_DIR"] = os.getenv("REPORT_JOBS_DIR", os.path.join(app.instance_path, "report_jobs"))
+app.config["REPORT_JOB_WORKERS"] = int(os.getenv("REPORT_JOB_WORKERS", 2))  # worker processes per web process
+app.config["QUERY_WATCH"] = os.getenv("QUERY_WATCH", "0") == "1"  # always on in debug and testing
+app.config["ZIP_CENTROIDS_PATH"] = os.getenv(  # CSV/TSV of ZIP, latitude, longitude; the bundled file is a small seed
+    "ZIP_CENTROIDS_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "zip_centroids.csv"))
 
 
 db = SQLAlchemy(app)
@@ -28,6 +69,72 @@ login_manager = LoginManager(app)
 login_manager.login_view = "index"
 migrate = Migrate(app, db)
 
+# ---- Time zones ----
+# Events keep the wall-clock start/end they were entered with plus the zone of that wall clock;
+# start_utc/end_utc (epoch seconds) are derived from them and used for every range query and
+# comparison. Viewers' display zones are applied only when rendering.
+TIMEZONE_CHOICES = (
+    "America/New_York", "America/Chicago", "America/Denver", "America/Phoenix",
+    "America/Los_Angeles", "America/Anchorage", "Pacific/Honolulu", "UTC",
+    "Europe/London", "Europe/Berlin", "Asia/Kolkata", "Asia/Tokyo", "Australia/Sydney",
+)
+# Largest distance between a wall clock and UTC, for prefilters on wall-clock columns
+TZ_SLACK = timedelta(hours=14)
+
+def is_valid_timezone(name):
+    if not name:
+        return False
+    try:
+        ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        return False
+    return True
+
+def get_zone(name):
+    """ZoneInfo for an IANA name, falling back to the default zone"""
+    return ZoneInfo(name if is_valid_timezone(name) else app.config["DEFAULT_TIMEZONE"])
+
+def to_epoch(local, tzname):
+    """Epoch seconds of a naive wall-clock time in the given zone (None passes through)"""
+    if local is None:
+        return None
+    return int(local.replace(tzinfo=get_zone(tzname)).timestamp())
+
+def from_epoch(ts, tzname):
+    """Naive wall-clock time in the given zone for epoch seconds"""
+    return datetime.fromtimestamp(ts, get_zone(tzname)).replace(tzinfo=None)
+
+def to_local(moment, tzname):
+    """Naive wall-clock time in the given zone for an aware datetime"""
+    return moment.astimezone(get_zone(tzname)).replace(tzinfo=None)
+
+def utc_moment(ts):
+    return datetime.fromtimestamp(ts, timezone.utc)
+
+def utc_now():
+    return datetime.now(timezone.utc)
+
+def display_timezone():
+    """Zone the current user reads times in"""
+    if current_user and current_user.is_authenticated and is_valid_timezone(current_user.timezone):
+        return current_user.timezone
+    return app.config["DEFAULT_TIMEZONE"]
+
+def form_datetime(value, tzname):
+    """A datetime-local form value, typed in the viewer's zone, as wall-clock time in tzname"""
+    value = (value or "").strip()
+    if not value:
+        return None
+    entered = datetime.fromisoformat(value)
+    if entered.tzinfo is None:
+        entered = entered.replace(tzinfo=get_zone(display_timezone()))
+    return to_local(entered, tzname)
+
+@app.template_filter("localtime")
+def localtime_filter(ts):
+    """Epoch seconds as a naive datetime in the viewer's display zone"""
+    return from_epoch(ts, display_timezone()) if ts is not None else None
+
 #Models
 class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -35,6 +142,8 @@ class User(UserMixin, db.Model):
     name = db.Column(db.String(120), nullable=False)
     password_hash = db.Column(db.String(255), nullable=False)
     role = db.Column(db.String(20), default='client', nullable=False)  # changes: Added role field ('client' or 'employee')
+    calendar_token = db.Column(db.String(64), unique=True, index=True)  # secret for .ics subscription URLs
+    timezone = db.Column(db.String(64))  # IANA display zone, None = DEFAULT_TIMEZONE
 
     def set_password(self, password):
         self.password_hash = generate_password_hash(password)
@@ -42,6 +151,15 @@ class User(UserMixin, db.Model):
     def check_password(self, password):
         return check_password_hash(self.password_hash, password)
 
+    def reset_calendar_token(self):
+        self.calendar_token = secrets.token_urlsafe(32)
+
+    __table_args__ = (
+        # (sort column, id) indexes serve each keyset-paged sort of the user list
+        db.Index('ix_user_name_id', 'name', 'id'),
+        db.Index('ix_user_role_name_id', 'role', 'name', 'id'),
+    )
+
 class Client(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(120), nullable=False)
@@ -53,6 +171,12 @@ class Client(db.Model):
     state = db.Column(db.String(20))
     zip = db.Column(db.String(20))
 
+    __table_args__ = (
+        db.Index('ix_client_name_id', 'name', 'id'),
+        db.Index('ix_client_city_id', 'city', 'id'),
+        db.Index('ix_client_state_id', 'state', 'id'),
+    )
+
 class Building(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(120), nullable=False)
@@ -61,12 +185,21 @@ class Building(db.Model):
     state = db.Column(db.String(20))
     zip = db.Column(db.String(20))
     notes = db.Column(db.Text)
+    latitude = db.Column(db.Float)  # ZIP centroid, set from `zip` on every ORM write
+    longitude = db.Column(db.Float)
+
+    __table_args__ = (
+        db.Index('ix_building_name_id', 'name', 'id'),
+        db.Index('ix_building_city_id', 'city', 'id'),
+        db.Index('ix_building_state_id', 'state', 'id'),
+        db.Index('ix_building_latitude_longitude', 'latitude', 'longitude'),
+    )
 
 class Project(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(120), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    client_id = db.Column(db.Integer, db.ForeignKey("client.id"))
+    client_id = db.Column(db.Integer, db.ForeignKey("client.id"), index=True)
     building_id = db.Column(db.Integer, db.ForeignKey("building.id"))  # NEW
     description = db.Column(db.Text)
     status = db.Column(db.String(50), default="Planned")
@@ -74,6 +207,12 @@ class Project(db.Model):
     client = db.relationship("Client", backref="projects")
     building = db.relationship("Building", backref="projects")  # NEW
 
+    __table_args__ = (
+        db.Index('ix_project_name_id', 'name', 'id'),
+        db.Index('ix_project_due_date_id', 'due_date', 'id'),
+        db.Index('ix_project_status_id', 'status', 'id'),
+    )
+
 #  changes: New model to track which client users are assigned to which projects
 class ProjectAssignment(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -84,24 +223,127 @@ class ProjectAssignment(db.Model):
     project = db.relationship('Project', backref='assignments')
     user = db.relationship('User', backref='project_assignments')
 
+    # Covers the per-user semi-join that scopes every client-role query
+    __table_args__ = (db.Index('ix_project_assignment_user_project', 'user_id', 'project_id'),)
+
+#  New events longer than this are rejected on save, which gives range queries a lower bound on start_utc.
+#  Rows that span more anyway (saved before the limit, or by DST) are flagged long_running and scanned separately.
+MAX_EVENT_SPAN = timedelta(days=31)
+
 #Improved Event class:
 class Event(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(100), nullable=False)
     event_type = db.Column(db.String(50))  # e.g., 'Site Visit', 'Client Meeting'
-    start = db.Column(db.DateTime, nullable=False)
+    start = db.Column(db.DateTime, nullable=False)  # wall clock in `timezone`
     end = db.Column(db.DateTime)
+    timezone = db.Column(db.String(64), nullable=False, default=lambda: app.config["DEFAULT_TIMEZONE"])
+    start_utc = db.Column(db.BigInteger, nullable=False)  # epoch seconds, derived from start + timezone
+    end_utc = db.Column(db.BigInteger)
+    long_running = db.Column(db.Boolean, nullable=False, default=False)  # end_utc - start_utc > MAX_EVENT_SPAN
     status = db.Column(db.String(20), default='Upcoming')  # Upcoming / Completed / Cancelled
     notes = db.Column(db.Text)
     project_id = db.Column(db.Integer, db.ForeignKey('project.id'))
     project = db.relationship('Project', backref='events')
 
+    # Recurring series: start/end describe the first occurrence, the rest are expanded on read
+    recurrence_freq = db.Column(db.String(10))  # DAILY / WEEKLY / MONTHLY / YEARLY, None = one-off event
+    recurrence_interval = db.Column(db.Integer, default=1)
+    recurrence_until = db.Column(db.DateTime)
+    recurrence_count = db.Column(db.Integer)
+    recurrence_exdates = db.Column(db.Text)  # comma-separated starts of skipped occurrences
+    recurrence_end = db.Column(db.DateTime)  # end of the last occurrence, None = open-ended
+    # Single-occurrence override: this row replaces the occurrence of series_id at original_start
+    series_id = db.Column(db.Integer, db.ForeignKey('event.id'), index=True)
+    original_start = db.Column(db.DateTime)
+
+    is_occurrence = False
+
+    __table_args__ = (
+        db.Index('ix_event_utc_range', 'start_utc', 'end_utc'),
+        db.Index('ix_event_start_utc_id', 'start_utc', 'id'),  # keyset pagination of the card view
+        db.Index('ix_event_project_start_utc', 'project_id', 'start_utc'),
+        db.Index('ix_event_series_range', 'recurrence_freq', 'start_utc', 'recurrence_end'),
+        db.Index('ix_event_long_running', 'long_running', 'start_utc'),
+    )
+
+    @property
+    def is_recurring(self):
+        return self.recurrence_freq is not None
+
+    @property
+    def duration(self):
+        return self.end - self.start if self.end else timedelta(0)
+
+    @property
+    def exdates(self):
+        if not self.recurrence_exdates:
+            return []
+        return [datetime.fromisoformat(d) for d in self.recurrence_exdates.split(",")]
+
+    @property
+    def recurrence(self):
+        return Recurrence(self.start, self.recurrence_freq, self.recurrence_interval,
+                          self.recurrence_until, self.recurrence_count, self.exdates)
+
+    def add_exdate(self, occurrence_start):
+        dates = sorted(set(self.exdates) | {occurrence_start})
+        self.recurrence_exdates = ",".join(d.isoformat() for d in dates)
+
+    def refresh_recurrence_end(self):
+        last = self.recurrence.last_start() if self.is_recurring else None
+        self.recurrence_end = last + self.duration if last else None
+
+@sa_event.listens_for(Event, "before_insert")
+@sa_event.listens_for(Event, "before_update")
+def set_event_epochs(mapper, connection, target):
+    """Keep start_utc/end_utc in step with the wall-clock columns on every ORM write"""
+    target.timezone = target.timezone or app.config["DEFAULT_TIMEZONE"]
+    target.start_utc = to_epoch(target.start, target.timezone)
+    target.end_utc = to_epoch(target.end, target.timezone)
+    target.long_running = is_long_running(target.start_utc, target.end_utc)
+
+def is_long_running(start_utc, end_utc):
+    return end_utc is not None and end_utc - start_utc > MAX_EVENT_SPAN.total_seconds()
+
+def in_reach(query, start_ts, end_ts):
+    """query limited to events starting before end_ts that may still be running at start_ts.
+
+    A UNION ALL of two index ranges: unflagged events starting at most MAX_EVENT_SPAN before
+    start_ts, and the few flagged long_running, so no branch scans every earlier event.
+    """
+    bounded = query.filter(Event.long_running.is_(False), Event.start_utc < end_ts,
+                           Event.start_utc >= start_ts - MAX_EVENT_SPAN.total_seconds())
+    return bounded.union_all(query.filter(Event.long_running.is_(True), Event.start_utc < end_ts))
+
+class Occurrence:
+    """One expanded instance of a recurring Event series; never written to the database"""
+    is_occurrence = True
+
+    def __init__(self, series, start):
+        self.series = series
+        self.start = start
+        self.end = start + series.duration if series.end else None
+        self.start_utc = to_epoch(self.start, series.timezone)
+        self.end_utc = to_epoch(self.end, series.timezone)
+
+    def __getattr__(self, name):
+        return getattr(self.series, name)
+
+
+#  Change counter per calendar scope, bumped on every write that alters a feed.
+#  'project:N' also versions the project's detail page, so assignments and time entries bump it too.
+#  'reports' versions the data background report jobs read (time entries, employee and project names).
+class ScopeVersion(db.Model):
+    scope = db.Column(db.String(40), primary_key=True)  # 'events', 'project:3', 'building:2', 'user:5', 'reports'
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
 
 class TimeEntry(db.Model):
     __tablename__ = 'time_entry'
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'))
-    project_id = db.Column(db.Integer, db.ForeignKey('project.id'))
+    project_id = db.Column(db.Integer, db.ForeignKey('project.id'), index=True)
     hours = db.Column(db.Float, nullable=False)
     description = db.Column(db.String(255))
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
@@ -127,6 +369,56 @@ def employee_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
+#  Project access for client users: the assigned project ids, memoized per request and cached across
+#  requests as (user:N version, ids). Every assignment write bumps that version, so an entry is only used
+#  while it is current in every process; commits in this process also drop the entry right away.
+access_cache = TTLCache(ttl=app.config["ACCESS_CACHE_TTL"])
+
+def accessible_project_ids(user=None, version=None):
+    """frozenset of the project ids a client user (default: current user) is assigned to.
+
+    `version` is the user's scope counter when the caller has just read it.
+    """
+    user = user or current_user
+    memo = g.setdefault("accessible_projects", {}) if has_request_context() else {}
+    if user.id not in memo:
+        if version is None:
+            version, = scope_versions((f"user:{user.id}",))
+        cached = access_cache.get(user.id)
+        if cached is not None and cached[0] == version:
+            ids = cached[1]
+        else:
+            ids = frozenset(db.session.execute(
+                db.select(ProjectAssignment.project_id).where(ProjectAssignment.user_id == user.id)).scalars())
+            access_cache.set(user.id, (version, ids))
+        memo[user.id] = ids
+    return memo[user.id]
+
+def assigned_projects(user=None):
+    """Semi-join SELECT of a client user's project ids, for column.in_() filters"""
+    user = user or current_user
+    return db.select(ProjectAssignment.project_id).where(ProjectAssignment.user_id == user.id)
+
+@sa_event.listens_for(db.session, "after_flush")
+def collect_access_changes(session, flush_context):
+    for obj in session.new | session.dirty | session.deleted:
+        if isinstance(obj, ProjectAssignment):
+            session.info.setdefault("access_pending", set()).update(_history_values(obj, "user_id"))
+
+@sa_event.listens_for(db.session, "after_commit")
+def apply_access_changes(session):
+    user_ids = session.info.pop("access_pending", None)
+    if not user_ids:
+        return
+    memo = g.get("accessible_projects", {}) if has_request_context() else {}
+    for user_id in user_ids:
+        access_cache.pop(user_id)
+        memo.pop(user_id, None)
+
+@sa_event.listens_for(db.session, "after_soft_rollback")
+def discard_access_changes(session, previous_transaction):
+    session.info.pop("access_pending", None)
+
 def get_user_projects():
     """Get projects accessible to current user based on role"""
     if current_user.role == 'employee':
@@ -134,8 +426,433 @@ def get_user_projects():
         return Project.query.all()
     else:
         # Clients only see assigned projects
-        assigned_project_ids = [pa.project_id for pa in current_user.project_assignments]
-        return Project.query.filter(Project.id.in_(assigned_project_ids)).all() if assigned_project_ids else []
+        if not accessible_project_ids():
+            return []
+        return Project.query.filter(Project.id.in_(assigned_projects())).all()
+
+#  Query watch: statements and lazy loads per request, checked against each route's query_profile budget
+def watched_queries():
+    return g.get("queries") if has_request_context() else None
+
+querywatch.install(db.session, watched_queries)
+
+def query_watch_enabled():
+    return app.debug or app.testing or app.config["QUERY_WATCH"]
+
+@app.before_request
+def start_query_watch():
+    if query_watch_enabled():
+        g.queries = RequestQueries()
+
+@app.after_request
+def check_query_budget(response):
+    watched = g.pop("queries", None)
+    if watched is None:
+        return response
+    response.headers["X-Query-Count"] = str(watched.statements)
+    if watched.repeated_lazy_loads():
+        app.logger.warning("N+1 in %s %s: %s", request.method, request.path, watched.summary())
+    profile = profile_for(request.endpoint)
+    if profile and profile.budget is not None:
+        response.headers["X-Query-Budget"] = str(profile.budget)
+        if watched.statements > profile.budget:
+            # By now the response is built and any writes are committed, so overspending is reported, never raised
+            app.logger.warning("%s went over its query budget of %s: %s",
+                               request.endpoint, profile.budget, watched.summary())
+    return response
+
+def with_load_profile(query):
+    """Apply the current view's declared eager loading to a list query"""
+    profile = profile_for(request.endpoint)
+    return query.options(*profile.options) if profile and profile.options else query
+
+#  Event overlap index: one interval tree per project, kept in sync on commit. Writes made by other
+#  processes reach it through the 'events' scope version: this process's own commits advance the
+#  index's copy of the counter, so any other difference means it has to reload.
+event_index = EventIndex()
+
+def ensure_event_index():
+    """Load the overlap index on first use, and again whenever another process has written events"""
+    version, = scope_versions(("events",))
+    if not event_index.loaded or event_index.version != version:
+        # The counter is read before the rows, so a write landing in between only costs another reload
+        event_index.load(
+            db.session.query(Event.id, Event.project_id, Event.start_utc, Event.end_utc)
+            .filter(Event.recurrence_freq.is_(None))
+            .all(),
+            version,
+        )
+    return event_index
+
+@sa_event.listens_for(db.session, "after_flush")
+def collect_event_changes(session, flush_context):
+    pending = session.info.setdefault("event_index_pending", {})
+    for obj in session.new | session.dirty:
+        if isinstance(obj, Event):
+            # Recurring series are expanded on demand rather than indexed
+            pending[obj.id] = None if obj.is_recurring else (obj.project_id, obj.start_utc, obj.end_utc)
+    for obj in session.deleted:
+        if isinstance(obj, Event):
+            pending[obj.id] = None
+
+@sa_event.listens_for(db.session, "after_commit")
+def apply_event_changes(session):
+    pending = session.info.pop("event_index_pending", None)
+    bumps = session.info.pop("events_version_bumps", 0)
+    if not event_index.loaded:
+        return
+    for event_id, values in (pending or {}).items():
+        if values is None:
+            event_index.remove(event_id)
+        else:
+            event_index.upsert(event_id, *values)
+    event_index.advance(bumps)
+
+@sa_event.listens_for(db.session, "after_soft_rollback")
+def discard_event_changes(session, previous_transaction):
+    session.info.pop("event_index_pending", None)
+    session.info.pop("events_version_bumps", None)
+
+#  Building locations: offline ZIP-centroid geocoding and a KD-tree of located buildings, kept in sync on commit
+_zip_centroids = None
+building_locations = LocationIndex()
+
+def zip_centroids():
+    """The ZIP centroid table, read from ZIP_CENTROIDS_PATH on first use"""
+    global _zip_centroids
+    if _zip_centroids is None:
+        try:
+            _zip_centroids = ZipCentroids.from_csv(app.config["ZIP_CENTROIDS_PATH"])
+        except (OSError, ValueError) as exc:
+            app.logger.warning("ZIP centroids unavailable, buildings will not be located: %s", exc)
+            _zip_centroids = ZipCentroids()
+    return _zip_centroids
+
+@sa_event.listens_for(Building, "before_insert")
+@sa_event.listens_for(Building, "before_update")
+def locate_building(mapper, connection, target):
+    """Place the building at its ZIP's centroid whenever the ZIP is set or changed"""
+    if target.id is None or sa_inspect(target).attrs.zip.history.has_changes():
+        target.latitude, target.longitude = zip_centroids().locate(target.zip) or (None, None)
+        if target.zip and target.latitude is None:
+            app.logger.warning("Building %r: ZIP code %r is not in the ZIP centroid file; it will not be located",
+                               target.name, target.zip)
+
+def ensure_building_locations():
+    """Load the location index on first use; later writes update it incrementally"""
+    if not building_locations.loaded:
+        building_locations.load(db.session.query(Building.id, Building.latitude, Building.longitude).all())
+    return building_locations
+
+def flash_if_unlocated(building):
+    """Tell the editor when a saved building was left out of nearby searches"""
+    if building.latitude is None:
+        reason = f"ZIP code '{building.zip}' could not be located" if building.zip else "it has no ZIP code"
+        flash(f"{building.name} will not appear in nearby searches: {reason}.", "warning")
+
+@sa_event.listens_for(db.session, "after_flush")
+def collect_building_locations(session, flush_context):
+    pending = session.info.setdefault("building_locations_pending", {})
+    for obj in session.new | session.dirty:
+        if isinstance(obj, Building):
+            pending[obj.id] = (obj.latitude, obj.longitude)
+    for obj in session.deleted:
+        if isinstance(obj, Building):
+            pending[obj.id] = (None, None)
+
+@sa_event.listens_for(db.session, "after_commit")
+def apply_building_locations(session):
+    pending = session.info.pop("building_locations_pending", None)
+    if not pending or not building_locations.loaded:
+        return
+    for building_id, (lat, lon) in pending.items():
+        building_locations.upsert(building_id, lat, lon)
+
+@sa_event.listens_for(db.session, "after_soft_rollback")
+def discard_building_locations(session, previous_transaction):
+    session.info.pop("building_locations_pending", None)
+
+def _history_values(obj, attr):
+    """Current and previous values of an attribute during a flush"""
+    history = sa_inspect(obj).attrs[attr].history
+    values = set(history.added) | set(history.deleted) | set(history.unchanged)
+    return {v for v in values if v is not None}
+
+def bump_scope_versions(connection, scopes):
+    """Increment the change counter of each scope in one statement, creating missing rows"""
+    table = ScopeVersion.__table__
+    now = datetime.utcnow()
+    scopes = sorted(scopes)
+    result = connection.execute(
+        table.update().where(table.c.scope.in_(scopes))
+        .values(version=table.c.version + 1, updated_at=now)
+    )
+    if result.rowcount < len(scopes):
+        existing = set(connection.execute(db.select(table.c.scope).where(table.c.scope.in_(scopes))).scalars())
+        connection.execute(table.insert(), [{"scope": scope, "version": 1, "updated_at": now}
+                                            for scope in scopes if scope not in existing])
+
+def scope_versions(scopes):
+    """Current counter of each scope, as a tuple in the order given (0 if never bumped)"""
+    versions = dict(db.session.query(ScopeVersion.scope, ScopeVersion.version)
+                    .filter(ScopeVersion.scope.in_(scopes)))
+    return tuple(versions.get(scope, 0) for scope in scopes)
+
+def scopes_for_projects(connection, project_ids):
+    """Feed scopes touched by a change to events of these projects"""
+    scopes = {"events"} | {f"project:{pid}" for pid in project_ids}
+    if project_ids:
+        buildings = connection.execute(
+            db.select(Project.building_id).where(Project.id.in_(project_ids), Project.building_id.isnot(None))
+        ).scalars()
+        scopes |= {f"building:{bid}" for bid in buildings}
+    return scopes
+
+REPORT_SOURCE_COLUMNS = {User: ("name", "email", "role"), Project: ("name",)}
+
+def _changes_report_data(session, obj):
+    """Whether a flushed object alters what background report jobs read"""
+    if isinstance(obj, TimeEntry):
+        return True
+    columns = REPORT_SOURCE_COLUMNS.get(type(obj))
+    if columns is None:
+        return False
+    if obj in session.new or obj in session.deleted:
+        return True
+    return any(sa_inspect(obj).attrs[name].history.has_changes() for name in columns)
+
+@sa_event.listens_for(db.session, "after_flush")
+def bump_calendar_versions(session, flush_context):
+    project_ids, scopes = set(), set()
+    for obj in session.new | session.dirty | session.deleted:
+        if _changes_report_data(session, obj):
+            scopes.add("reports")
+        if isinstance(obj, Event):
+            project_ids |= _history_values(obj, "project_id")
+            scopes.add("events")
+        elif isinstance(obj, Project):
+            project_ids.add(obj.id)
+            scopes |= {f"building:{bid}" for bid in _history_values(obj, "building_id")}
+        elif isinstance(obj, ProjectAssignment):
+            scopes |= {f"user:{uid}" for uid in _history_values(obj, "user_id")}
+            scopes |= {f"project:{pid}" for pid in _history_values(obj, "project_id")}
+        elif isinstance(obj, TimeEntry):
+            scopes |= {f"project:{pid}" for pid in _history_values(obj, "project_id")}
+    if project_ids:
+        scopes |= scopes_for_projects(session.connection(), project_ids)
+    if scopes:
+        bump_scope_versions(session.connection(), scopes)
+    if "events" in scopes:
+        # Counted so the overlap index can tell this process's event writes from other processes'
+        session.info["events_version_bumps"] = session.info.get("events_version_bumps", 0) + 1
+
+#  Full-text search: one document per client/building/project/event/user, rewritten in the same transaction
+SEARCHABLE = {Client: "client", Building: "building", Project: "project", Event: "event", User: "user"}
+SEARCH_BATCH_SIZE = 1000
+
+def search_index():
+    return search_index_for(db.session.get_bind().dialect.name)
+
+def _search_text(*values):
+    return " ".join(str(v) for v in values if v)
+
+def search_documents(connection, entity, ids=None, after_id=None, limit=None):
+    """(entity, id, title, body) documents for rows of one entity type, in id order"""
+    if entity == "client":
+        stmt = db.select(Client.id, Client.name, Client.contact, Client.phone, Client.street,
+                         Client.city, Client.state, Client.zip)
+    elif entity == "building":
+        stmt = db.select(Building.id, Building.name, Building.street, Building.city, Building.state,
+                         Building.zip, Building.notes)
+    elif entity == "project":
+        # The client's name is indexed with the project, as the projects page searches it
+        stmt = (db.select(Project.id, Project.name, Project.description, Project.status, Client.name)
+                .outerjoin(Client, Client.id == Project.client_id))
+    elif entity == "event":
+        stmt = db.select(Event.id, Event.title, Event.event_type, Event.status, Event.notes)
+    else:
+        stmt = db.select(User.id, User.name, User.email)
+    id_column = stmt.selected_columns[0]
+    if ids is not None:
+        stmt = stmt.where(id_column.in_(ids))
+    if after_id is not None:
+        stmt = stmt.where(id_column > after_id)
+    stmt = stmt.order_by(id_column)
+    if limit:
+        stmt = stmt.limit(limit)
+    return [(entity, row[0], row[1], _search_text(*row[2:])) for row in connection.execute(stmt)]
+
+def reindex_search(connection, entity, after_id=None):
+    """(Re)index every row of an entity with id > after_id, one batch at a time"""
+    index = search_index_for(connection.dialect.name)
+    while True:
+        documents = search_documents(connection, entity, after_id=after_id, limit=SEARCH_BATCH_SIZE)
+        if not documents:
+            return
+        index.upsert(connection, documents)
+        after_id = documents[-1][1]
+
+@sa_event.listens_for(db.session, "after_flush")
+def sync_search_index(session, flush_context):
+    changed, deleted, renamed_clients = {}, set(), set()
+    for obj in session.new | session.dirty:
+        entity = SEARCHABLE.get(type(obj))
+        if entity:
+            changed.setdefault(entity, set()).add(obj.id)
+            if entity == "client" and sa_inspect(obj).attrs.name.history.deleted:
+                renamed_clients.add(obj.id)
+    for obj in session.deleted:
+        entity = SEARCHABLE.get(type(obj))
+        if entity:
+            deleted.add((entity, obj.id))
+    if not changed and not deleted:
+        return
+    connection = session.connection()
+    if renamed_clients:
+        changed.setdefault("project", set()).update(connection.execute(
+            db.select(Project.id).where(Project.client_id.in_(renamed_clients))).scalars())
+    index = search_index_for(connection.dialect.name)
+    index.delete(connection, deleted)
+    for entity, ids in changed.items():
+        ids = sorted(ids)
+        for i in range(0, len(ids), SEARCH_BATCH_SIZE):
+            index.upsert(connection, search_documents(connection, entity, ids[i:i + SEARCH_BATCH_SIZE]))
+
+def search_matches(entity, q):
+    """Subquery of the ids of `entity` rows matching a search box query"""
+    return search_index().ids_matching(entity, q)
+
+def project_ids_for_building(building_id):
+    return {pid for (pid,) in db.session.query(Project.id).filter(Project.building_id == building_id)}
+
+def project_ids_for_user(user_id):
+    """Projects a user attends, i.e. is assigned to"""
+    return {pid for (pid,) in db.session.query(ProjectAssignment.project_id).filter(ProjectAssignment.user_id == user_id)}
+
+def overlapping_event_ids(start, end, project_ids, exclude=None):
+    """Ids of events in the given projects overlapping [start, end) (epoch seconds)"""
+    return ensure_event_index().overlapping(start, end or start, project_ids, exclude=exclude)
+
+def find_double_bookings(start, end, project_id, exclude=None):
+    """Events overlapping [start, end) (epoch seconds) on the same project, building or assigned users"""
+    if project_id is None:
+        return []
+    project_ids = {project_id}
+    building_id = db.session.query(Project.building_id).filter(Project.id == project_id).scalar()
+    if building_id:
+        project_ids |= project_ids_for_building(building_id)
+    attendee_ids = [uid for (uid,) in db.session.query(ProjectAssignment.user_id).filter(ProjectAssignment.project_id == project_id)]
+    if attendee_ids:
+        project_ids |= {pid for (pid,) in db.session.query(ProjectAssignment.project_id)
+                        .filter(ProjectAssignment.user_id.in_(attendee_ids))}
+    ids = overlapping_event_ids(start, end, project_ids, exclude=exclude)
+    conflicts = Event.query.filter(Event.id.in_(ids)).all() if ids else []
+    window_start, window_end = utc_moment(start), utc_moment(end if end and end > start else start + 1)
+    series = series_overlapping(Event.query.filter(Event.project_id.in_(project_ids)), window_start, window_end)
+    conflicts += expand_occurrences([s for s in series if s.id != exclude], window_start, window_end)
+    return sorted(conflicts, key=lambda e: e.start_utc)
+
+# ---- Recurring events ----
+# Series expand in their own zone's wall clock (a 9:00 weekly meeting stays at 9:00 across DST);
+# range bounds below are aware datetimes and are converted per series.
+def series_overlapping(query, range_start, range_end):
+    """Recurring series from query that may have occurrences in [range_start, range_end)"""
+    return query.filter(
+        Event.recurrence_freq.isnot(None),
+        Event.start_utc < range_end.timestamp(),
+        # recurrence_end is a wall clock, so widen by the largest UTC offset; expansion trims exactly
+        or_(Event.recurrence_end.is_(None),
+            Event.recurrence_end >= range_start.astimezone(timezone.utc).replace(tzinfo=None) - TZ_SLACK)
+    ).all()
+
+def overridden_occurrences(series_list, range_start=None, range_end=None):
+    """(series_id, original_start) pairs already replaced by an override row"""
+    if not series_list:
+        return set()
+    query = db.session.query(Event.series_id, Event.original_start).filter(
+        Event.series_id.in_([s.id for s in series_list]))
+    if range_start is not None:
+        longest = max(s.duration for s in series_list)
+        utc_start = range_start.astimezone(timezone.utc).replace(tzinfo=None)
+        utc_end = range_end.astimezone(timezone.utc).replace(tzinfo=None)
+        query = query.filter(Event.original_start >= utc_start - longest - TZ_SLACK,
+                             Event.original_start < utc_end + TZ_SLACK)
+    return set(query.all())
+
+def expand_occurrences(series_list, range_start, range_end):
+    """Occurrences of the given series overlapping [range_start, range_end), in start order"""
+    overridden = overridden_occurrences(series_list, range_start, range_end)
+    occurrences = [
+        Occurrence(s, start)
+        for s in series_list
+        for start in s.recurrence.between(to_local(range_start, s.timezone), to_local(range_end, s.timezone),
+                                          s.duration)
+        if (s.id, start) not in overridden
+    ]
+    return sorted(occurrences, key=lambda o: o.start_utc)
+
+def _occurrence_stream(series, starts, overridden):
+    for start in starts:
+        if (series.id, start) not in overridden:
+            yield Occurrence(series, start)
+
+def next_occurrences(series_list, moment, limit):
+    """The first `limit` occurrences after moment across all series, expanded lazily"""
+    overridden = overridden_occurrences(series_list)
+    streams = [_occurrence_stream(s, s.recurrence.after(to_local(moment, s.timezone)), overridden)
+               for s in series_list]
+    return list(islice(heapq.merge(*streams, key=lambda o: o.start_utc), limit))
+
+def previous_occurrences(series_list, moment, limit):
+    """The last `limit` occurrences at or before moment, newest first"""
+    overridden = overridden_occurrences(series_list)
+    streams = [_occurrence_stream(s, s.recurrence.before(to_local(moment, s.timezone)), overridden)
+               for s in series_list]
+    return list(islice(heapq.merge(*streams, key=lambda o: o.start_utc, reverse=True), limit))
+
+# Window of occurrences listed on detail pages, which show one-off events in full
+OCCURRENCE_WINDOW_PAST = timedelta(days=30)
+OCCURRENCE_WINDOW_FUTURE = timedelta(days=90)
+
+def window_occurrences(series_query, now):
+    """Occurrences of the series in series_query inside the detail-page window, in start order"""
+    window_start, window_end = now - OCCURRENCE_WINDOW_PAST, now + OCCURRENCE_WINDOW_FUTURE
+    return expand_occurrences(series_overlapping(series_query, window_start, window_end), window_start, window_end)
+
+def with_occurrences(events, series_query, now):
+    """Merge one-off events with occurrences inside the detail-page window, newest first"""
+    return sorted(events + window_occurrences(series_query, now), key=lambda e: e.start_utc, reverse=True)
+
+def apply_recurrence_form(ev, form):
+    """Set or clear the recurrence rule of an event from the event form fields"""
+    freq = (form.get("recurrence_freq") or "").strip().upper()
+    if freq not in FREQUENCIES:
+        ev.recurrence_freq = None
+        ev.recurrence_until = None
+        ev.recurrence_count = None
+        ev.recurrence_end = None
+        return
+    ev.recurrence_freq = freq
+    ev.recurrence_interval = max(form.get("recurrence_interval", 1, type=int) or 1, 1)
+    until = (form.get("recurrence_until") or "").strip()
+    if until:
+        until_dt = datetime.fromisoformat(until)
+        # A bare date means "through the end of that day"
+        ev.recurrence_until = datetime.combine(until_dt.date(), time.max) if len(until) == 10 else until_dt
+    else:
+        ev.recurrence_until = None
+    count = form.get("recurrence_count", type=int)
+    ev.recurrence_count = count if count and count > 0 else None
+    ev.refresh_recurrence_end()
+
+def warn_double_booking(event):
+    conflicts = find_double_bookings(event.start_utc, event.end_utc, event.project_id, exclude=event.id)
+    if conflicts:
+        zone = display_timezone()
+        listed = ", ".join(f"{e.title} ({from_epoch(e.start_utc, zone).strftime('%Y-%m-%d %H:%M')})"
+                           for e in conflicts[:3])
+        more = f" and {len(conflicts) - 3} more" if len(conflicts) > 3 else ""
+        flash(f"Possible double-booking with the same project, building or client users: {listed}{more}.", "warning")
 
 class Activity(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -146,10 +863,96 @@ class Activity(db.Model):
     user = db.relationship('User', backref='activities')
     project = db.relationship('Project', backref='activities')
 
+#  Daily rollups of time entries and activities (UTC days), kept current by the flush hook below so
+#  reports read one row per day instead of raw history. Derived data: `flask rebuild-rollups` repairs it.
+class ProjectDailyHours(db.Model):
+    __tablename__ = 'project_daily_hours'
+    project_id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    hours = db.Column(db.Float, nullable=False, default=0)
+    entries = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (db.Index('ix_project_daily_hours_day', 'day', 'project_id'),)
+
+class UserDailyHours(db.Model):
+    __tablename__ = 'user_daily_hours'
+    user_id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    hours = db.Column(db.Float, nullable=False, default=0)
+    entries = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (db.Index('ix_user_daily_hours_day', 'day', 'user_id'),)
+
+class ProjectDailyActivity(db.Model):
+    __tablename__ = 'project_daily_activity'
+    project_id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    activities = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (db.Index('ix_project_daily_activity_day', 'day', 'project_id'),)
+
+def _rollup_values(obj, previous=False):
+    """(table, key, deltas) rows a TimeEntry or Activity adds to the rollups, as written or as it was"""
+    def value(attr):
+        history = sa_inspect(obj).attrs[attr].history
+        return history.deleted[0] if previous and history.deleted else getattr(obj, attr)
+
+    if isinstance(obj, TimeEntry):
+        stamp, hours = value("timestamp"), value("hours") or 0
+        if stamp is None:
+            return []
+        rows = [(UserDailyHours.__table__, {"user_id": value("user_id"), "day": stamp.date()},
+                 {"hours": hours, "entries": 1})]
+        if value("project_id") is not None:
+            rows.append((ProjectDailyHours.__table__, {"project_id": value("project_id"), "day": stamp.date()},
+                         {"hours": hours, "entries": 1}))
+        return [row for row in rows if None not in row[1].values()]
+    stamp = value("happened_at")
+    if stamp is None or value("project_id") is None:
+        return []
+    return [(ProjectDailyActivity.__table__, {"project_id": value("project_id"), "day": stamp.date()},
+             {"activities": 1})]
+
+def apply_rollup_deltas(connection, deltas):
+    """Add {(table, key items): {column: delta}} to the rollup rows, creating missing ones"""
+    for (table, key), changes in sorted(deltas.items(), key=lambda item: (item[0][0].name, item[0][1])):
+        if not any(changes.values()):
+            continue
+        where = [table.c[column] == value for column, value in key]
+        result = connection.execute(
+            table.update().where(*where).values({column: table.c[column] + delta for column, delta in changes.items()})
+        )
+        if result.rowcount == 0:
+            connection.execute(table.insert().values({**dict(key), **changes}))
+
+@sa_event.listens_for(db.session, "after_flush")
+def update_rollups(session, flush_context):
+    deltas = {}
+
+    def add(rows, sign):
+        for table, key, values in rows:
+            changes = deltas.setdefault((table, tuple(sorted(key.items()))), {})
+            for column, delta in values.items():
+                changes[column] = changes.get(column, 0) + sign * delta
+
+    for obj in session.new:
+        if isinstance(obj, (TimeEntry, Activity)):
+            add(_rollup_values(obj), 1)
+    for obj in session.dirty:
+        if isinstance(obj, (TimeEntry, Activity)) and session.is_modified(obj, include_collections=False):
+            add(_rollup_values(obj, previous=True), -1)
+            add(_rollup_values(obj), 1)
+    for obj in session.deleted:
+        if isinstance(obj, (TimeEntry, Activity)):
+            add(_rollup_values(obj, previous=True), -1)
+    if deltas:
+        apply_rollup_deltas(session.connection(), deltas)
+
 #  changes: New Notification model for client-to-employee communication
 class Notification(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    sender_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    # None = sent by the reminder scheduler rather than a user
+    sender_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
     # None = broadcast to all employees, non-null = direct to one employee
     recipient_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
     project_id = db.Column(db.Integer, db.ForeignKey('project.id'), nullable=True)
@@ -165,11 +968,25 @@ class Notification(db.Model):
                                 backref='received_notifications')
     project = db.relationship('Project', backref='notifications')
 
+#  Reminder already sent for one event occurrence, so scheduler restarts never repeat it
+class EventReminder(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    event_id = db.Column(db.Integer, db.ForeignKey('event.id'), nullable=False)
+    occurrence_start = db.Column(db.DateTime, nullable=False)
+    sent_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (db.UniqueConstraint('event_id', 'occurrence_start', name='uq_event_reminder'),)
+
 #CLI to init DB
 @app.cli.command("init-db")
 def init_db():
     db.drop_all()
     db.create_all()
+    event_index.clear()
+    index = search_index()
+    index.drop(db.session.connection())
+    index.create(db.session.connection())
+    db.session.commit()
 
     # Seed demo user
     if not User.query.filter_by(email="demo@pms.local").first():
@@ -231,7 +1048,7 @@ def init_db():
     db.session.commit()
     print("Initialized the database. Login with demo@pms.local / demo123")
 
-from sqlalchemy import or_, func, desc  # add this import at the top
+from sqlalchemy import or_, and_, func, desc, case  # add this import at the top
 
 #Routes
 # Made client_login the default login page for all users
@@ -298,46 +1115,86 @@ def logout():
     flash("Logged out", "info")
     return redirect(url_for("index"))
 
+@app.route("/account/timezone", methods=["POST"])
+@login_required
+def account_timezone():
+    """Set the zone the current user's times are displayed and entered in"""
+    zone = request.form.get("timezone", "").strip()
+    if not is_valid_timezone(zone):
+        flash("Unknown time zone.", "warning")
+    else:
+        current_user.timezone = zone
+        db.session.commit()
+        flash(f"Times are now shown in {zone}.", "success")
+    return redirect(request.referrer or url_for("dashboard"))
+
+@app.context_processor
+def inject_timezones():
+    return {"display_timezone": display_timezone(), "timezone_choices": TIMEZONE_CHOICES}
+
+DashboardEvent = namedtuple("DashboardEvent", "id title project_name start_utc")
+dashboard_cache = TTLCache(ttl=app.config["DASHBOARD_CACHE_TTL"])
+
+def dashboard_event(e):
+    return DashboardEvent(e.id, e.title, e.project.name if e.project else None, e.start_utc)
+
+def dashboard_events(event_scope, now, limit=5):
+    """Last `limit` events up to now and next `limit` after now, via two LIMIT queries"""
+    if event_scope is None:
+        return [], []
+    now_ts = int(now.timestamp())
+    event_scope = event_scope.options(db.joinedload(Event.project))
+    single = event_scope.filter(Event.recurrence_freq.is_(None))
+    recent = single.filter(Event.start_utc <= now_ts).order_by(Event.start_utc.desc()).limit(limit).all()
+    future = single.filter(Event.start_utc > now_ts).order_by(Event.start_utc).limit(limit).all()
+
+    series = event_scope.filter(Event.recurrence_freq.isnot(None)).all()
+    if series:
+        recent = list(islice(heapq.merge(recent, previous_occurrences(series, now, limit),
+                                         key=lambda e: e.start_utc, reverse=True), limit))
+        future = list(islice(heapq.merge(future, next_occurrences(series, now, limit),
+                                         key=lambda e: e.start_utc), limit))
+    return [dashboard_event(e) for e in recent], [dashboard_event(e) for e in future]
+
 @app.route("/dashboard")
 @login_required
+@query_profile(budget=11, load=[db.selectinload(Project.client), db.selectinload(Project.activities)])
 def dashboard():
-    now = datetime.now()
+    now = utc_now()
 
     if current_user.role == 'employee':
-        recent_projects = (
+        recent_projects = with_load_profile(
             db.session.query(Project)
             .join(Activity, Activity.project_id == Project.id)
             .filter(Activity.user_id == current_user.id)
             .order_by(desc(Activity.happened_at))
             .limit(6)
-            .all()
-        )
+        ).all()
 
-        base_events = Event.query.order_by(Event.start.desc()).all()
+        event_scope = Event.query
+        versions = scope_versions(("events",))
 
     else:
-        assigned_ids = [pa.project_id for pa in current_user.project_assignments]
-
-        if assigned_ids:
-            recent_projects = (
+        versions = scope_versions(("events", f"user:{current_user.id}"))
+        if accessible_project_ids(version=versions[1]):
+            recent_projects = with_load_profile(
                 Project.query
-                .filter(Project.id.in_(assigned_ids))
+                .filter(Project.id.in_(assigned_projects()))
                 .limit(6)
-                .all()
-            )
+            ).all()
 
-            base_events = (
-                Event.query
-                .filter(Event.project_id.in_(assigned_ids))
-                .order_by(Event.start.desc())
-                .all()
-            )
+            event_scope = Event.query.filter(Event.project_id.in_(assigned_projects()))
         else:
             recent_projects = []
-            base_events = []
+            event_scope = None
 
-    recent_events = [e for e in base_events if e.start <= now][:5]
-    future_events = sorted([e for e in base_events if e.start > now], key=lambda e: e.start)[:5]
+    # Snapshot is reused until it expires or an event/assignment write bumps the counters
+    cached = dashboard_cache.get(current_user.id)
+    if cached and cached[0] == versions:
+        recent_events, future_events = cached[1]
+    else:
+        recent_events, future_events = dashboard_events(event_scope, now)
+        dashboard_cache.set(current_user.id, (versions, (recent_events, future_events)))
 
     return render_template(
         "dashboard.html",
@@ -352,47 +1209,221 @@ def dashboard():
 def main_menu():
     return render_template("main_menu.html")
 
+# ---- Search ----
+SEARCH_LIMIT = 20
+SEARCH_TYPES = ("client", "building", "project", "event")  # users are only found by the typeahead
+
+def search_results(hits):
+    """Label and link each (entity, id, score) hit, keeping the ranked order"""
+    ids = {}
+    for entity, entity_id, _ in hits:
+        ids.setdefault(entity, []).append(entity_id)
+    labels = {}
+    if "client" in ids:
+        for cid, name, city in db.session.query(Client.id, Client.name, Client.city).filter(Client.id.in_(ids["client"])):
+            labels["client", cid] = (name, city, url_for("client_detail", id=cid))
+    if "building" in ids:
+        for bid, name, city in db.session.query(Building.id, Building.name, Building.city).filter(Building.id.in_(ids["building"])):
+            labels["building", bid] = (name, city, url_for("buildings", q=name))
+    if "project" in ids:
+        for pid, name, status in db.session.query(Project.id, Project.name, Project.status).filter(Project.id.in_(ids["project"])):
+            labels["project", pid] = (name, status, url_for("project_detail", id=pid))
+    if "event" in ids:
+        zone = display_timezone()
+        rows = db.session.query(Event.id, Event.title, Event.start_utc, Event.project_id).filter(Event.id.in_(ids["event"]))
+        for eid, title, start_utc, project_id in rows:
+            url = url_for("project_detail", id=project_id) if project_id else url_for("events")
+            labels["event", eid] = (title, from_epoch(start_utc, zone).strftime('%Y-%m-%d %H:%M'), url)
+    results = []
+    for entity, entity_id, score in hits:
+        if (entity, entity_id) in labels:  # skips documents of rows deleted since the search ran
+            title, subtitle, url = labels[entity, entity_id]
+            results.append({"type": entity, "id": entity_id, "title": title, "subtitle": subtitle or "",
+                            "url": url, "score": round(score, 4)})
+    return results
+
+@app.route("/search")
+@login_required
+def search():
+    """Ranked, prefix-matched hits across clients, buildings, projects and events (JSON)"""
+    q = request.args.get("q", "").strip()
+    limit = max(1, min(request.args.get("limit", SEARCH_LIMIT, type=int), 100))
+    types = [t for t in request.args.get("types", "").split(",") if t in SEARCH_TYPES] or list(SEARCH_TYPES)
+
+    if current_user.role == 'employee':
+        allowed = {entity: None for entity in types}
+    else:
+        # Clients only find their assigned projects and those projects' events
+        has_projects = bool(accessible_project_ids())
+        allowed = {}
+        if has_projects and "project" in types:
+            allowed["project"] = assigned_projects()
+        if has_projects and "event" in types:
+            allowed["event"] = db.select(Event.id).where(Event.project_id.in_(assigned_projects()))
+
+    hits = search_index().search(db.session.connection(), q, allowed, limit) if q else []
+    return jsonify({"query": q, "results": search_results(hits)})
+
+@app.cli.command("rebuild-search-index")
+def rebuild_search_index():
+    """Recreate the full-text search index from the current rows"""
+    connection = db.session.connection()
+    index = search_index()
+    index.drop(connection)
+    index.create(connection)
+    for entity in SEARCH_ENTITIES:
+        reindex_search(connection, entity)
+    db.session.commit()
+    print("Search index rebuilt.")
+
+@app.cli.command("geocode-buildings")
+@click.option("--all", "everything", is_flag=True, help="Relocate every building, not only those without a location.")
+def geocode_buildings(everything):
+    """Place buildings at their ZIP's centroid from the ZIP centroid file"""
+    centroids = zip_centroids()
+    query = db.session.query(Building.id, Building.zip)
+    if not everything:
+        query = query.filter(Building.latitude.is_(None))
+    located, missing = 0, {}
+    table = Building.__table__
+    for building_id, zipcode in query.all():
+        lat, lon = centroids.locate(zipcode) or (None, None)
+        db.session.execute(table.update().where(table.c.id == building_id).values(latitude=lat, longitude=lon))
+        if lat is None:
+            missing[zipcode or "(none)"] = missing.get(zipcode or "(none)", 0) + 1
+        else:
+            located += 1
+    db.session.commit()
+    # Core updates skip the session hooks; reload the index on next use
+    building_locations.clear()
+    print(f"Located {located} building(s); {sum(missing.values())} left unlocated "
+          f"({len(centroids)} centroids in {app.config['ZIP_CENTROIDS_PATH']}).")
+    for zipcode, count in sorted(missing.items(), key=lambda item: (-item[1], item[0]))[:20]:
+        print(f"  ZIP {zipcode}: {count} building(s)")
+    if len(missing) > 20:
+        print(f"  ... and {len(missing) - 20} more ZIP codes")
+
+# ---- Typeahead ----
+# Pickers fetch the top matches as the user types instead of pages embedding whole tables
+TYPEAHEAD_LIMIT = 10
+
+def typeahead_select(entity):
+    """SELECT of (id, label, detail) for a picker's entity"""
+    if entity == "client":
+        return db.select(Client.id, Client.name, Client.city)
+    if entity == "building":
+        return db.select(Building.id, Building.name, Building.city)
+    if entity == "project":
+        return db.select(Project.id, Project.name, Client.name).outerjoin(Client, Client.id == Project.client_id)
+    return db.select(User.id, User.name, User.email)
+
+@app.route("/api/typeahead/<entity>")
+@login_required
+def typeahead(entity):
+    """Top `limit` clients, buildings, projects or users matching q, as [{id, label, detail}] (JSON).
+
+    Words are prefix-matched through the search index; an empty q lists the first rows by name.
+    """
+    if entity not in ("client", "building", "project", "user"):
+        abort(404)
+    if entity != "project" and current_user.role != 'employee':
+        abort(403)
+    q = request.args.get("q", "").strip()
+    limit = max(1, min(request.args.get("limit", TYPEAHEAD_LIMIT, type=int), 50))
+
+    allowed = None
+    if entity == "project" and current_user.role != 'employee':
+        # Clients only pick from their assigned projects
+        allowed = assigned_projects()
+    elif entity == "user" and request.args.get("role") in ("client", "employee"):
+        allowed = db.select(User.id).where(User.role == request.args["role"])
+
+    stmt = typeahead_select(entity)
+    id_column, label_column = stmt.selected_columns[0], stmt.selected_columns[1]
+    if q:
+        hits = search_index().search(db.session.connection(), q, {entity: allowed}, limit)
+        ranked = [entity_id for _, entity_id, _ in hits]
+        rows = {row[0]: row for row in db.session.execute(stmt.where(id_column.in_(ranked)))} if ranked else {}
+        rows = [rows[i] for i in ranked if i in rows]
+    else:
+        if allowed is not None:
+            stmt = stmt.where(id_column.in_(allowed))
+        rows = db.session.execute(stmt.order_by(label_column, id_column).limit(limit)).all()
+    return jsonify({"query": q, "results": [{"id": row[0], "label": row[1], "detail": row[2] or ""} for row in rows]})
+
+# ---- Sorted list pages ----
+# Each sort is a keyset order ending in the id tiebreak plus the row -> cursor values key;
+# the first entry of a spec is its default
+LIST_PER_PAGE = 25
+
+CLIENT_SORTS = {
+    name: ([(column, False), (Client.id, False)], lambda row, attr=column.key: (getattr(row[0], attr), row[0].id))
+    for name, column in (("name", Client.name), ("city", Client.city), ("state", Client.state))
+}
+
+BUILDING_SORTS = {
+    name: ([(column, False), (Building.id, False)], lambda b, attr=column.key: (getattr(b, attr), b.id))
+    for name, column in (("name", Building.name), ("city", Building.city), ("state", Building.state))
+}
+
+PROJECT_SORTS = {
+    "name": ([(Project.name, False), (Project.id, False)], lambda p: (p.name, p.id)),
+    "due_date": ([(Project.due_date, True), (Project.id, True)], lambda p: (p.due_date, p.id)),
+    "status": ([(Project.status, False), (Project.id, False)], lambda p: (p.status, p.id)),
+    # Projects without a client sort after the named ones
+    "client": (
+        [(case((Client.id.is_(None), 1), else_=0), False), (Client.name, False), (Project.id, False)],
+        lambda p: (0 if p.client else 1, p.client.name if p.client else None, p.id),
+    ),
+}
+
+USER_SORTS = {
+    "name": ([(User.name, False), (User.id, False)], lambda u: (u.name, u.id)),
+    "email": ([(User.email, False), (User.id, False)], lambda u: (u.email, u.id)),
+    "role": ([(User.role, False), (User.name, False), (User.id, False)], lambda u: (u.role, u.name, u.id)),
+}
+
+
+def paginate_sorted(query, sorts, sort_by, per_page=LIST_PER_PAGE):
+    """One keyset page of query in the named sort, paged by the request's after/before cursors"""
+    order, key = sorts.get(sort_by) or next(iter(sorts.values()))
+    return keyset_paginate(query, order, key, per_page,
+                           after=request.args.get("after"), before=request.args.get("before"))
+
 # ---- Clients CRUD ----
 @app.route("/clients")
 @login_required
 @employee_required  #  changes: Only employees can manage clients
+@query_profile(budget=4)
 def clients():
     # Get search query and sort option from URL parameters
     search_query = request.args.get("q", "").strip()
     sort_by = request.args.get("sort", "name")  # Default sort by name
 
+    # Project counts come from one grouped subquery joined in SQL, not a COUNT per client
+    project_counts = (
+        db.session.query(Project.client_id, func.count(Project.id).label("project_count"))
+        .group_by(Project.client_id)
+        .subquery()
+    )
+
     # Start with base query
-    query = Client.query
+    query = (
+        db.session.query(Client, func.coalesce(project_counts.c.project_count, 0))
+        .outerjoin(project_counts, project_counts.c.client_id == Client.id)
+    )
 
-    # Apply search filter if provided
+    # Apply search filter if provided (full-text index, prefix match on every word)
     if search_query:
-        query = query.filter(
-            or_(
-                Client.name.ilike(f"%{search_query}%"),
-                Client.contact.ilike(f"%{search_query}%"),
-                Client.phone.ilike(f"%{search_query}%"),
-                Client.street.ilike(f"%{search_query}%"),
-                Client.city.ilike(f"%{search_query}%"),
-                Client.state.ilike(f"%{search_query}%"),
-                Client.zip.ilike(f"%{search_query}%")
-            )
-        )
-
-    # Apply sorting
-    if sort_by == "name":
-        query = query.order_by(Client.name)
-    elif sort_by == "city":
-        query = query.order_by(Client.city)
-    elif sort_by == "state":
-        query = query.order_by(Client.state)
+        query = query.filter(Client.id.in_(search_matches("client", search_query)))
 
-    clients_list = query.all()
+    page = paginate_sorted(query, CLIENT_SORTS, sort_by)
+    clients_list = []
+    for client, project_count in page.items:
+        client.project_count = project_count
+        clients_list.append(client)
 
-    # Count projects for each client
-    for client in clients_list:
-        client.project_count = Project.query.filter_by(client_id=client.id).count()
-
-    return render_template("clients.html", clients=clients_list, search_query=search_query, sort_by=sort_by)
+    return render_template("clients.html", clients=clients_list, page=page, search_query=search_query, sort_by=sort_by)
 
 @app.route("/clients/create", methods=["POST"])
 @login_required
@@ -458,43 +1489,119 @@ def clients_delete(id):
     flash("Client deleted successfully.", "info")
     return redirect(url_for("clients"))
 
+# Client events are listed newest first, CLIENT_EVENTS_PER_PAGE at a time; past one-off events
+# reach back CLIENT_EVENT_WINDOW until older ones are asked for
+CLIENT_EVENTS_PER_PAGE = 20
+CLIENT_EVENT_WINDOW = timedelta(days=90)
+
+def client_events_query(client_id):
+    return Event.query.filter(Event.project_id.in_(db.select(Project.id).where(Project.client_id == client_id)))
+
+def client_stats(client_id, now_ts):
+    """Project and one-off event counts for a client, from one grouped aggregate"""
+    events = (
+        db.select(Event.project_id,
+                  func.count(Event.id).label("events"),
+                  func.sum(case((Event.start_utc > now_ts, 1), else_=0)).label("upcoming"))
+        .where(Event.recurrence_freq.is_(None),
+               Event.project_id.in_(db.select(Project.id).where(Project.client_id == client_id)))
+        .group_by(Event.project_id)
+        .subquery()
+    )
+    row = db.session.execute(
+        db.select(func.count(Project.id),
+                  func.coalesce(func.sum(case((Project.status == "In Progress", 1), else_=0)), 0),
+                  func.coalesce(func.sum(case((Project.status == "Done", 1), else_=0)), 0),
+                  func.coalesce(func.sum(events.c.events), 0),
+                  func.coalesce(func.sum(events.c.upcoming), 0))
+        .select_from(Project)
+        .outerjoin(events, events.c.project_id == Project.id)
+        .where(Project.client_id == client_id)
+    ).one()
+    return dict(zip(("total_projects", "active_projects", "completed_projects", "total_events", "upcoming_events"),
+                    (int(value) for value in row)))
+
+def client_event_page(client_events, occurrences, now, after=None, older=False):
+    """One page of a client's events, and the cursor of the one-off events older than the window (or None).
+
+    One-off events are paged by keyset on (start_utc, id) descending; occurrences of recurring
+    series (already expanded for the detail window) are merged in past the same cursor.
+    """
+    since = int((now - CLIENT_EVENT_WINDOW).timestamp())
+    singles = client_events.filter(Event.recurrence_freq.is_(None))
+    page_query = singles if older else singles.filter(Event.start_utc >= since)
+    cursor = decode_cursor(after)
+    if cursor is None or len(cursor) != 2:
+        cursor = None
+    else:
+        start, event_id = cursor
+        page_query = page_query.filter(or_(Event.start_utc < start,
+                                           and_(Event.start_utc == start, Event.id < event_id)))
+        occurrences = [o for o in occurrences if (o.start_utc, o.id) < (start, event_id)]
+    rows = (page_query.options(db.joinedload(Event.project))
+            .order_by(Event.start_utc.desc(), Event.id.desc())
+            .limit(CLIENT_EVENTS_PER_PAGE + 1)
+            .all())
+    merged = sorted(rows + occurrences, key=lambda e: (e.start_utc, e.id), reverse=True)
+    items = merged[:CLIENT_EVENTS_PER_PAGE]
+    next_cursor = encode_cursor([items[-1].start_utc, items[-1].id]) if len(merged) > CLIENT_EVENTS_PER_PAGE else None
+    older_cursor = None
+    if next_cursor is None and not older and db.session.query(singles.filter(Event.start_utc < since).exists()).scalar():
+        # Everything shown so far starts at or after `since`, so older pages continue from there
+        older_cursor = encode_cursor([since, 0])
+    return KeysetPage(items, next_cursor, None), older_cursor
+
 @app.route("/clients/<int:id>")
 @login_required
 @employee_required  #  changes: Only employees can view client details
+@query_profile(budget=10, load=[db.selectinload(Project.building)])  # sparse window: also checks for older events
 def client_detail(id):
     """View detailed information about a specific client"""
     client = Client.query.get_or_404(id)
+    now = utc_now()
 
     # Get all projects for this client
-    projects = Project.query.filter_by(client_id=id).all()
-
-    # Get all events related to this client's projects
-    project_ids = [p.id for p in projects]
-    events = Event.query.filter(Event.project_id.in_(project_ids)).order_by(Event.start.desc()).all() if project_ids else []
-
-    # Calculate stats
-    total_projects = len(projects)
-    active_projects = len([p for p in projects if p.status == "In Progress"])
-    completed_projects = len([p for p in projects if p.status == "Done"])
-    upcoming_events = len([e for e in events if e.start > datetime.now()])
-
-    stats = {
-        'total_projects': total_projects,
-        'active_projects': active_projects,
-        'completed_projects': completed_projects,
-        'upcoming_events': upcoming_events
-    }
+    projects = with_load_profile(Project.query.filter_by(client_id=id)).all()
+
+    # Counts come from SQL; recurring series add their upcoming occurrences in the detail window
+    stats = client_stats(id, now.timestamp())
+    client_events = client_events_query(id)
+    occurrences = window_occurrences(client_events.options(db.joinedload(Event.project)), now)
+    stats['upcoming_events'] += sum(1 for o in occurrences if o.start_utc > now.timestamp())
+
+    page, older_cursor = client_event_page(client_events, occurrences, now)
 
     return render_template("client_detail.html",
                            client=client,
                            projects=projects,
-                           events=events,
+                           events=page.items,
+                           page=page,
+                           older_cursor=older_cursor,
+                           older=False,
+                           event_window_days=CLIENT_EVENT_WINDOW.days,
                            stats=stats)
 
+@app.route("/clients/<int:id>/events")
+@login_required
+@employee_required
+@query_profile(budget=7)
+def client_events(id):
+    """Next page of a client's event cards, fetched by the detail page's Load more button"""
+    client = Client.query.get_or_404(id)
+    now = utc_now()
+    older = request.args.get("older") == "1"
+    client_events = client_events_query(client.id)
+    occurrences = window_occurrences(client_events.options(db.joinedload(Event.project)), now)
+    page, older_cursor = client_event_page(client_events, occurrences, now,
+                                        after=request.args.get("after"), older=older)
+    return render_template("client_event_cards.html", client=client, events=page.items, page=page,
+                           older_cursor=older_cursor, older=older)
+
 # ---- Buildings CRUD (minimal) ----
 @app.route("/buildings")
 @login_required
 @employee_required  #  changes: Only employees can manage buildings
+@query_profile(budget=4)
 def buildings():
     """Display all buildings with optional search and sort"""
     search_query = request.args.get("q", "").strip()
@@ -503,30 +1610,15 @@ def buildings():
     # Start with base query
     query = Building.query
 
-    # Apply search filter if provided
+    # Apply search filter if provided (full-text index, prefix match on every word)
     if search_query:
-        query = query.filter(
-            or_(
-                Building.name.ilike(f"%{search_query}%"),
-                Building.street.ilike(f"%{search_query}%"),
-                Building.city.ilike(f"%{search_query}%"),
-                Building.state.ilike(f"%{search_query}%"),
-                Building.zip.ilike(f"%{search_query}%")
-            )
-        )
-
-    # Apply sorting
-    if sort_by == "name":
-        query = query.order_by(Building.name)
-    elif sort_by == "city":
-        query = query.order_by(Building.city)
-    elif sort_by == "state":
-        query = query.order_by(Building.state)
+        query = query.filter(Building.id.in_(search_matches("building", search_query)))
 
-    buildings_list = query.all()
+    page = paginate_sorted(query, BUILDING_SORTS, sort_by)
 
     return render_template("buildings.html",
-                           buildings=buildings_list,
+                           buildings=page.items,
+                           page=page,
                            search_query=search_query,
                            sort_by=sort_by)
 
@@ -547,6 +1639,7 @@ def buildings_create():
         db.session.add(b)
         db.session.commit()
         flash("Building added", "success")
+        flash_if_unlocated(b)
     return redirect(url_for("buildings"))
 
 @app.route("/buildings/<int:id>/update", methods=["POST"])
@@ -562,6 +1655,7 @@ def buildings_update(id):
     b.notes = request.form.get("notes", "").strip()
     db.session.commit()
     flash("Building updated", "success")
+    flash_if_unlocated(b)
     return redirect(url_for("buildings"))
 
 @app.route("/buildings/<int:id>/delete", methods=["POST"])
@@ -574,52 +1668,89 @@ def buildings_delete(id):
     flash("Building deleted", "info")
     return redirect(url_for("buildings"))
 
+# Nearby sites, answered from the in-memory location index rather than the database
+NEAR_DEFAULT_K = 10
+NEAR_MAX_RESULTS = 200
+NEAR_MAX_MILES = 500
+
+@app.route("/api/buildings/near")
+@login_required
+@query_profile(budget=4)
+def buildings_near():
+    """Buildings around a point, nearest first, as {origin, results: [{id, name, ..., miles}]} (JSON).
+
+    The point is a building (`building`), a ZIP code (`zip`) or `lat`/`lon`. With `radius` (miles)
+    every building within it is returned, up to `k`; without it, the `k` nearest.
+    """
+    if current_user.role != 'employee':
+        abort(403)
+    args = request.args
+    exclude = None
+    if args.get("building"):
+        origin = db.session.get(Building, args.get("building", type=int) or 0)
+        if origin is None:
+            abort(404)
+        if origin.latitude is None:
+            return jsonify({"error": "That building has no location; check its ZIP code."}), 400
+        lat, lon, exclude = origin.latitude, origin.longitude, origin.id
+    elif args.get("zip"):
+        lat, lon = zip_centroids().locate(args["zip"]) or (None, None)
+        if lat is None:
+            return jsonify({"error": "Unknown ZIP code."}), 400
+    else:
+        lat, lon = args.get("lat", type=float), args.get("lon", type=float)
+        if lat is None or lon is None or not (-90 <= lat <= 90 and -180 <= lon <= 180):
+            return jsonify({"error": "Give a building, a zip, or lat and lon."}), 400
+
+    radius = args.get("radius", type=float)
+    if radius is not None and not 0 < radius <= NEAR_MAX_MILES:
+        return jsonify({"error": f"radius must be between 0 and {NEAR_MAX_MILES} miles."}), 400
+    k = max(1, min(args.get("k", NEAR_DEFAULT_K if radius is None else NEAR_MAX_RESULTS, type=int), NEAR_MAX_RESULTS))
+
+    index = ensure_building_locations()
+    if radius is None:
+        hits = index.nearest(lat, lon, k, exclude=exclude)
+    else:
+        hits = index.within(lat, lon, radius, exclude=exclude)[:k]
+    rows = {b.id: b for b in Building.query.filter(Building.id.in_([key for key, _ in hits]))} if hits else {}
+
+    results = [
+        {"id": b.id, "name": b.name, "street": b.street, "city": b.city, "state": b.state, "zip": b.zip,
+         "latitude": b.latitude, "longitude": b.longitude, "miles": round(miles, 2)}
+        for b, miles in ((rows.get(key), miles) for key, miles in hits) if b is not None
+    ]
+    # Buildings whose ZIP could not be located are never among the results; say how many were left out
+    return jsonify({"origin": {"building_id": exclude, "latitude": lat, "longitude": lon},
+                    "radius": radius, "results": results, "unlocated": len(index.unlocated)})
+
 # ---- Projects CRUD (minimal) ----
 @app.route("/projects")
 @login_required
+@query_profile(budget=8, load=[
+    db.selectinload(Project.building),
+    db.selectinload(Project.assignments).joinedload(ProjectAssignment.user),
+])
 def projects():
     #  changes: Filter projects based on user role
     q = request.args.get("q", "").strip()
     sort_by = request.args.get("sort", "name")  # Get sort parameter, default to 'name'
-    page = request.args.get("page", 1, type=int)  # Get page number, default to 1
-    per_page = 15  # Projects per page
 
-    if current_user.role == 'employee':
-        # Employees see all projects
-        query = Project.query.join(Client, isouter=True)
-    else:
+    # The client join also loads each project's client, so the rows need no extra queries
+    query = Project.query.join(Client, isouter=True).options(db.contains_eager(Project.client))
+    if current_user.role != 'employee':
         # Clients only see assigned projects
-        assigned_project_ids = [pa.project_id for pa in current_user.project_assignments]
-        if not assigned_project_ids:
+        if not accessible_project_ids():
             # No projects assigned, show empty list
-            return render_template("projects.html", projects=[], pagination=None, q=q, sort_by=sort_by, clients=Client.query.all(), buildings=Building.query.all(), users=[])
-        query = Project.query.join(Client, isouter=True).filter(Project.id.in_(assigned_project_ids))
+            return render_template("projects.html", projects=[], page=KeysetPage([], None, None), q=q, sort_by=sort_by)
+        query = query.filter(Project.id.in_(assigned_projects()))
 
-    # Apply search filter
+    # Apply search filter (name, description and client name via the full-text index)
     if q:
-        query = query.filter(
-            or_(
-                Project.name.ilike(f"%{q}%"),
-                Project.description.ilike(f"%{q}%"),
-                Client.name.ilike(f"%{q}%")
-            )
-        )
+        query = query.filter(Project.id.in_(search_matches("project", q)))
 
-    # Apply sorting
-    if sort_by == "name":
-        query = query.order_by(Project.name)
-    elif sort_by == "due_date":
-        query = query.order_by(Project.due_date.desc().nullslast())
-    elif sort_by == "status":
-        query = query.order_by(Project.status)
-    elif sort_by == "client":
-        query = query.order_by(Client.name.nullslast())
-    else:
-        query = query.order_by(Project.id.desc())  # Default fallback
-
-    # Paginate results
-    pagination = query.paginate(page=page, per_page=per_page, error_out=False)
-    projects = pagination.items
+    # Keyset page in the chosen sort; no COUNT and no OFFSET however deep the page
+    page = paginate_sorted(with_load_profile(query), PROJECT_SORTS, sort_by, per_page=15)
+    projects = page.items
 
     # Mark overdue projects
     from datetime import date
@@ -630,10 +1761,8 @@ def projects():
         else:
             project.is_overdue = False
 
-    # MERGED: Pass all users to template for client assignment dropdown (your feature)
-    # AND pass buildings for building associations (teammate's feature)
-    all_users = User.query.filter_by(role='client').all() if current_user.role == 'employee' else []
-    return render_template("projects.html", projects=projects, pagination=pagination, q=q, sort_by=sort_by, clients=Client.query.all(), buildings=Building.query.all(), users=all_users)
+    # Client, building and user pickers fetch their options from /api/typeahead as the user types
+    return render_template("projects.html", projects=projects, page=page, q=q, sort_by=sort_by)
 
 @app.route("/projects/create", methods=["POST"])
 @login_required
@@ -683,6 +1812,7 @@ def projects_delete(id):
         return redirect(url_for("projects"))
 
     Activity.query.filter_by(project_id=p.id).delete(synchronize_session=False)
+    ProjectDailyActivity.query.filter_by(project_id=p.id).delete(synchronize_session=False)
 
     db.session.delete(p)
     db.session.commit()
@@ -719,80 +1849,387 @@ def projects_update(id):
     flash("Project updated successfully!", "success")
     return redirect(url_for("project_detail", id=id))
 
+# ---- Bulk project operations (JSON) ----
+# Set-based statements in one transaction. Core UPDATE/INSERT bypasses the ORM flush hooks,
+# so scope counters, the search index and cached project access are updated here.
+PROJECT_STATUSES = ("Planned", "In Progress", "Overdue", "Done")
+BULK_MAX_ROWS = 5000
+MAX_DUE_DATE_SHIFT = 3650  # days
+
+def bulk_ids(payload):
+    """Distinct integer project ids from payload["ids"] in the order given, or None when malformed"""
+    ids = payload.get("ids")
+    if not isinstance(ids, list) or not ids or len(ids) > BULK_MAX_ROWS:
+        return None
+    if not all(isinstance(i, int) and not isinstance(i, bool) for i in ids):
+        return None
+    return list(dict.fromkeys(ids))
+
+def shifted_date(column, days, dialect_name):
+    """SQL expression for a DATE column moved by a whole number of days"""
+    if dialect_name == "sqlite":
+        return func.date(column, f"{days:+d} days")
+    return func.date_add(column, db.text("INTERVAL :days DAY").bindparams(days=days))
+
+def bulk_error(message):
+    return jsonify({"error": message}), 400
+
+def insert_assignments(user_id, project_ids):
+    """INSERT ... SELECT of the user's assignments to project_ids; NOT EXISTS skips ones already there"""
+    assignment, project = ProjectAssignment.__table__, Project.__table__
+    return assignment.insert().from_select(
+        ["project_id", "user_id", "assigned_at"],
+        db.select(project.c.id, db.literal(user_id), db.literal(datetime.utcnow()))
+        .where(project.c.id.in_(project_ids),
+               ~db.exists().where(assignment.c.project_id == project.c.id, assignment.c.user_id == user_id)))
+
+@app.route("/api/projects/bulk/<any(status, 'due-date', building, assign):operation>", methods=["POST"])
+@login_required
+@employee_required
+def projects_bulk(operation):
+    """Apply one change to many projects in a single transaction.
+
+    Body: {"ids": [...]} plus "status", "days" (due-date shift), "building_id" (null clears)
+    or "user_id" (client user to assign). Answers with one result per id in the order given.
+    """
+    payload = request.get_json(silent=True) or {}
+    ids = bulk_ids(payload)
+    if ids is None:
+        return bulk_error(f"ids must be a non-empty list of at most {BULK_MAX_ROWS} integer project ids")
+
+    project = Project.__table__
+    connection = db.session.connection()
+    current = {row.id: row for row in connection.execute(
+        db.select(project.c.id, project.c.status, project.c.due_date, project.c.building_id)
+        .where(project.c.id.in_(ids)))}
+    results = {i: {"id": i, "result": "not_found"} for i in ids if i not in current}
+    changed, scopes = [], set()
+
+    if operation == "status":
+        status = payload.get("status")
+        if status not in PROJECT_STATUSES:
+            return bulk_error("status must be one of " + ", ".join(PROJECT_STATUSES))
+        changed = [i for i in current if current[i].status != status]
+        if changed:
+            connection.execute(project.update().where(project.c.id.in_(changed)).values(status=status))
+            # Status is part of each project's search document
+            index = search_index_for(connection.dialect.name)
+            for i in range(0, len(changed), SEARCH_BATCH_SIZE):
+                index.upsert(connection, search_documents(connection, "project", changed[i:i + SEARCH_BATCH_SIZE]))
+        for i in current:
+            results[i] = {"id": i, "result": "updated" if i in changed else "unchanged", "status": status}
+
+    elif operation == "due-date":
+        days = payload.get("days")
+        if not isinstance(days, int) or isinstance(days, bool) or abs(days) > MAX_DUE_DATE_SHIFT:
+            return bulk_error(f"days must be an integer between -{MAX_DUE_DATE_SHIFT} and {MAX_DUE_DATE_SHIFT}")
+        dated = [i for i in current if current[i].due_date is not None]
+        changed = dated if days else []
+        if changed:
+            connection.execute(project.update().where(project.c.id.in_(changed))
+                               .values(due_date=shifted_date(project.c.due_date, days, connection.dialect.name)))
+        for i in current:
+            due = current[i].due_date
+            if due is None:
+                results[i] = {"id": i, "result": "no_due_date"}
+            else:
+                results[i] = {"id": i, "result": "updated" if days else "unchanged",
+                              "due_date": (due + timedelta(days=days)).isoformat()}
+
+    elif operation == "building":
+        building_id = payload.get("building_id")
+        if building_id is not None and (not isinstance(building_id, int) or db.session.get(Building, building_id) is None):
+            return bulk_error("building_id must be an existing building id or null")
+        changed = [i for i in current if current[i].building_id != building_id]
+        if changed:
+            connection.execute(project.update().where(project.c.id.in_(changed)).values(building_id=building_id))
+            # Feeds of the buildings the projects left show their events too
+            scopes |= {f"building:{current[i].building_id}" for i in changed if current[i].building_id}
+        for i in current:
+            results[i] = {"id": i, "result": "updated" if i in changed else "unchanged", "building_id": building_id}
+
+    else:
+        user_id = payload.get("user_id")
+        user = db.session.get(User, user_id) if isinstance(user_id, int) else None
+        if user is None or user.role != 'client':
+            return bulk_error("user_id must be the id of a client user")
+        assignment = ProjectAssignment.__table__
+        existing = set(connection.execute(
+            db.select(assignment.c.project_id)
+            .where(assignment.c.user_id == user_id, assignment.c.project_id.in_(list(current)))).scalars())
+        to_assign = [i for i in current if i not in existing]
+        assigned = set()
+        if to_assign:
+            # Only rows this request inserted count as assigned; one a concurrent request got to first is "exists"
+            if connection.dialect.insert_returning:
+                assigned = set(connection.execute(
+                    insert_assignments(user_id, to_assign).returning(assignment.c.project_id)).scalars())
+            else:
+                assigned = {i for i in to_assign if connection.execute(insert_assignments(user_id, [i])).rowcount}
+        if assigned:
+            scopes.add(f"user:{user_id}")
+            scopes |= {f"project:{i}" for i in assigned}
+            db.session.info.setdefault("access_pending", set()).add(user_id)
+        for i in current:
+            results[i] = {"id": i, "result": "assigned" if i in assigned else "exists", "user_id": user_id}
+
+    if operation != "assign" and changed:
+        scopes |= scopes_for_projects(connection, changed)
+    if scopes:
+        bump_scope_versions(connection, scopes)
+    db.session.commit()
+
+    rows = [results[i] for i in ids]
+    summary = {}
+    for row in rows:
+        summary[row["result"]] = summary.get(row["result"], 0) + 1
+    return jsonify({"operation": operation, "results": rows, "summary": summary})
+
+#  Project page: one query loads the project, its version and its summed hours; the event, time entry
+#  and assignment sections are rendered once per project version and served from cache after that
+project_detail_cache = TTLCache(ttl=app.config["PROJECT_DETAIL_CACHE_TTL"])
+
+def load_project_detail(project_id):
+    """(project with client and building, project:N version, SUM(hours)) in one query, or None"""
+    version = db.select(ScopeVersion.version).where(ScopeVersion.scope == f"project:{project_id}").scalar_subquery()
+    hours = (db.select(func.coalesce(func.sum(TimeEntry.hours), 0))
+             .where(TimeEntry.project_id == project_id).scalar_subquery())
+    return (
+        db.session.query(Project, func.coalesce(version, 0), hours)
+        .options(db.joinedload(Project.client), db.joinedload(Project.building))
+        .filter(Project.id == project_id)
+        .first()
+    )
+
+def render_project_sections(project, total_hours):
+    """Event and assignment counts plus the rendered time entry and tab sections of a project page"""
+    project_events = Event.query.filter_by(project_id=project.id)
+    events = project_events.filter(Event.recurrence_freq.is_(None)).order_by(Event.start_utc.desc()).all()
+    events = with_occurrences(events, project_events, utc_now())
+    assigned_users = (User.query.join(ProjectAssignment, ProjectAssignment.user_id == User.id)
+                      .filter(ProjectAssignment.project_id == project.id)
+                      .order_by(ProjectAssignment.assigned_at, ProjectAssignment.id)
+                      .all())
+    time_entries = (TimeEntry.query.options(db.joinedload(TimeEntry.user))
+                    .filter_by(project_id=project.id)
+                    .order_by(TimeEntry.timestamp.desc(), TimeEntry.id.desc())
+                    .all())
+    now_ts = time_module.time()
+    counts = {
+        'total_events': len(events),
+        'upcoming_events': len([e for e in events if e.start_utc > now_ts]),
+        'assigned_users': len(assigned_users),
+    }
+    time_html = Markup(render_template("project_detail_time.html", time_entries=time_entries,
+                                       total_hours=total_hours))
+    tabs_html = Markup(render_template("project_detail_tabs.html", events=events,
+                                       assigned_users=assigned_users))
+    return counts, time_html, tabs_html
+
 @app.route("/projects/<int:id>")
 @login_required
+@query_profile(budget=8)
 def project_detail(id):
     """View detailed information about a specific project"""
-    project = Project.query.get_or_404(id)
+    loaded = load_project_detail(id)
+    if loaded is None:
+        abort(404)
+    project, version, total_hours = loaded
 
     # Check permissions - employees see all, clients only see assigned projects
     if current_user.role == 'client':
         # Check if this client user is assigned to this project
-        assignment = ProjectAssignment.query.filter_by(project_id=id, user_id=current_user.id).first()
-        if not assignment:
+        if id not in accessible_project_ids():
             flash("Access denied. You are not assigned to this project.", "danger")
             return redirect(url_for("dashboard"))
 
-    # Get all events for this project
-    events = Event.query.filter_by(project_id=id).order_by(Event.start.desc()).all()
-
-    # Get assigned users (client users)
-    assigned_users = [assignment.user for assignment in project.assignments]
+    # Sections show local times and role-specific hints, so those are part of the key
+    key = (id, version, display_timezone(), current_user.role)
+    sections = project_detail_cache.get(key)
+    if sections is None:
+        sections = render_project_sections(project, total_hours)
+        project_detail_cache.set(key, sections)
+    counts, time_html, tabs_html = sections
 
-    # Get all clients and buildings for edit form (employees only)
-    clients = Client.query.order_by(Client.name).all() if current_user.role == 'employee' else []
-    buildings = Building.query.order_by(Building.name).all() if current_user.role == 'employee' else []
-
-    # Calculate stats
-    total_events = len(events)
-    upcoming_events = len([e for e in events if e.start > datetime.now()])
-    
     # Days until due date - ONLY calculate if project is NOT done
     days_until_due = None
     if project.due_date and project.status != "Done":
-        delta = project.due_date - datetime.now().date()
+        delta = project.due_date - datetime.now(get_zone(display_timezone())).date()
         days_until_due = delta.days
 
-    stats = {
-        'total_events': total_events,
-        'upcoming_events': upcoming_events,
-        'days_until_due': days_until_due,
-        'status': project.status
-    }
+    stats = dict(counts, days_until_due=days_until_due, status=project.status)
 
-    time_entries = TimeEntry.query.filter_by(project_id=id).all()
-    total_hours = sum(entry.hours for entry in time_entries)
-    
     return render_template("project_detail.html",
                            project=project,
-                           events=events,
-                           assigned_users=assigned_users,
-                           clients=clients,
-                           buildings=buildings,
                            stats=stats,
-                           time_entries=time_entries,
-                           total_hours=total_hours)
+                           time_html=time_html,
+                           tabs_html=tabs_html)
 
 #Events
+EVENT_TYPES = ("Proposal", "Survey", "Asbuilt", "Design", "Client Meeting",
+               "Drawings Created", "Drawings Printed", "Bill Sent")
+EVENT_STATUSES = ("Upcoming", "Completed", "Cancelled")
+EVENTS_PER_PAGE = 24
+
 @app.route("/events")
 @login_required  #  changes: Allow both employees and clients to view events
+@query_profile(budget=5, load=[db.joinedload(Event.project)])
 def events():
+    # Card view filters are applied in SQL; cards are paged by (start, id) cursors
+    filters = {
+        "event_type": request.args.get("event_type", "").strip(),
+        "status": request.args.get("status", "").strip(),
+        "project_id": request.args.get("project_id", type=int),
+    }
+
     #  changes: Filter events based on user role
     if current_user.role == 'employee':
         #  changes: Employees see all events
-        events_list = Event.query.order_by(Event.start.desc()).all()
-        projects_list = Project.query.all()
+        query = Event.query
     else:
         #  changes: Clients only see events for their assigned projects
-        assigned_project_ids = [pa.project_id for pa in current_user.project_assignments]
-        if assigned_project_ids:
-            events_list = Event.query.filter(Event.project_id.in_(assigned_project_ids)).order_by(Event.start.desc()).all()
-            projects_list = Project.query.filter(Project.id.in_(assigned_project_ids)).all()
+        if accessible_project_ids():
+            query = Event.query.filter(Event.project_id.in_(assigned_projects()))
         else:
-            events_list = []
-            projects_list = []
+            query = None
+
+    # Project pickers fetch from /api/typeahead; only the filtered project's name is needed here
+    filter_project = None
+    if filters["project_id"] and (current_user.role == 'employee' or filters["project_id"] in accessible_project_ids()):
+        filter_project = db.session.query(Project.id, Project.name).filter(Project.id == filters["project_id"]).first()
+
+    if query is None:
+        page = KeysetPage([], None, None)
+    else:
+        if filters["event_type"]:
+            query = query.filter(Event.event_type == filters["event_type"])
+        if filters["status"]:
+            query = query.filter(Event.status == filters["status"])
+        if filters["project_id"]:
+            query = query.filter(Event.project_id == filters["project_id"])
+        page = keyset_paginate(
+            with_load_profile(query),
+            [(Event.start_utc, True), (Event.id, True)],
+            lambda e: (e.start_utc, e.id),
+            EVENTS_PER_PAGE,
+            after=request.args.get("after"),
+            before=request.args.get("before"),
+        )
 
-    return render_template("events.html", events=events_list, projects=projects_list)
+    return render_template("events.html", events=page.items, page=page, filter_project=filter_project,
+                           filters=filters, active_filters={k: v for k, v in filters.items() if v},
+                           event_types=EVENT_TYPES, statuses=EVENT_STATUSES)
+
+@app.route("/events/<int:event_id>/edit-form")
+@login_required
+@employee_required
+def events_edit_form(event_id):
+    """Edit form fragment, fetched when a card's Edit button is clicked"""
+    event = Event.query.get_or_404(event_id)
+    return render_template("event_edit_form.html", e=event, event_types=EVENT_TYPES)
+
+def parse_range_param(value):
+    """Parse a range bound (date or ISO datetime) into an aware datetime.
+
+    Bounds without an offset are wall-clock times in the viewer's display zone.
+    """
+    dt = datetime.fromisoformat(value.strip().replace("Z", "+00:00"))
+    return dt if dt.tzinfo is not None else dt.replace(tzinfo=get_zone(display_timezone()))
+
+def event_span_error(start, end):
+    """Why an event's wall-clock span cannot be saved, or None"""
+    if start and end and end - start > MAX_EVENT_SPAN:
+        return f"events can last at most {MAX_EVENT_SPAN.days} days"
+    return None
+
+def events_in_range_query(range_start, range_end):
+    """Events overlapping [range_start, range_end) that the current user may see"""
+    start_ts, end_ts = range_start.timestamp(), range_end.timestamp()
+    query = (
+        db.session.query(
+            Event.id, Event.title, Event.event_type, Event.start_utc, Event.end_utc,
+            Event.notes, Event.project_id, Project.name.label("project_name")
+        )
+        .outerjoin(Project, Project.id == Event.project_id)
+        .filter(
+            Event.recurrence_freq.is_(None),
+            or_(Event.end_utc >= start_ts,
+                and_(Event.end_utc.is_(None), Event.start_utc >= start_ts))
+        )
+    )
+    query = visible_events(query)
+    return in_reach(query, start_ts, end_ts).order_by(Event.start_utc) if query is not None else None
+
+def visible_events(query, user=None):
+    """Restrict an Event query to what the user (default: current user) may see; None when that is nothing"""
+    user = user or current_user
+    if user.role == 'employee':
+        return query
+    if not accessible_project_ids(user):
+        return None
+    return query.filter(Event.project_id.in_(assigned_projects(user)))
+
+def calendar_item(event_id, title, event_type, start_utc, end_utc, project_id, project_name, notes, zone):
+    """FullCalendar event object for the JSON feed, with times as wall clock in `zone`"""
+    item = {
+        "id": event_id,
+        "title": title,
+        "start": from_epoch(start_utc, zone).strftime('%Y-%m-%dT%H:%M:%S'),
+        "className": "fc-event-" + (event_type.lower().replace(" ", "-") if event_type else "default"),
+        "extendedProps": {"eventType": event_type or "", "projectId": project_id or "",
+                          "project": project_name or "", "notes": notes or ""},
+    }
+    if end_utc is not None:
+        item["end"] = from_epoch(end_utc, zone).strftime('%Y-%m-%dT%H:%M:%S')
+    return item
+
+@app.route("/api/events")
+@login_required
+def events_feed():
+    """JSON event source for the calendar view, limited to the visible range.
+
+    The calendar runs with timeZone 'UTC' and no offsets on either side, so both the
+    range bounds and the returned times are wall clock in the viewer's display zone.
+    """
+    zone = display_timezone()
+    try:
+        range_start = parse_range_param(request.args["start"])
+        range_end = parse_range_param(request.args["end"])
+    except (KeyError, ValueError):
+        return jsonify({"error": "start and end must be ISO dates"}), 400
+
+    # Validators come from the scope counters alone, so an unchanged calendar answers 304 without an event query
+    etag, _ = feed_validators(current_user, feed_scopes(current_user, "user", None))
+    etag = hashlib.sha1(f"{etag}|{range_start.isoformat()}|{range_end.isoformat()}|{zone}".encode()).hexdigest()
+    if not is_resource_modified(request.environ, etag=etag):
+        resp = Response(status=304)
+        resp.set_etag(etag)
+        resp.cache_control.private = True
+        resp.cache_control.no_cache = True
+        return resp
+
+    query = events_in_range_query(range_start, range_end)
+    rows = query.all() if query is not None else []
+    series_query = visible_events(Event.query)
+    occurrences = (expand_occurrences(series_overlapping(series_query, range_start, range_end), range_start, range_end)
+                   if series_query is not None else [])
+
+    feed = [calendar_item(row.id, row.title, row.event_type, row.start_utc, row.end_utc, row.project_id,
+                          row.project_name, row.notes, zone)
+            for row in rows]
+    for o in occurrences:
+        item = calendar_item(o.id, o.title, o.event_type, o.start_utc, o.end_utc, o.project_id,
+                             o.project.name if o.project else None, o.notes, zone)
+        item["extendedProps"]["seriesId"] = o.id
+        # Identifies the occurrence for skip/override, in the series' own zone
+        item["extendedProps"]["occurrenceStart"] = o.start.strftime('%Y-%m-%dT%H:%M:%S')
+        feed.append(item)
+
+    resp = jsonify(feed)
+    resp.set_etag(etag)
+    resp.cache_control.private = True
+    resp.cache_control.no_cache = True
+    return resp
 
 @app.route("/events/create", methods=["POST"])
 @login_required
@@ -804,21 +2241,39 @@ def events_create():
     start = request.form.get("start")
     end = request.form.get("end", "").strip()
     notes = request.form.get("notes", "").strip()
+    series_id = request.form.get("series_id", type=int)
+    original_start = request.form.get("original_start", "").strip()
 
     if not title or not start:
         flash("Title and start are required", "warning")
+        return redirect(url_for("events"))
+    series = Event.query.get_or_404(series_id) if series_id and original_start else None
+    # New events live in the creator's zone; overrides share their series' zone
+    zone = series.timezone if series else display_timezone()
+    start, end = form_datetime(start, zone), form_datetime(end, zone)
+    span_error = event_span_error(start, end)
+    if span_error:
+        flash(f"Event not created: {span_error}.", "warning")
     else:
         ev = Event(
             title=title,
             event_type=event_type,
             project_id=int(project_id) if project_id else None,
-            start=datetime.fromisoformat(start),
-            end=datetime.fromisoformat(end) if end else None,
+            timezone=zone,
+            start=start,
+            end=end,
             notes=notes
         )
+        if series:
+            # Editing a single occurrence: store an override row that hides the generated one
+            ev.series_id = series.id
+            ev.original_start = datetime.fromisoformat(original_start)
+        else:
+            apply_recurrence_form(ev, request.form)
         db.session.add(ev)
         db.session.commit()
         flash("Event created", "success")
+        warn_double_booking(ev)
     return redirect(url_for("events"))
 
 @app.route("/events/edit/<int:event_id>", methods=["POST"])
@@ -826,15 +2281,25 @@ def events_create():
 @employee_required  #  changes: Only employees can edit events
 def events_edit(event_id):
     event = Event.query.get_or_404(event_id)
+    # Times are typed in the editor's zone but the event keeps its own
+    start = form_datetime(request.form["start"], event.timezone)
+    end = form_datetime(request.form.get("end"), event.timezone)
+    # Events already longer than the limit stay editable; they are flagged long_running and still found
+    span_error = None if event.long_running else event_span_error(start, end)
+    if span_error:
+        flash(f"Event not updated: {span_error}.", "warning")
+        return redirect(url_for("events"))
     event.title = request.form["title"].strip()
     event.event_type = request.form.get("event_type")
-    event.project_id = request.form.get("project_id")
-    event.start = datetime.fromisoformat(request.form["start"])
-    end = request.form.get("end", "").strip()
-    event.end = datetime.fromisoformat(end) if end else None
+    project_id = request.form.get("project_id")
+    event.project_id = int(project_id) if project_id else None
+    event.start, event.end = start, end
     event.notes = request.form.get("notes", "").strip()
+    if event.series_id is None:
+        apply_recurrence_form(event, request.form)
     db.session.commit()
     flash("Event updated successfully.", "success")
+    warn_double_booking(event)
     return redirect(url_for("events"))
 
 @app.route("/events/delete/<int:event_id>", methods=["POST"])
@@ -842,11 +2307,494 @@ def events_edit(event_id):
 @employee_required  #  changes: Only employees can delete events
 def events_delete(event_id):
     event = Event.query.get_or_404(event_id)
+    # Deleting a series also removes its single-occurrence overrides
+    for override in Event.query.filter_by(series_id=event.id).all():
+        EventReminder.query.filter_by(event_id=override.id).delete(synchronize_session=False)
+        db.session.delete(override)
+    EventReminder.query.filter_by(event_id=event.id).delete(synchronize_session=False)
     db.session.delete(event)
     db.session.commit()
     flash("Event deleted.", "info")
     return redirect(url_for("events"))
 
+@app.route("/events/<int:event_id>/skip", methods=["POST"])
+@login_required
+@employee_required
+def events_skip_occurrence(event_id):
+    """Cancel one occurrence of a recurring event by recording it as an exception"""
+    series = Event.query.get_or_404(event_id)
+    occurrence = request.form.get("occurrence", "").strip()
+    if not series.is_recurring or not occurrence:
+        flash("Only occurrences of recurring events can be skipped.", "warning")
+        return redirect(url_for("events"))
+    series.add_exdate(datetime.fromisoformat(occurrence))
+    db.session.commit()
+    flash("Occurrence skipped.", "info")
+    return redirect(url_for("events"))
+
+# ---- Free/busy ----
+FREEBUSY_MAX_WINDOW = timedelta(days=366)
+
+def id_list_param(name):
+    """Integer ids from ?name=1,2&name=3"""
+    ids = set()
+    for value in request.args.getlist(name):
+        ids.update(int(part) for part in value.split(",") if part.strip())
+    return ids
+
+def busy_intervals(project_ids, window_start, window_end):
+    """Sorted (start, end) epoch-second pairs of non-cancelled events in the projects overlapping the window"""
+    default = app.config["FREEBUSY_DEFAULT_MINUTES"] * 60
+    start_ts, end_ts = int(window_start.timestamp()), int(window_end.timestamp())
+    not_cancelled = or_(Event.status.is_(None), Event.status != "Cancelled")
+    rows = in_reach(
+        db.session.query(Event.start_utc, Event.end_utc)
+        .filter(
+            Event.project_id.in_(project_ids),
+            Event.recurrence_freq.is_(None),
+            not_cancelled,
+            or_(Event.end_utc > start_ts,
+                and_(Event.end_utc.is_(None), Event.start_utc > start_ts - default))
+        ),
+        start_ts, end_ts
+    ).order_by(Event.start_utc)
+    singles = ((start, end if end and end > start else start + default) for start, end in rows)
+    series_start = window_start - timedelta(seconds=default)
+    series = series_overlapping(Event.query.filter(Event.project_id.in_(project_ids), not_cancelled),
+                                series_start, window_end)
+    occurrences = ((o.start_utc, o.end_utc if o.end_utc and o.end_utc > o.start_utc else o.start_utc + default)
+                   for o in expand_occurrences(series, series_start, window_end))
+    return heapq.merge(singles, occurrences)
+
+@app.route("/api/freebusy")
+@login_required
+@employee_required
+def freebusy():
+    """Merged busy blocks and free slots for a set of projects, buildings or client users"""
+    try:
+        window_start = parse_range_param(request.args["start"])
+        window_end = parse_range_param(request.args["end"])
+        min_duration = request.args.get("min_minutes", 30, type=int) * 60
+        project_ids = id_list_param("project_id")
+        building_ids = id_list_param("building_id")
+        user_ids = id_list_param("user_id")
+    except (KeyError, ValueError):
+        return jsonify({"error": "start and end must be ISO dates and ids must be integers"}), 400
+    if window_end <= window_start or window_end - window_start > FREEBUSY_MAX_WINDOW:
+        return jsonify({"error": "window must be positive and at most 366 days"}), 400
+
+    if building_ids:
+        project_ids |= {pid for (pid,) in db.session.query(Project.id).filter(Project.building_id.in_(building_ids))}
+    if user_ids:
+        project_ids |= {pid for (pid,) in db.session.query(ProjectAssignment.project_id)
+                        .filter(ProjectAssignment.user_id.in_(user_ids))}
+    if not project_ids and not (building_ids or user_ids):
+        return jsonify({"error": "give at least one project_id, building_id or user_id"}), 400
+
+    start_ts, end_ts = int(window_start.timestamp()), int(window_end.timestamp())
+    busy = merge_intervals(busy_intervals(project_ids, window_start, window_end)) if project_ids else []
+    busy = [(max(s, start_ts), min(e, end_ts)) for s, e in busy if e > start_ts]
+    free = free_slots(busy, start_ts, end_ts, min_duration)
+
+    # Answered in the caller's display zone, with explicit offsets
+    zone = get_zone(display_timezone())
+    fmt = lambda ts: datetime.fromtimestamp(ts, zone).isoformat()
+    return jsonify({
+        "timezone": zone.key,
+        "start": fmt(start_ts),
+        "end": fmt(end_ts),
+        "busy": [[fmt(s), fmt(e)] for s, e in busy],
+        "free": [[fmt(s), fmt(e)] for s, e in free],
+    })
+
+# ---- iCalendar subscription feeds ----
+def feed_scopes(user, kind, object_id):
+    """Change-counter scopes whose versions identify the current state of a feed"""
+    if kind == "project":
+        return [f"project:{object_id}"]
+    if kind == "building":
+        return [f"building:{object_id}"]
+    if user.role == 'employee':
+        return ["events"]
+    return [f"user:{user.id}"] + [f"project:{pid}" for pid in sorted(accessible_project_ids(user))]
+
+def feed_validators(user, scopes):
+    """(etag, last_modified) for a feed, read from the scope counters only"""
+    rows = ScopeVersion.query.filter(ScopeVersion.scope.in_(scopes)).all()
+    versions = {row.scope: row.version for row in rows}
+    key = "|".join([user.role] + [f"{scope}={versions.get(scope, 0)}" for scope in sorted(scopes)])
+    last_modified = max((row.updated_at for row in rows), default=None)
+    return hashlib.sha1(key.encode()).hexdigest(), last_modified
+
+def event_ics_properties(event, project_name, host, stamp):
+    """VEVENT properties for an event row (series and overrides included).
+
+    One-off events are written in UTC. Series are written as wall clock with their IANA
+    TZID so subscribers repeat them across DST the way we do; overrides share that zone.
+    """
+    props = [
+        ("UID", f"event-{event.series_id or event.id}@{host}"),
+        ("DTSTAMP", stamp),
+    ]
+    if event.is_recurring:
+        tzid = f";TZID={event.timezone}"
+        props.append(("DTSTART" + tzid, event.start))
+        if event.end:
+            props.append(("DTEND" + tzid, event.end))
+    else:
+        props.append(("DTSTART", utc_moment(event.start_utc)))
+        if event.end_utc is not None:
+            props.append(("DTEND", utc_moment(event.end_utc)))
+    if event.series_id:
+        props.append((f"RECURRENCE-ID;TZID={event.timezone}", event.original_start))
+    props.append(("SUMMARY", ical.escape_text(event.title)))
+    if event.event_type:
+        props.append(("CATEGORIES", ical.escape_text(event.event_type)))
+    description = "\n".join(filter(None, [f"Project: {project_name}" if project_name else None, event.notes]))
+    if description:
+        props.append(("DESCRIPTION", ical.escape_text(description)))
+    props.append(("STATUS", "CANCELLED" if event.status == "Cancelled" else "CONFIRMED"))
+    if event.is_recurring:
+        rule = f"FREQ={event.recurrence_freq};INTERVAL={event.recurrence_interval or 1}"
+        # With a TZID on DTSTART, UNTIL must be given in UTC
+        utc_until = lambda local: ical.format_datetime(utc_moment(to_epoch(local, event.timezone)))
+        if event.recurrence_count and event.recurrence_until:
+            # RFC 5545 allows only one of COUNT/UNTIL; the earlier bound wins
+            rule += f";UNTIL={utc_until(event.recurrence.last_start())}"
+        elif event.recurrence_count:
+            rule += f";COUNT={event.recurrence_count}"
+        elif event.recurrence_until:
+            rule += f";UNTIL={utc_until(event.recurrence_until)}"
+        props.append(("RRULE", rule))
+        if event.exdates:
+            props.append((f"EXDATE;TZID={event.timezone}", ",".join(ical.format_datetime(d) for d in event.exdates)))
+    return props
+
+def feed_timezones(query):
+    """A VTIMEZONE for each zone the feed's series and overrides name in TZID parameters"""
+    zoned = (query.with_entities(Event.timezone, func.min(Event.start))
+             .filter(or_(Event.recurrence_freq.isnot(None), Event.series_id.isnot(None)))
+             .group_by(Event.timezone))
+    this_year = datetime.utcnow().year
+    return [ical.vtimezone(zone, min(first.year, this_year), this_year) for zone, first in zoned]
+
+def feed_events(query, host):
+    """Stream VEVENT property lists straight from the database cursor"""
+    stamp = datetime.utcnow().replace(microsecond=0).strftime("%Y%m%dT%H%M%SZ")
+    for event, project_name in query.order_by(Event.id).yield_per(500):
+        yield event_ics_properties(event, project_name, host, stamp)
+
+@app.route("/calendar/<token>/me.ics", defaults={"kind": "user", "object_id": None})
+@app.route("/calendar/<token>/<any(project, building):kind>/<int:object_id>.ics")
+def calendar_feed(token, kind, object_id):
+    """Token-authenticated .ics feed for calendar apps (no session login)"""
+    user = User.query.filter_by(calendar_token=token).first()
+    if user is None:
+        abort(404)
+
+    query = db.session.query(Event, Project.name).outerjoin(Project, Project.id == Event.project_id)
+    if kind == "user":
+        name = f"{user.name} - Events"
+        query = visible_events(query, user)
+    elif kind == "project":
+        project = Project.query.get_or_404(object_id)
+        if user.role != 'employee' and object_id not in accessible_project_ids(user):
+            abort(404)
+        name = project.name
+        query = query.filter(Event.project_id == object_id)
+    else:
+        building = Building.query.get_or_404(object_id)
+        if user.role != 'employee':
+            abort(404)
+        name = building.name
+        query = query.filter(Project.building_id == object_id)
+
+    etag, last_modified = feed_validators(user, feed_scopes(user, kind, object_id))
+    if not is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+        resp = Response(status=304)
+    else:
+        components = feed_events(query, request.host) if query is not None else []
+        timezones = feed_timezones(query) if query is not None else []
+        lines = ical.calendar_lines(name, components, timezones)
+        resp = Response(stream_with_context(ical.chunked(lines)), mimetype="text/calendar")
+    resp.set_etag(etag)
+    resp.last_modified = last_modified
+    resp.cache_control.private = True
+    resp.cache_control.no_cache = True
+    return resp
+
+@app.route("/calendar/feeds")
+@login_required
+def calendar_feeds():
+    """Subscription URLs for the current user's calendars"""
+    if not current_user.calendar_token:
+        current_user.reset_calendar_token()
+        db.session.commit()
+    return render_template("calendar_feeds.html", projects=get_user_projects(),
+                           buildings=Building.query.order_by(Building.name).all() if current_user.role == 'employee' else [])
+
+@app.route("/calendar/feeds/reset", methods=["POST"])
+@login_required
+def calendar_feeds_reset():
+    """Issue a new token, invalidating every previously shared feed URL"""
+    current_user.reset_calendar_token()
+    db.session.commit()
+    flash("Calendar links regenerated. Update your calendar subscriptions.", "info")
+    return redirect(url_for("calendar_feeds"))
+
+# ---- Bulk event import (CSV / ICS) ----
+MAX_REPORTED_REJECTS = 200
+
+def project_lookup():
+    """Map lower-cased project names to ids (None when ambiguous), plus the set of ids"""
+    by_name, ids = {}, set()
+    for pid, name in db.session.query(Project.id, Project.name):
+        ids.add(pid)
+        key = name.strip().lower()
+        by_name[key] = None if key in by_name else pid
+    return by_name, ids
+
+def resolve_project(value, lookup):
+    by_name, ids = lookup
+    value = (value or "").strip()
+    if not value:
+        return None
+    if value.isdigit() and int(value) in ids:
+        return int(value)
+    key = value.lower()
+    if key not in by_name:
+        raise ValueError(f"unknown project '{value}'")
+    if by_name[key] is None:
+        raise ValueError(f"ambiguous project name '{value}', use the id")
+    return by_name[key]
+
+def parse_import_datetime(value):
+    value = (value or "").strip()
+    return datetime.fromisoformat(value) if value else None
+
+def csv_event_records(stream):
+    """Yield (line, record) from a CSV with title/event_type/project/start/end/timezone/status/notes columns"""
+    reader = csv.DictReader(stream)
+    for row in reader:
+        row = {(k or "").strip().lower(): (v or "").strip() for k, v in row.items()}
+        try:
+            start = parse_import_datetime(row.get("start"))
+            end = parse_import_datetime(row.get("end"))
+        except ValueError:
+            yield reader.line_num, ValueError("start/end must be ISO date-times")
+            continue
+        yield reader.line_num, {
+            "title": row.get("title"),
+            "event_type": row.get("event_type") or row.get("type"),
+            "project": row.get("project") or row.get("project_id") or row.get("project_name"),
+            "start": start,
+            "end": end,
+            "timezone": row.get("timezone"),
+            "status": row.get("status"),
+            "notes": row.get("notes"),
+        }
+
+def ics_event_zone(tzid):
+    """Zone an imported event is stored in: its own TZID when we know it, else the default"""
+    return tzid if tzid != "UTC" and is_valid_timezone(tzid) else app.config["DEFAULT_TIMEZONE"]
+
+def ics_wall_clock(dt, tzid, zone):
+    """Convert an ICS date-time to wall-clock time in the event's zone"""
+    if tzid is None or (tzid != "UTC" and not is_valid_timezone(tzid)):
+        return dt  # floating time, or a zone we cannot resolve: keep the wall clock
+    return to_local(dt.replace(tzinfo=timezone.utc if tzid == "UTC" else ZoneInfo(tzid)), zone)
+
+def ics_event_records(stream):
+    """Yield (line, record) for each VEVENT of an ICS stream, including RRULE/EXDATE"""
+    for line, props in ical.parse_events(stream):
+        try:
+            if "RECURRENCE-ID" in props:
+                raise ValueError("single-occurrence overrides (RECURRENCE-ID) are not imported")
+            if "DTSTART" not in props:
+                raise ValueError("missing DTSTART")
+            start, tzid = ical.parse_datetime(props["DTSTART"][1], props["DTSTART"][0])
+            zone = ics_event_zone(tzid)
+            start = ics_wall_clock(start, tzid, zone)
+            end = None
+            if "DTEND" in props:
+                end = ics_wall_clock(*ical.parse_datetime(props["DTEND"][1], props["DTEND"][0]), zone)
+            description = ical.unescape_text(props.get("DESCRIPTION", ({}, ""))[1])
+            project = props.get("X-PROJECT", ({}, ""))[1]
+            if description.startswith("Project: "):
+                # Round-trips the DESCRIPTION written by our own .ics feeds
+                first, _, description = description.partition("\n")
+                project = project or first[len("Project: "):]
+            record = {
+                "title": ical.unescape_text(props.get("SUMMARY", ({}, ""))[1]),
+                "event_type": ical.unescape_text(props.get("CATEGORIES", ({}, ""))[1]).split(",")[0],
+                "project": project,
+                "start": start,
+                "end": end,
+                "timezone": zone,
+                "status": "Cancelled" if props.get("STATUS", ({}, ""))[1].upper() == "CANCELLED" else None,
+                "notes": description,
+            }
+            if "RRULE" in props:
+                rule = ical.parse_rrule(props["RRULE"][1])
+                record["recurrence_freq"] = rule.get("FREQ")
+                record["recurrence_interval"] = int(rule.get("INTERVAL", 1))
+                record["recurrence_count"] = int(rule["COUNT"]) if "COUNT" in rule else None
+                record["recurrence_until"] = (ics_wall_clock(*ical.parse_datetime(rule["UNTIL"]), zone)
+                                              if "UNTIL" in rule else None)
+                if "EXDATE" in props:
+                    params, value = props["EXDATE"]
+                    record["recurrence_exdates"] = [ics_wall_clock(*ical.parse_datetime(v, params), zone)
+                                                    for v in value.split(",")]
+        except ValueError as exc:
+            yield line, exc
+            continue
+        yield line, record
+
+def event_mapping(record, lookup):
+    """Validate one import record and return the column mapping for bulk insert"""
+    title = (record.get("title") or "").strip()
+    if not title:
+        raise ValueError("missing title")
+    if len(title) > 100:
+        raise ValueError("title longer than 100 characters")
+    zone = record.get("timezone") or app.config["DEFAULT_TIMEZONE"]
+    if not is_valid_timezone(zone):
+        raise ValueError(f"unknown time zone '{zone}'")
+    # Times with an explicit offset are converted into the event's zone
+    start, end = (to_local(d, zone) if d is not None and d.tzinfo else d
+                  for d in (record.get("start"), record.get("end")))
+    if start is None:
+        raise ValueError("missing start")
+    if end is not None and end < start:
+        raise ValueError("end is before start")
+    span_error = event_span_error(start, end)
+    if span_error:
+        raise ValueError(span_error)
+    status = (record.get("status") or "Upcoming").strip().capitalize()
+    if status not in EVENT_STATUSES:
+        raise ValueError(f"unknown status '{record.get('status')}'")
+    mapping = {
+        "title": title,
+        "event_type": (record.get("event_type") or None) and record["event_type"][:50],
+        "project_id": resolve_project(record.get("project"), lookup),
+        "start": start,
+        "end": end,
+        "timezone": zone,
+        # bulk inserts skip the mapper hooks, so derive the epoch columns here
+        "start_utc": to_epoch(start, zone),
+        "end_utc": to_epoch(end, zone),
+        "long_running": is_long_running(to_epoch(start, zone), to_epoch(end, zone)),
+        "status": status,
+        "notes": record.get("notes") or None,
+    }
+    freq = record.get("recurrence_freq")
+    if freq:
+        recurrence = Recurrence(start, freq.upper(), record.get("recurrence_interval"),
+                                record.get("recurrence_until"), record.get("recurrence_count"),
+                                record.get("recurrence_exdates") or ())
+        last = recurrence.last_start()
+        mapping.update(
+            recurrence_freq=recurrence.freq,
+            recurrence_interval=recurrence.interval,
+            recurrence_until=recurrence.until,
+            recurrence_count=recurrence.count,
+            recurrence_exdates=",".join(d.isoformat() for d in sorted(recurrence.exdates)) or None,
+            recurrence_end=last + (end - start if end else timedelta(0)) if last else None,
+        )
+    return mapping
+
+def import_events(records, batch_size=None):
+    """Validate (line, record) pairs and bulk-insert them in batches.
+
+    Memory stays flat: records are consumed lazily, at most one batch of
+    mappings is held at a time and only the first MAX_REPORTED_REJECTS
+    rejections are kept for the summary.
+    """
+    batch_size = batch_size or app.config["EVENT_IMPORT_BATCH_SIZE"]
+    lookup = project_lookup()
+    last_id = db.session.query(func.max(Event.id)).scalar() or 0  # rows above this are ours to index
+    summary = {"inserted": 0, "rejected": 0, "errors": []}
+    touched_projects, batch, batch_lines = set(), [], []
+
+    def reject(line, reason):
+        summary["rejected"] += 1
+        if len(summary["errors"]) < MAX_REPORTED_REJECTS:
+            summary["errors"].append((line, reason))
+
+    def flush_batch():
+        try:
+            db.session.bulk_insert_mappings(Event, batch)
+            db.session.commit()
+        except Exception as exc:
+            db.session.rollback()
+            for line in batch_lines:
+                reject(line, f"database error: {exc.__class__.__name__}")
+        else:
+            summary["inserted"] += len(batch)
+            touched_projects.update(m["project_id"] for m in batch if m["project_id"])
+        batch.clear()
+        batch_lines.clear()
+
+    for line, record in records:
+        if isinstance(record, Exception):
+            reject(line, str(record))
+            continue
+        try:
+            batch.append(event_mapping(record, lookup))
+            batch_lines.append(line)
+        except ValueError as exc:
+            reject(line, str(exc))
+            continue
+        if len(batch) >= batch_size:
+            flush_batch()
+    if batch:
+        flush_batch()
+
+    if summary["inserted"]:
+        # Bulk inserts bypass the session hooks: bump feed counters and drop the overlap index
+        connection = db.session.connection()
+        bump_scope_versions(connection, scopes_for_projects(connection, touched_projects))
+        reindex_search(connection, "event", after_id=last_id)
+        db.session.commit()
+        event_index.clear()
+    return summary
+
+def event_records(stream, fmt):
+    return ics_event_records(stream) if fmt == "ics" else csv_event_records(stream)
+
+@app.cli.command("import-events")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--format", "fmt", type=click.Choice(["csv", "ics"]), help="Defaults to the file extension.")
+@click.option("--batch-size", type=int, default=None, help="Rows per bulk insert.")
+def import_events_command(path, fmt, batch_size):
+    """Bulk-load events from a CSV or ICS file"""
+    fmt = fmt or ("ics" if path.lower().endswith(".ics") else "csv")
+    with open(path, encoding="utf-8-sig", newline="") as stream:
+        summary = import_events(event_records(stream, fmt), batch_size)
+    print(f"Imported {summary['inserted']} event(s), rejected {summary['rejected']}.")
+    for line, reason in summary["errors"]:
+        print(f"  line {line}: {reason}")
+
+@app.route("/events/import", methods=["POST"])
+@login_required
+@employee_required
+def events_import():
+    """Upload a CSV or ICS file of events"""
+    upload = request.files.get("file")
+    if not upload or not upload.filename:
+        flash("Choose a CSV or ICS file to import.", "warning")
+        return redirect(url_for("events"))
+    fmt = "ics" if upload.filename.lower().endswith(".ics") else "csv"
+    stream = io.TextIOWrapper(upload.stream, encoding="utf-8-sig", newline="")
+    summary = import_events(event_records(stream, fmt))
+    flash(f"Imported {summary['inserted']} event(s), rejected {summary['rejected']}.",
+          "success" if not summary["rejected"] else "warning")
+    if summary["errors"]:
+        shown = "; ".join(f"line {line}: {reason}" for line, reason in summary["errors"][:5])
+        more = f" (+{summary['rejected'] - 5} more)" if summary["rejected"] > 5 else ""
+        flash(f"Rejected rows - {shown}{more}", "warning")
+    return redirect(url_for("events"))
+
 #Generate Invoice and Proposal
 #Invoice route
 @app.route("/project/<int:id>/generate_invoice")
@@ -903,10 +2851,12 @@ def build_proposal_text(project):
 @app.route("/admin/users")
 @login_required
 @employee_required
+@query_profile(budget=4)
 def admin_users():
     """View and manage all users (employees only)"""
-    users = User.query.all()
-    return render_template("admin_users.html", users=users)
+    sort_by = request.args.get("sort", "name")
+    page = paginate_sorted(User.query, USER_SORTS, sort_by)
+    return render_template("admin_users.html", users=page.items, page=page, sort_by=sort_by)
 
 @app.route("/admin/users/<int:user_id>/change_role", methods=["POST"])
 @login_required
@@ -970,13 +2920,13 @@ def assign_client_to_project(project_id):
     user = User.query.get_or_404(int(user_id))
 
     #  changes: Check if already assigned
-    existing = ProjectAssignment.query.filter_by(project_id=project_id, user_id=user_id).first()
+    existing = ProjectAssignment.query.filter_by(project_id=project_id, user_id=user.id).first()
     if existing:
         flash(f"{user.name} is already assigned to this project.", "info")
         return redirect(url_for("projects"))
 
-    #  changes: Create assignment
-    assignment = ProjectAssignment(project_id=project_id, user_id=user_id)
+    #  changes: Create assignment (committing it drops the user's cached project access)
+    assignment = ProjectAssignment(project_id=project_id, user_id=user.id)
     db.session.add(assignment)
     db.session.commit()
     flash(f"{user.name} assigned to {project.name}.", "success")
@@ -992,7 +2942,7 @@ def unassign_client_from_project(project_id, user_id):
     project_name = assignment.project.name
 
     db.session.delete(assignment)
-    db.session.commit()
+    db.session.commit()  # also drops the user's cached project access
     flash(f"{user_name} removed from {project_name}.", "info")
     return redirect(url_for("projects"))
 
@@ -1000,6 +2950,11 @@ def unassign_client_from_project(project_id, user_id):
 @app.route("/notifications")
 @login_required
 @employee_required
+@query_profile(budget=8, load=[
+    db.selectinload(Notification.sender),
+    db.selectinload(Notification.recipient),
+    db.selectinload(Notification.project),
+])
 def notifications():
     """Inbox for employees: broadcast client messages + direct employee messages"""
 
@@ -1010,7 +2965,7 @@ def notifications():
         )
     )
 
-    notifications = base_query.order_by(Notification.created_at.desc()).all()
+    notifications = with_load_profile(base_query.order_by(Notification.created_at.desc())).all()
     unread_count = base_query.filter_by(is_read=False).count()
 
     # list of employees for the "send to employee" dropdown
@@ -1129,17 +3084,173 @@ def notification_detail(notification_id):
 
     return render_template("notification_detail.html", notification=n)
 
+# ---- Reminder scheduler (flask run-scheduler) ----
+class ReminderScheduler:
+    """Heap of upcoming reminders, filled from indexed range queries on Event.start_utc.
+
+    Only the next `lead + horizon` of events is ever loaded. The queue is
+    extended as time passes and reloaded when the 'events' change counter
+    moves; each reminder is re-checked against the database before it is
+    sent and recorded in EventReminder so restarts never send it twice.
+    Times are epoch seconds; lead and horizon are seconds.
+    """
+
+    def __init__(self, lead, horizon, batch_size):
+        self.lead = lead
+        self.horizon = horizon
+        self.batch_size = batch_size
+        self.heap = []  # (due_at, start_utc, event_id, occurrence_start)
+        self.queued = set()
+        self.loaded_until = None
+        self.events_version = None
+
+    def refill(self, now):
+        """Queue unsent reminders for events starting up to now + lead + horizon"""
+        version = scope_versions(("events",))
+        if version != self.events_version:
+            # Something changed: rescan the whole loaded window, not just the new slice
+            self.events_version = version
+            self.loaded_until = None
+        window_start = max(self.loaded_until or now, now)
+        window_end = now + self.lead + self.horizon
+        if window_start >= window_end:
+            return
+        not_cancelled = or_(Event.status.is_(None), Event.status != "Cancelled")
+        upcoming = (
+            db.session.query(Event.id, Event.start, Event.start_utc)
+            .filter(Event.recurrence_freq.is_(None), not_cancelled,
+                    Event.start_utc >= window_start, Event.start_utc < window_end)
+            .order_by(Event.start_utc)
+            .all()
+        )
+        series = series_overlapping(Event.query.filter(not_cancelled),
+                                    utc_moment(window_start), utc_moment(window_end))
+        upcoming += [(o.id, o.start, o.start_utc)
+                     for o in expand_occurrences(series, utc_moment(window_start), utc_moment(window_end))
+                     if o.start_utc >= window_start]
+        # Reminders are keyed by the wall-clock occurrence start, so look them up by event
+        sent = set()
+        event_ids = sorted({event_id for event_id, _, _ in upcoming})
+        for i in range(0, len(event_ids), 500):
+            sent.update(
+                db.session.query(EventReminder.event_id, EventReminder.occurrence_start)
+                .filter(EventReminder.event_id.in_(event_ids[i:i + 500]))
+            )
+        for event_id, start, start_utc in upcoming:
+            key = (event_id, start)
+            if key in sent or key in self.queued:
+                continue
+            self.queued.add(key)
+            heapq.heappush(self.heap, (max(start_utc - self.lead, now), start_utc, event_id, start))
+        self.loaded_until = window_end
+        db.session.rollback()  # end the read transaction between ticks
+
+    def pop_due(self, now):
+        due = []
+        while self.heap and self.heap[0][0] <= now and len(due) < self.batch_size:
+            _, start_utc, event_id, start = heapq.heappop(self.heap)
+            self.queued.discard((event_id, start))
+            due.append((event_id, start, start_utc))
+        return due
+
+    def send(self, due, now):
+        """Create one broadcast Notification per still-valid reminder, in one transaction"""
+        events_by_id = {e.id: e for e in Event.query.filter(Event.id.in_({eid for eid, _, _ in due}))}
+        already = set(
+            db.session.query(EventReminder.event_id, EventReminder.occurrence_start)
+            .filter(EventReminder.event_id.in_(events_by_id),
+                    EventReminder.occurrence_start.in_({start for _, start, _ in due}))
+        )
+        reminders, notifications = [], []
+        for event_id, start, start_utc in due:
+            event = events_by_id.get(event_id)
+            if event is None or event.status == "Cancelled" or (event_id, start) in already or start_utc <= now:
+                continue
+            if event.is_recurring:
+                if start not in event.recurrence.between(start, start + timedelta(microseconds=1)):
+                    continue
+                if to_epoch(start, event.timezone) != start_utc:
+                    continue  # the series moved to another zone since it was queued
+            elif event.start_utc != start_utc:
+                continue  # rescheduled since it was queued; the new time is queued on reload
+            reminders.append({"event_id": event_id, "occurrence_start": start, "sent_at": datetime.utcnow()})
+            where = f" for {event.project.name}" if event.project else ""
+            # Broadcast to every employee, so state the event's own zone
+            when = start.replace(tzinfo=get_zone(event.timezone)).strftime('%Y-%m-%d %H:%M %Z')
+            notifications.append({
+                "sender_id": None,
+                "recipient_id": None,
+                "project_id": event.project_id,
+                "message": f"Reminder: {event.title}{where} starts {when}.",
+                "created_at": datetime.utcnow(),
+                "is_read": False,
+            })
+        if not reminders:
+            db.session.rollback()
+            return 0
+        try:
+            db.session.bulk_insert_mappings(EventReminder, reminders)
+            db.session.bulk_insert_mappings(Notification, notifications)
+            db.session.commit()
+        except IntegrityError:
+            # Another scheduler instance sent (some of) these first
+            db.session.rollback()
+            return 0
+        return len(reminders)
+
+    def run_once(self, now=None):
+        now = now or int(time_module.time())
+        if self.loaded_until is None or now + self.lead + self.horizon / 2 >= self.loaded_until:
+            self.refill(now)
+        else:
+            # Cheap change check: a single primary-key lookup
+            if scope_versions(("events",)) != self.events_version:
+                self.refill(now)
+        sent = 0
+        while True:
+            due = self.pop_due(now)
+            if not due:
+                break
+            sent += self.send(due, now)
+        return sent
+
+    def seconds_until_next(self, now, poll_seconds):
+        if not self.heap:
+            return poll_seconds
+        return max(0, min(poll_seconds, self.heap[0][0] - now))
+
+@app.cli.command("run-scheduler")
+@click.option("--once", is_flag=True, help="Send the reminders that are due now and exit.")
+@click.option("--poll-seconds", default=60, help="How often to check for event changes.")
+def run_scheduler(once, poll_seconds):
+    """Turn upcoming events into reminder notifications"""
+    scheduler = ReminderScheduler(
+        lead=app.config["REMINDER_LEAD_MINUTES"] * 60,
+        horizon=app.config["REMINDER_HORIZON_MINUTES"] * 60,
+        batch_size=app.config["REMINDER_BATCH_SIZE"],
+    )
+    while True:
+        sent = scheduler.run_once()
+        if sent:
+            print(f"{datetime.now():%Y-%m-%d %H:%M:%S} sent {sent} reminder(s)")
+        if once:
+            return
+        time_module.sleep(scheduler.seconds_until_next(int(time_module.time()), poll_seconds) or 0.5)
+
 def unread_notification_count():
     if not current_user.is_authenticated or current_user.role != 'employee':
         return 0
 
-    return Notification.query.filter(
-        Notification.is_read == False,
-        or_(
-            Notification.recipient_id == None,
-            Notification.recipient_id == current_user.id
-        )
-    ).count()
+    # Counted once per request, however many templates (page and fragments) are rendered
+    if "unread_notifications" not in g:
+        g.unread_notifications = Notification.query.filter(
+            Notification.is_read == False,
+            or_(
+                Notification.recipient_id == None,
+                Notification.recipient_id == current_user.id
+            )
+        ).count()
+    return g.unread_notifications
 
 @app.context_processor
 def inject_notification_count():
@@ -1149,8 +3260,10 @@ def inject_notification_count():
 
 @app.route('/timecard', methods=['GET', 'POST'])
 @login_required
+@query_profile(budget=10)  # first entry of a day: rollup and scope_version rows are inserted, not updated
 def timecard():
-    projects = Project.query.all()
+    # Quick-pick buttons only; the search box fetches matches from /api/typeahead
+    projects = Project.query.order_by(Project.id).limit(5).all()
 
     if request.method == 'POST':
         project_id = request.form.get('project_id')
@@ -1178,110 +3291,489 @@ def timecard():
 
 from datetime import date, timedelta
 
-@app.route("/reports")
-@login_required
-@employee_required  # Only employees can view reports
-def reports():
-    """Project analytics and reporting dashboard"""
-    
-    # Get all projects with related data
-    projects = Project.query.all()
-    
-    # Prepare data for frontend
-    project_data = []
-    for p in projects:
-        # Calculate project age
-        if p.created_at:  # If you have a created_at field
-            age_days = (date.today() - p.created_at.date()).days
-        else:
-            # Fallback: estimate from first activity or use a default
-            first_activity = Activity.query.filter_by(project_id=p.id).order_by(Activity.happened_at).first()
-            if first_activity:
-                age_days = (datetime.now().date() - first_activity.happened_at.date()).days
-            else:
-                age_days = 0
-        
-        # Calculate total hours logged
-        total_hours = db.session.query(func.sum(TimeEntry.hours)).filter(
-            TimeEntry.project_id == p.id
-        ).scalar() or 0
-        
-        project_data.append({
-            'id': p.id,
-            'name': p.name,
-            'status': p.status,
-            'client': p.client.name if p.client else 'No Client',
-            'dueDate': p.due_date.isoformat() if p.due_date else None,
-            'ageDays': age_days,
+#  Report builder shared by the reports page and its API: every column comes from one query,
+#  with hours and activities summed per project from the daily rollups in grouped subqueries
+def project_report(status=None, start=None, end=None):
+    """One dict per project (id order) with its status, client, due date, age and hours logged.
+
+    `start`/`end` (dates, inclusive) limit the hours to those logged on days in that range.
+    """
+    hours = db.select(ProjectDailyHours.project_id, func.sum(ProjectDailyHours.hours).label("hours"))
+    if start:
+        hours = hours.where(ProjectDailyHours.day >= start)
+    if end:
+        hours = hours.where(ProjectDailyHours.day <= end)
+    hours = hours.group_by(ProjectDailyHours.project_id).subquery()
+    first_activity = (db.select(ProjectDailyActivity.project_id, func.min(ProjectDailyActivity.day).label("day"))
+                      .where(ProjectDailyActivity.activities > 0)
+                      .group_by(ProjectDailyActivity.project_id).subquery())
+    stmt = (
+        db.select(Project.id, Project.name, Project.status, Client.name, Project.due_date, Project.created_at,
+                  Project.description, first_activity.c.day, func.coalesce(hours.c.hours, 0))
+        .outerjoin(Client, Client.id == Project.client_id)
+        .outerjoin(hours, hours.c.project_id == Project.id)
+        .outerjoin(first_activity, first_activity.c.project_id == Project.id)
+        .order_by(Project.id)
+    )
+    if status:
+        stmt = stmt.where(Project.status == status)
+
+    today = date.today()
+    rows = []
+    for pid, name, status, client_name, due_date, created_at, description, first_seen, total_hours in db.session.execute(stmt):
+        # Age counts from creation; rows predating created_at fall back to their first activity
+        started = created_at.date() if created_at else first_seen
+        rows.append({
+            'id': pid,
+            'name': name,
+            'status': status,
+            'client': client_name or 'No Client',
+            'dueDate': due_date.isoformat() if due_date else None,
+            'ageDays': (today - started).days if started else 0,
             'hoursLogged': float(total_hours),
-            'description': p.description or ''
+            'description': description or ''
         })
-    
-    # Calculate summary statistics
+    return rows
+
+def report_stats(project_data):
     total_projects = len(project_data)
-    in_progress = len([p for p in project_data if p['status'] == 'In Progress'])
-    total_hours = sum(p['hoursLogged'] for p in project_data)
-    avg_age = sum(p['ageDays'] for p in project_data) / total_projects if total_projects > 0 else 0
-    
-    stats = {
+    return {
         'totalProjects': total_projects,
-        'inProgress': in_progress,
-        'totalHours': total_hours,
-        'avgAge': round(avg_age)
+        'inProgress': len([p for p in project_data if p['status'] == 'In Progress']),
+        'totalHours': sum(p['hoursLogged'] for p in project_data),
+        'avgAge': round(sum(p['ageDays'] for p in project_data) / total_projects) if total_projects else 0
     }
-    
+
+@app.route("/reports")
+@login_required
+@employee_required  # Only employees can view reports
+@query_profile(budget=3)
+def reports():
+    """Project analytics and reporting dashboard"""
+    project_data = project_report()
     return render_template(
         'reports.html',
         project_data=project_data,
-        stats=stats
+        stats=report_stats(project_data)
     )
 
 
-# OPTIONAL: Add API endpoint for dynamic data loading
 @app.route("/api/reports/data")
 @login_required
 @employee_required
+@query_profile(budget=2)
 def reports_data():
-    """API endpoint to get fresh report data without page reload"""
-    import json
-    from flask import jsonify
-    
+    """API endpoint to get fresh report data without page reload; `from`/`to` (YYYY-MM-DD) bound the hours"""
     status_filter = request.args.get('status', 'all')
-    
-    # Build query
-    query = Project.query
-    if status_filter != 'all':
-        query = query.filter(Project.status == status_filter)
-    
-    projects = query.all()
-    
-    # Prepare data
-    project_data = []
-    for p in projects:
-        # Calculate age
-        first_activity = Activity.query.filter_by(project_id=p.id).order_by(Activity.happened_at).first()
-        if first_activity:
-            age_days = (datetime.now().date() - first_activity.happened_at.date()).days
-        else:
-            age_days = 0
-        
-        # Get hours
-        total_hours = db.session.query(func.sum(TimeEntry.hours)).filter(
-            TimeEntry.project_id == p.id
-        ).scalar() or 0
-        
-        project_data.append({
-            'id': p.id,
-            'name': p.name,
-            'status': p.status,
-            'client': p.client.name if p.client else 'No Client',
-            'dueDate': p.due_date.isoformat() if p.due_date else None,
-            'ageDays': age_days,
-            'hoursLogged': float(total_hours)
-        })
-    
+    try:
+        start, end = (date.fromisoformat(request.args[k]) if request.args.get(k) else None for k in ('from', 'to'))
+    except ValueError:
+        return jsonify({"error": "from and to must be YYYY-MM-DD dates"}), 400
+    project_data = project_report(None if status_filter == 'all' else status_filter, start, end)
+    for row in project_data:
+        del row['description']
     return jsonify(project_data)
 
+#  Time series for the report charts: rollup rows bucketed and grouped in SQL, returned as columns
+TIMESERIES_BUCKETS = ("day", "week", "month")
+TIMESERIES_DEFAULT_SPAN = {"day": timedelta(days=30), "week": timedelta(weeks=26), "month": timedelta(days=365)}
+TIMESERIES_MAX_BUCKETS = 1000
+TIMESERIES_MAX_SERIES = 10
+
+def date_bucket(column, bucket, dialect_name):
+    """SQL expression for the first day of the day/week (Monday)/month holding a DATE column"""
+    if bucket == "day":
+        return column
+    if dialect_name == "sqlite":
+        modifiers = ("weekday 0", "-6 days") if bucket == "week" else ("start of month",)
+        return func.date(column, *modifiers, type_=db.Date)
+    days = func.weekday(column) if bucket == "week" else func.dayofmonth(column) - 1
+    return func.subdate(column, days, type_=db.Date)
+
+def bucket_start(day, bucket):
+    if bucket == "week":
+        return day - timedelta(days=day.weekday())
+    if bucket == "month":
+        return day.replace(day=1)
+    return day
+
+def bucket_starts(start, end, bucket):
+    """Every bucket start from the one holding `start` through the one holding `end`"""
+    current, starts = bucket_start(start, bucket), []
+    while current <= end:
+        starts.append(current)
+        if bucket == "month":
+            current = (current + timedelta(days=32)).replace(day=1)
+        else:
+            current += timedelta(days=7 if bucket == "week" else 1)
+    return starts
+
+def timeseries_labels(group_by, ids):
+    model = {"project": Project, "user": User, "client": Client}[group_by]
+    named = ids - {None}
+    labels = dict(db.session.query(model.id, model.name).filter(model.id.in_(named))) if named else {}
+    return {i: labels.get(i, "No client" if i is None else f"#{i}") for i in ids}
+
+@app.route("/api/reports/timeseries")
+@login_required
+@employee_required
+@query_profile(budget=3)
+def reports_timeseries():
+    """Hours (or activities) per day/week/month per project, user or client, as columns (JSON).
+
+    {"timestamps": [bucket start dates], "series": [{"id", "label", "other", "values": [one per timestamp]}]};
+    the `limit` largest series are kept and the rest are summed into one "Other" series with id "other" and
+    "other": true (id null is the "No client" group).
+    """
+    args = request.args
+    metric, bucket, group_by = args.get("metric", "hours"), args.get("bucket", "week"), args.get("group_by", "project")
+    if metric not in ("hours", "activities") or bucket not in TIMESERIES_BUCKETS \
+            or group_by not in ("project", "user", "client"):
+        return jsonify({"error": "metric must be hours or activities, bucket day, week or month, "
+                                 "and group_by project, user or client"}), 400
+    if metric == "activities" and group_by == "user":
+        return jsonify({"error": "activities can be grouped by project or client"}), 400
+    try:
+        end = date.fromisoformat(args["to"]) if args.get("to") else date.today()
+        start = date.fromisoformat(args["from"]) if args.get("from") else end - TIMESERIES_DEFAULT_SPAN[bucket]
+    except ValueError:
+        return jsonify({"error": "from and to must be YYYY-MM-DD dates"}), 400
+    starts = bucket_starts(start, end, bucket) if start <= end else []
+    if not starts or len(starts) > TIMESERIES_MAX_BUCKETS:
+        return jsonify({"error": f"from must not be after to, and the range may hold at most "
+                                 f"{TIMESERIES_MAX_BUCKETS} buckets"}), 400
+    limit = max(1, min(args.get("limit", TIMESERIES_MAX_SERIES, type=int), 50))
+
+    if metric == "hours":
+        rollup = UserDailyHours if group_by == "user" else ProjectDailyHours
+        value = rollup.hours
+    else:
+        rollup = ProjectDailyActivity
+        value = rollup.activities
+    if group_by == "user":
+        key = UserDailyHours.user_id
+    elif group_by == "client":
+        key = Project.client_id
+    else:
+        key = rollup.project_id
+    bucket_column = date_bucket(rollup.day, bucket, db.session.get_bind().dialect.name).label("bucket")
+    stmt = (db.select(bucket_column, key, func.sum(value))
+            .where(rollup.day >= starts[0], rollup.day <= end)
+            .group_by(bucket_column, key))
+    if group_by == "client":
+        stmt = stmt.join(Project, Project.id == rollup.project_id)
+
+    index = {day: i for i, day in enumerate(starts)}
+    columns = {}
+    for day, group_id, total in db.session.execute(stmt):
+        columns.setdefault(group_id, [0] * len(starts))[index[day]] += total or 0
+
+    ranked = sorted(columns, key=lambda group_id: -sum(columns[group_id]))
+    kept, rest = ranked[:limit], ranked[limit:]
+    labels = timeseries_labels(group_by, set(kept))
+    series = [{"id": group_id, "label": labels[group_id], "other": False, "values": columns[group_id]}
+              for group_id in kept]
+    if rest:
+        series.append({"id": "other", "label": "Other", "other": True,
+                       "values": [sum(column) for column in zip(*(columns[group_id] for group_id in rest))]})
+    if metric == "hours":
+        for entry in series:
+            entry["values"] = [round(v, 2) for v in entry["values"]]
+    return jsonify({"metric": metric, "bucket": bucket, "group_by": group_by,
+                    "from": starts[0].isoformat(), "to": end.isoformat(),
+                    "timestamps": [day.isoformat() for day in starts], "series": series})
+
+# ---- Exports ----
+# Projects, events and time entries streamed as CSV or XLSX straight from a server-side cursor
+EXPORT_DATASETS = ("projects", "events", "time-entries")
+EXPORT_MIMETYPES = {
+    "csv": "text/csv",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+def export_filters(get):
+    """Filters for an export from a str-or-None lookup (request.args.get or CLI options); ValueError if malformed"""
+    filters = {}
+    for name in ("project_id", "user_id", "client_id", "building_id"):
+        if get(name):
+            try:
+                filters[name] = int(get(name))
+            except ValueError:
+                raise ValueError(f"{name} must be a number")
+    for name in ("from", "to"):
+        if get(name):
+            try:
+                filters[name] = date.fromisoformat(get(name))
+            except ValueError:
+                raise ValueError(f"{name} must be a YYYY-MM-DD date")
+    for name in ("status", "event_type"):
+        if get(name):
+            filters[name] = get(name)
+    return filters
+
+def export_query(dataset, filters):
+    """(header, SELECT) of one export; `from`/`to` are inclusive UTC days; ValueError for a filter the dataset lacks"""
+    start = datetime.combine(filters["from"], time.min) if "from" in filters else None
+    end = datetime.combine(filters["to"] + timedelta(days=1), time.min) if "to" in filters else None
+    if dataset == "projects":
+        header = ["ID", "Name", "Status", "Client", "Building", "Due Date", "Created (UTC)", "Description"]
+        stmt = (db.select(Project.id, Project.name, Project.status, Client.name, Building.name, Project.due_date,
+                          Project.created_at, Project.description)
+                .outerjoin(Client, Client.id == Project.client_id)
+                .outerjoin(Building, Building.id == Project.building_id)
+                .order_by(Project.id))
+        conditions = {"project_id": Project.id, "client_id": Project.client_id,
+                      "building_id": Project.building_id, "status": Project.status}
+        if start:
+            stmt = stmt.where(Project.created_at >= start)
+        if end:
+            stmt = stmt.where(Project.created_at < end)
+    elif dataset == "events":
+        header = ["ID", "Title", "Type", "Status", "Project", "Start", "End", "Time Zone", "Repeats", "Notes"]
+        stmt = (db.select(Event.id, Event.title, Event.event_type, Event.status, Project.name, Event.start,
+                          Event.end, Event.timezone, Event.recurrence_freq, Event.notes)
+                .outerjoin(Project, Project.id == Event.project_id)
+                .order_by(Event.id))
+        conditions = {"project_id": Event.project_id, "client_id": Project.client_id,
+                      "building_id": Project.building_id, "status": Event.status, "event_type": Event.event_type}
+        if start:
+            stmt = stmt.where(Event.start_utc >= int(start.replace(tzinfo=timezone.utc).timestamp()))
+        if end:
+            stmt = stmt.where(Event.start_utc < int(end.replace(tzinfo=timezone.utc).timestamp()))
+    else:
+        header = ["ID", "Logged (UTC)", "User", "Email", "Project", "Client", "Hours", "Description"]
+        stmt = (db.select(TimeEntry.id, TimeEntry.timestamp, User.name, User.email, Project.name, Client.name,
+                          TimeEntry.hours, TimeEntry.description)
+                .outerjoin(User, User.id == TimeEntry.user_id)
+                .outerjoin(Project, Project.id == TimeEntry.project_id)
+                .outerjoin(Client, Client.id == Project.client_id)
+                .order_by(TimeEntry.id))
+        conditions = {"project_id": TimeEntry.project_id, "user_id": TimeEntry.user_id,
+                      "client_id": Project.client_id, "building_id": Project.building_id}
+        if start:
+            stmt = stmt.where(TimeEntry.timestamp >= start)
+        if end:
+            stmt = stmt.where(TimeEntry.timestamp < end)
+    unknown = sorted(set(filters) - set(conditions) - {"from", "to"})
+    if unknown:
+        raise ValueError(f"Not a filter for {dataset} exports: {', '.join(unknown)}")
+    for name, column in conditions.items():
+        if name in filters:
+            stmt = stmt.where(column == filters[name])
+    return header, stmt
+
+def export_rows(stmt):
+    """Row tuples fetched EXPORT_BATCH_SIZE at a time; nothing runs until the first row is asked for"""
+    result = db.session.execute(stmt.execution_options(yield_per=app.config["EXPORT_BATCH_SIZE"]))
+    for row in result:
+        yield tuple(row)
+
+def export_chunks(dataset, fmt, filters, compress=False):
+    header, stmt = export_query(dataset, filters)
+    writer = xlsx_chunks if fmt == "xlsx" else csv_chunks
+    chunks = writer(header, export_rows(stmt))
+    return gzip_chunks(chunks) if compress else chunks
+
+def export_filename(dataset, fmt, compress=False):
+    return f"{dataset}-{date.today():%Y-%m-%d}.{fmt}" + (".gz" if compress else "")
+
+@app.route("/export/<any(projects, events, 'time-entries'):dataset>.<any(csv, xlsx):fmt>")
+@login_required
+@employee_required
+def export_data(dataset, fmt):
+    """Download a dataset; filters: project_id, user_id, client_id, building_id, status, event_type, from, to; gzip=1
+
+    400 for a malformed filter or one the dataset lacks (user_id on projects, event_type outside events, ...)
+    """
+    compress = request.args.get("gzip") == "1"
+    try:
+        chunks = export_chunks(dataset, fmt, export_filters(request.args.get), compress)
+    except ValueError as exc:
+        abort(400, description=str(exc))
+    resp = Response(stream_with_context(chunks),
+                    mimetype="application/gzip" if compress else EXPORT_MIMETYPES[fmt])
+    resp.headers["Content-Disposition"] = f'attachment; filename="{export_filename(dataset, fmt, compress)}"'
+    resp.headers["X-Accel-Buffering"] = "no"  # let proxies pass chunks through as they come
+    return resp
+
+@app.cli.command("export")
+@click.argument("dataset", type=click.Choice(EXPORT_DATASETS))
+@click.option("--format", "fmt", type=click.Choice(["csv", "xlsx"]), default="csv")
+@click.option("--gzip", "compress", is_flag=True, help="Gzip the output.")
+@click.option("--output", "-o", type=click.Path(dir_okay=False, writable=True),
+              help="File to write; defaults to <dataset>-<date>.<format> in the current directory, '-' for stdout.")
+@click.option("--project-id")
+@click.option("--user-id")
+@click.option("--client-id")
+@click.option("--building-id")
+@click.option("--status")
+@click.option("--event-type")
+@click.option("--from", "from_")
+@click.option("--to")
+def export_command(dataset, fmt, compress, output, from_, **options):
+    """Stream projects, events or time entries to a CSV or XLSX file"""
+    options["from"] = from_
+    try:
+        chunks = export_chunks(dataset, fmt, export_filters(options.get), compress)
+    except ValueError as exc:
+        raise click.BadParameter(str(exc))
+    output = output or export_filename(dataset, fmt, compress)
+    stream = click.get_binary_stream("stdout") if output == "-" else open(output, "wb")
+    written = 0
+    try:
+        for chunk in chunks:
+            stream.write(chunk)
+            written += len(chunk)
+    finally:
+        if stream is not click.get_binary_stream("stdout"):
+            stream.close()
+    if output != "-":
+        print(f"Wrote {written} bytes to {output}.")
+
+# ---- Report jobs ----
+# Reports too heavy for a request run in a process pool (jobs.py); results are files keyed by spec and data version
+_report_jobs = None
+
+def report_jobs():
+    """The job runner, created on first use; its worker processes start with the first job"""
+    global _report_jobs
+    if _report_jobs is None:
+        _report_jobs = ReportJobs(app.config["REPORT_JOBS_DIR"], db.engine.url.render_as_string(hide_password=False),
+                                  workers=app.config["REPORT_JOB_WORKERS"])
+    return _report_jobs
+
+def report_job_json(job, version):
+    """A job's status plus whether it reflects the current data and where to fetch it"""
+    body = dict(job, current=job["version"] == version,
+                status_url=url_for("report_job_status", job_id=job["id"]))
+    if job["status"] == "done":
+        body["result_url"] = url_for("report_job_result", job_id=job["id"])
+        body["csv_url"] = url_for("report_job_result", job_id=job["id"], format="csv")
+    return body
+
+@app.route("/api/reports/jobs", methods=["POST"])
+@login_required
+@employee_required
+@query_profile(budget=2)
+def report_jobs_create():
+    """Start a report job, or find it done: {"report": "utilization", "fiscal_year", "fiscal_year_start_month", "hours_per_day"}"""
+    try:
+        spec = normalize_report_spec(request.get_json(silent=True), app.config["FISCAL_YEAR_START_MONTH"])
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    version, = scope_versions(("reports",))
+    job = report_jobs().submit(spec, version)
+    return jsonify(report_job_json(job, version)), 200 if job["status"] == "done" else 202
+
+@app.route("/api/reports/jobs/<job_id>")
+@login_required
+@employee_required
+@query_profile(budget=2)
+def report_job_status(job_id):
+    job = report_jobs().status(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown job"}), 404
+    version, = scope_versions(("reports",))
+    return jsonify(report_job_json(job, version))
+
+@app.route("/api/reports/jobs/<job_id>/result")
+@login_required
+@employee_required
+@query_profile(budget=1)
+def report_job_result(job_id):
+    """The finished result as JSON, or ?format=csv for its table"""
+    job = report_jobs().status(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown job"}), 404
+    if job["status"] != "done":
+        return jsonify({"error": f"Job is {job['status']}", "status": job["status"]}), 409
+    path = report_jobs().result_path(job_id)
+    if request.args.get("format") != "csv":
+        # A job id names one spec at one data version, so its result never changes
+        return send_file(path, mimetype="application/json", max_age=86400)
+    with open(path, encoding="utf-8") as stream:
+        header, rows = REPORT_JOB_TYPES[job["spec"]["report"]][1](json.load(stream))
+    spec = job["spec"]
+    resp = Response(stream_with_context(csv_chunks(header, rows)), mimetype="text/csv")
+    resp.headers["Content-Disposition"] = f'attachment; filename="{spec["report"]}-fy{spec["fiscal_year"]}.csv"'
+    return resp
+
+@app.cli.command("prune-report-jobs")
+@click.option("--days", type=int, default=7, show_default=True, help="Delete job files older than this.")
+def prune_report_jobs(days):
+    """Delete old report job results, including those for data that has since changed"""
+    removed = report_jobs().prune(days * 86400)
+    print(f"Removed {removed} report job files.")
+
+@app.cli.command("rebuild-rollups")
+@click.option("--since", type=click.DateTime(formats=["%Y-%m-%d"]), help="Only rebuild days from this date (UTC) on.")
+def rebuild_rollups(since):
+    """Recompute the daily hour and activity rollups from time entries and activities"""
+    since = since.date() if since else None
+    sources = (
+        (ProjectDailyHours, TimeEntry.timestamp, [TimeEntry.project_id],
+         [func.sum(TimeEntry.hours), func.count(TimeEntry.id)], TimeEntry.project_id.isnot(None)),
+        (UserDailyHours, TimeEntry.timestamp, [TimeEntry.user_id],
+         [func.sum(TimeEntry.hours), func.count(TimeEntry.id)], TimeEntry.user_id.isnot(None)),
+        (ProjectDailyActivity, Activity.happened_at, [Activity.project_id],
+         [func.count(Activity.id)], Activity.project_id.isnot(None)),
+    )
+    for model, stamp, keys, aggregates, present in sources:
+        table = model.__table__
+        delete, source = table.delete(), db.select(*keys, func.date(stamp), *aggregates).where(present, stamp.isnot(None))
+        if since:
+            delete = delete.where(table.c.day >= since)
+            source = source.where(stamp >= datetime.combine(since, time.min))
+        db.session.execute(delete)
+        columns = [column.name for column in table.columns]
+        db.session.execute(table.insert().from_select(columns, source.group_by(*keys, func.date(stamp))))
+        print(f"{table.name}: {db.session.query(model).count()} row(s)")
+    db.session.commit()
+
+@app.cli.command("benchmark-reports")
+@click.option("--sizes", default="10,100,1000", help="Comma-separated project counts to measure.")
+def benchmark_reports(sizes):
+    """Time the report builder and count its statements as projects grow (fails if the count grows)"""
+    sizes = sorted({int(n) for n in sizes.split(",") if n.strip()})
+    connection = db.session.connection()
+    now = datetime.utcnow()
+    counts = []
+    try:
+        user_id = connection.execute(User.__table__.insert().values(
+            email=f"benchmark-{secrets.token_hex(4)}@pms.local", name="Benchmark", role="employee",
+            password_hash="!", timezone=app.config["DEFAULT_TIMEZONE"])).inserted_primary_key[0]
+        client_id = connection.execute(Client.__table__.insert().values(name="Benchmark Client")).inserted_primary_key[0]
+        seeded = 0
+        print(f"{'projects':>10} {'statements':>11} {'ms':>9}")
+        for size in sizes:
+            # Core inserts skip the session hooks; the whole seed is rolled back below
+            for n in range(seeded, size):
+                project_id = connection.execute(Project.__table__.insert().values(
+                    name=f"Benchmark {n}", client_id=client_id, status="In Progress",
+                    created_at=now - timedelta(days=n % 365))).inserted_primary_key[0]
+                connection.execute(TimeEntry.__table__.insert(), [
+                    {"user_id": user_id, "project_id": project_id, "hours": 1.5, "timestamp": now} for _ in range(3)])
+                connection.execute(Activity.__table__.insert().values(
+                    user_id=user_id, project_id=project_id, happened_at=now))
+                # Core inserts bypass the rollup hook too, so the report's rollup rows are seeded directly
+                connection.execute(ProjectDailyHours.__table__.insert().values(
+                    project_id=project_id, day=now.date(), hours=4.5, entries=3))
+                connection.execute(ProjectDailyActivity.__table__.insert().values(
+                    project_id=project_id, day=now.date(), activities=1))
+            seeded = size
+            with app.test_request_context():
+                g.queries = RequestQueries()
+                started = time_module.perf_counter()
+                rows = project_report()
+                elapsed = (time_module.perf_counter() - started) * 1000
+                counts.append(g.queries.statements)
+            print(f"{len(rows):>10} {counts[-1]:>11} {elapsed:>9.1f}")
+    finally:
+        db.session.rollback()
+    if len(set(counts)) > 1:
+        raise click.ClickException(f"Report statement count grew with the project count: {counts}")
+    print("Statement count is constant.")
+
 
 # RECOMMENDED: Add a created_at field to Project model for accurate age calculation
 # Add this to your Project model:
@@ -0,0 +1,45 @@
+"""Process-local caches used by app.py.
+
+Entries are validated by the caller (usually against ScopeVersion counters),
+so these only need to bound staleness and size.
+"""
+from threading import Lock
+from time import monotonic
+
+
+class TTLCache:
+    """Small thread-safe dict whose entries expire ``ttl`` seconds after being set"""
+
+    def __init__(self, ttl, maxsize=1024):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data = {}
+        self._lock = Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            expires, value = entry
+            if expires < monotonic():
+                del self._data[key]
+                return default
+            return value
+
+    def set(self, key, value):
+        now = monotonic()
+        with self._lock:
+            if len(self._data) >= self.maxsize:
+                self._data = {k: v for k, v in self._data.items() if v[0] >= now}
+                if len(self._data) >= self.maxsize:
+                    self._data.pop(next(iter(self._data)))
+            self._data[key] = (now + self.ttl, value)
+
+    def pop(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
@@ -0,0 +1,281 @@
+"""Offline geocoding and nearest-site lookups used by app.py.
+
+Buildings are placed at the centroid of their ZIP code, read from a CSV of
+centroids (a small seed file ships with the app; point ZIP_CENTROIDS_PATH at
+a full dataset such as the Census ZCTA gazetteer). Located buildings are kept
+in a KD-tree over points on the unit sphere, so straight-line distance orders
+the same way as great-circle distance and nothing breaks near the poles or
+the antimeridian. Nothing in here touches Flask or the database.
+"""
+import csv
+import heapq
+from math import asin, cos, radians, sin, sqrt
+from threading import RLock
+
+EARTH_RADIUS_MILES = 3958.8
+
+_ZIP_COLUMNS = ("zip", "zipcode", "zcta", "geoid")
+_LAT_COLUMNS = ("lat", "latitude", "intptlat")
+_LON_COLUMNS = ("lon", "lng", "longitude", "intptlong")
+
+
+def haversine_miles(lat1, lon1, lat2, lon2):
+    """Great-circle distance between two points given in degrees"""
+    lat1, lon1, lat2, lon2 = map(radians, (lat1, lon1, lat2, lon2))
+    h = sin((lat2 - lat1) / 2) ** 2 + cos(lat1) * cos(lat2) * sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_MILES * asin(min(1.0, sqrt(h)))
+
+
+def normalize_zip(value):
+    """Five-digit ZIP from '08401', '8401' or '08401-1234'; None if it is not one"""
+    digits = str(value or "").strip().split("-")[0]
+    if not digits.isdigit() or len(digits) > 5:
+        return None
+    return digits.zfill(5)
+
+
+def _unit_vector(lat, lon):
+    lat, lon = radians(lat), radians(lon)
+    return (cos(lat) * cos(lon), cos(lat) * sin(lon), sin(lat))
+
+
+def _chord(miles):
+    """Straight-line distance on the unit sphere for a great-circle distance"""
+    return 2 * sin(min(miles / EARTH_RADIUS_MILES, 3.141592653589793) / 2)
+
+
+def _miles(chord):
+    return 2 * EARTH_RADIUS_MILES * asin(min(1.0, chord / 2))
+
+
+class ZipCentroids:
+    """ZIP code -> (lat, lon), falling back to the mean of the known ZIPs sharing its first three digits"""
+
+    def __init__(self, rows=()):
+        self.points = {}
+        self.prefixes = {}
+        for zipcode, lat, lon in rows:
+            self.add(zipcode, lat, lon)
+
+    @classmethod
+    def from_csv(cls, path):
+        """Read a comma- or tab-separated file with ZIP, latitude and longitude columns"""
+        with open(path, encoding="utf-8-sig", newline="") as stream:
+            sample = stream.readline()
+            stream.seek(0)
+            reader = csv.reader(stream, delimiter="\t" if "\t" in sample else ",")
+            header = [name.strip().lower() for name in next(reader, [])]
+            try:
+                zip_col = next(header.index(n) for n in _ZIP_COLUMNS if n in header)
+                lat_col = next(header.index(n) for n in _LAT_COLUMNS if n in header)
+                lon_col = next(header.index(n) for n in _LON_COLUMNS if n in header)
+            except StopIteration:
+                raise ValueError(f"{path}: expected ZIP, latitude and longitude columns")
+            centroids = cls()
+            for row in reader:
+                try:
+                    centroids.add(row[zip_col], float(row[lat_col]), float(row[lon_col]))
+                except (IndexError, ValueError):
+                    continue
+        return centroids
+
+    def add(self, zipcode, lat, lon):
+        zipcode = normalize_zip(zipcode)
+        if zipcode is None:
+            return
+        self.points[zipcode] = (lat, lon)
+        total = self.prefixes.get(zipcode[:3], (0, 0.0, 0.0))
+        self.prefixes[zipcode[:3]] = (total[0] + 1, total[1] + lat, total[2] + lon)
+
+    def locate(self, zipcode):
+        zipcode = normalize_zip(zipcode)
+        if zipcode is None:
+            return None
+        point = self.points.get(zipcode)
+        if point is None and zipcode[:3] in self.prefixes:
+            count, lat, lon = self.prefixes[zipcode[:3]]
+            point = (lat / count, lon / count)
+        return point
+
+    def __len__(self):
+        return len(self.points)
+
+
+class _KDNode:
+    __slots__ = ("point", "key", "axis", "left", "right", "deleted")
+
+    def __init__(self, point, key, axis, left=None, right=None):
+        self.point = point
+        self.key = key
+        self.axis = axis
+        self.left = left
+        self.right = right
+        self.deleted = False
+
+
+def _build(items, nodes, depth=0):
+    if not items:
+        return None
+    axis = depth % 3
+    items.sort(key=lambda item: item[0][axis])
+    mid = len(items) // 2
+    point, key = items[mid]
+    node = nodes[key] = _KDNode(point, key, axis,
+                                _build(items[:mid], nodes, depth + 1), _build(items[mid + 1:], nodes, depth + 1))
+    return node
+
+
+def _distance(a, b):
+    return sqrt((a[0] - b[0]) ** 2 + (a[1] - b[1]) ** 2 + (a[2] - b[2]) ** 2)
+
+
+class LocationIndex:
+    """Nearest-neighbour and radius search over keyed (lat, lon) points.
+
+    Writes apply to the KD-tree in place: a new point is hung off the leaf it
+    falls under and a removed one is left as a tombstone that queries skip.
+    Once the changes since the last build outnumber half the points, or an
+    insert lands deeper than about 2*log2(n), the next query rebuilds a
+    balanced tree, so a write costs O(log n) amortized and no query walks a
+    degenerate chain.
+    Keys upserted without coordinates are kept in ``unlocated``.
+    """
+
+    REBUILD_AFTER = 64  # changes tolerated before a rebuild, however few points there are
+    MAX_DEPTH_FACTOR = 2  # an insert deeper than this times log2(n) triggers a rebuild
+
+    def __init__(self):
+        self._lock = RLock()
+        self.points = {}
+        self.unlocated = set()
+        self._tree = None
+        self._nodes = {}
+        self._changes = 0
+        self._stale = False
+        self.loaded = False
+
+    def clear(self):
+        with self._lock:
+            self.points = {}
+            self.unlocated = set()
+            self._tree = None
+            self._nodes = {}
+            self._changes = 0
+            self._stale = False
+            self.loaded = False
+
+    def load(self, rows):
+        """Rebuild from (key, lat, lon) rows; rows without coordinates are recorded as unlocated"""
+        with self._lock:
+            self.points, self.unlocated = {}, set()
+            for key, lat, lon in rows:
+                if lat is None or lon is None:
+                    self.unlocated.add(key)
+                else:
+                    self.points[key] = (lat, lon)
+            self._stale = True
+            self.loaded = True
+
+    def upsert(self, key, lat, lon):
+        with self._lock:
+            if lat is None or lon is None:
+                self.remove(key)
+                self.unlocated.add(key)
+            elif self.points.get(key) != (lat, lon):
+                self.unlocated.discard(key)
+                self._unlink(key)
+                self.points[key] = (lat, lon)
+                self._insert(key, _unit_vector(lat, lon))
+
+    def remove(self, key):
+        with self._lock:
+            self.unlocated.discard(key)
+            if self.points.pop(key, None) is not None:
+                self._unlink(key)
+
+    def _unlink(self, key):
+        node = self._nodes.pop(key, None)
+        if node is not None:
+            node.deleted = True
+            self._changed()
+
+    def _insert(self, key, point):
+        if self._stale:
+            return
+        parent, node, depth = None, self._tree, 0
+        while node is not None:
+            parent, node = node, node.left if point[node.axis] < node.point[node.axis] else node.right
+            depth += 1
+        node = self._nodes[key] = _KDNode(point, key, 0 if parent is None else (parent.axis + 1) % 3)
+        if parent is None:
+            self._tree = node
+        elif point[parent.axis] < parent.point[parent.axis]:
+            parent.left = node
+        else:
+            parent.right = node
+        self._changed()
+        # Buildings sharing a ZIP centroid all descend the same path; rebuild before it turns into a chain
+        if depth > self.MAX_DEPTH_FACTOR * max(len(self.points), 2).bit_length():
+            self._stale = True
+
+    def _changed(self):
+        self._changes += 1
+        if self._changes > max(self.REBUILD_AFTER, len(self.points) // 2):
+            self._stale = True
+
+    def _root(self):
+        with self._lock:
+            if self._stale:
+                self._nodes = {}
+                self._tree = _build([(_unit_vector(lat, lon), key) for key, (lat, lon) in self.points.items()],
+                                    self._nodes)
+                self._changes = 0
+                self._stale = False
+            return self._tree
+
+    def within(self, lat, lon, miles, exclude=None):
+        """(key, miles) of every point within ``miles`` of (lat, lon), nearest first"""
+        target, limit = _unit_vector(lat, lon), _chord(miles)
+        found, stack = [], [self._root()]
+        while stack:
+            node = stack.pop()
+            if node is None:
+                continue
+            d = _distance(target, node.point)
+            if d <= limit and node.key != exclude and not node.deleted:
+                found.append((d, node.key))
+            diff = target[node.axis] - node.point[node.axis]
+            near, far = (node.left, node.right) if diff < 0 else (node.right, node.left)
+            stack.append(near)
+            if abs(diff) <= limit:
+                stack.append(far)
+        found.sort()
+        return [(key, _miles(d)) for d, key in found]
+
+    def nearest(self, lat, lon, k, max_miles=None, exclude=None):
+        """(key, miles) of the ``k`` points closest to (lat, lon), nearest first"""
+        if k <= 0:
+            return []
+        target = _unit_vector(lat, lon)
+        limit = _chord(max_miles) if max_miles is not None else float("inf")
+        best = []  # max-heap of (-distance, key), at most k entries
+        # Depth-first with an explicit stack: (node, distance from the target to the plane that led here)
+        stack = [(self._root(), 0.0)]
+        while stack:
+            node, plane = stack.pop()
+            if node is None or plane > (-best[0][0] if len(best) == k else limit):
+                continue
+            d = _distance(target, node.point)
+            if d <= limit and node.key != exclude and not node.deleted:
+                if len(best) < k:
+                    heapq.heappush(best, (-d, node.key))
+                elif d < -best[0][0]:
+                    heapq.heapreplace(best, (-d, node.key))
+            diff = target[node.axis] - node.point[node.axis]
+            near, far = (node.left, node.right) if diff < 0 else (node.right, node.left)
+            stack.append((far, abs(diff)))
+            stack.append((near, 0.0))
+        return [(key, _miles(-d)) for d, key in sorted(best, reverse=True)]
+
+    def __len__(self):
+        return len(self.points)
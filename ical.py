@@ -0,0 +1,271 @@
+"""Minimal iCalendar (RFC 5545) reader/writer for feeds and event imports.
+
+app.py turns Event rows into lists of (property, value) pairs; this module
+only knows how to escape, fold and frame them, one line at a time, so a feed
+can be streamed without building the whole calendar in memory. The parser
+works the same way in reverse and yields one VEVENT at a time. Zones named
+by TZID parameters get a VTIMEZONE built from the zoneinfo database.
+"""
+import calendar
+from datetime import datetime, timezone
+from functools import lru_cache
+from zoneinfo import ZoneInfo
+
+CRLF = "\r\n"
+_WEEKDAYS = ("MO", "TU", "WE", "TH", "FR", "SA", "SU")
+
+
+def escape_text(value):
+    """Escape a TEXT value (backslash, semicolon, comma, newline)"""
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\r\n", "\\n")
+        .replace("\n", "\\n")
+    )
+
+
+def format_datetime(dt):
+    """DATE-TIME value; naive datetimes are written as floating local time"""
+    if dt.tzinfo is not None and dt.utcoffset().total_seconds() == 0:
+        return dt.strftime("%Y%m%dT%H%M%SZ")
+    return dt.strftime("%Y%m%dT%H%M%S")
+
+
+def fold(line):
+    """Fold a content line at 75 octets as required by RFC 5545"""
+    encoded = line.encode("utf-8")
+    if len(encoded) <= 75:
+        return line + CRLF
+    parts = []
+    limit = 75
+    while encoded:
+        cut = min(limit, len(encoded))
+        # Never split a multi-byte UTF-8 sequence
+        while cut < len(encoded) and (encoded[cut] & 0xC0) == 0x80:
+            cut -= 1
+        parts.append(encoded[:cut].decode("utf-8"))
+        encoded = encoded[cut:]
+        limit = 74  # continuation lines start with a space
+    return (CRLF + " ").join(parts) + CRLF
+
+
+def content_line(name, value):
+    if isinstance(value, datetime):
+        value = format_datetime(value)
+    return fold(f"{name}:{value}")
+
+
+def format_offset(offset):
+    """UTC-OFFSET value (+HHMM, or +HHMMSS for odd historical offsets)"""
+    seconds = int(offset.total_seconds())
+    sign, seconds = "-" if seconds < 0 else "+", abs(seconds)
+    value = f"{sign}{seconds // 3600:02d}{seconds % 3600 // 60:02d}"
+    return value + (f"{seconds % 60:02d}" if seconds % 60 else "")
+
+
+def _transitions(zone, year):
+    """(local onset, offset before, offset after, is_dst, name) of each UTC offset change in a year"""
+    offset = lambda ts: datetime.fromtimestamp(ts, zone).utcoffset()
+    found = []
+    ts = int(datetime(year, 1, 1, tzinfo=timezone.utc).timestamp())
+    end = int(datetime(year + 1, 1, 1, tzinfo=timezone.utc).timestamp())
+    while ts < end:
+        before = offset(ts)
+        if before != offset(ts + 86400):
+            # Bisect to the first second of the new offset
+            lo, hi = ts, ts + 86400
+            while hi - lo > 1:
+                mid = (lo + hi) // 2
+                lo, hi = (mid, hi) if offset(mid) == before else (lo, mid)
+            onset = datetime.fromtimestamp(hi, zone)
+            local = datetime.fromtimestamp(hi, timezone.utc).replace(tzinfo=None) + before
+            found.append((local, before, onset.utcoffset(), bool(onset.dst()), onset.tzname()))
+        ts += 86400
+    return found
+
+
+def _weekday_rules(local):
+    """RRULE parts that pick this date out of its month: the nth or last weekday, or the weekday in a 7-day window"""
+    weekday = _WEEKDAYS[local.weekday()]
+    length = calendar.monthrange(local.year, local.month)[1]
+    rules = set()
+    if local.day <= 28:
+        rules.add((0, f"BYDAY={(local.day - 1) // 7 + 1}{weekday}"))
+    if local.day + 7 > length:
+        rules.add((0, f"BYDAY=-1{weekday}"))
+    # e.g. Chile's "first Sunday on or after the 2nd": BYDAY=SU;BYMONTHDAY=2,3,4,5,6,7,8
+    for first in range(max(1, local.day - 6), min(local.day, length - 6) + 1):
+        rules.add((1, f"BYDAY={weekday};BYMONTHDAY={','.join(str(d) for d in range(first, first + 7))}"))
+    return rules
+
+
+@lru_cache(maxsize=256)
+def vtimezone(tzid, first_year, last_year):
+    """Property pairs of a VTIMEZONE for an IANA zone, exact for onsets from first_year on.
+
+    Each kind of transition becomes a yearly RRULE for as long as its weekday
+    rule holds. Rules still in force at last_year are left open-ended, so they
+    cover any year a recurring event reaches; the zone's rules are followed a
+    full 28-year calendar cycle past last_year to tell apart rules that agree
+    until then (the first Sunday, or the first Sunday on or after the 2nd).
+    """
+    zone = ZoneInfo(tzid)
+    horizon = last_year + 28
+    start = datetime(first_year, 1, 1)
+    initial = start.replace(tzinfo=zone)
+    runs = [[start, initial.utcoffset(), initial.utcoffset(), bool(initial.dst()), initial.tzname(), None, None]]
+    open_runs = {}
+    for year in range(first_year, horizon + 1):
+        for local, before, after, is_dst, name in _transitions(zone, year):
+            kind = (before, after, is_dst, name, local.month, local.time())
+            rules = _weekday_rules(local)
+            run = open_runs.get(kind)
+            if run is not None and run[6].year == year - 1 and run[5] & rules:
+                run[5] &= rules
+                run[6] = local
+            else:
+                run = open_runs[kind] = [local, before, after, is_dst, name, rules, local]
+                runs.append(run)
+    properties = [("BEGIN", "VTIMEZONE"), ("TZID", tzid)]
+    for onset, before, after, is_dst, name, rules, last in runs:
+        if onset.year > last_year:
+            continue
+        properties += [("BEGIN", "DAYLIGHT" if is_dst else "STANDARD"), ("DTSTART", onset),
+                       ("TZOFFSETFROM", format_offset(before)), ("TZOFFSETTO", format_offset(after))]
+        if rules and last != onset:
+            rule = f"FREQ=YEARLY;BYMONTH={onset.month};{min(rules)[1]}"
+            if last.year < horizon:
+                until = (last - before).replace(tzinfo=timezone.utc)
+                rule += f";UNTIL={format_datetime(until)}"
+            properties.append(("RRULE", rule))
+        if name:
+            properties.append(("TZNAME", escape_text(name)))
+        properties.append(("END", "DAYLIGHT" if is_dst else "STANDARD"))
+    properties.append(("END", "VTIMEZONE"))
+    return tuple(properties)
+
+
+def calendar_lines(name, components, timezones=(), prodid="-//CFD Architect LLC//PMS//EN"):
+    """Yield a VCALENDAR, one folded line at a time.
+
+    ``components`` is an iterable of property lists; each list becomes a
+    VEVENT. Values that are already formatted strings are written as is.
+    ``timezones`` holds one VTIMEZONE property list (see ``vtimezone``) for
+    each TZID the events use, written ahead of them.
+    """
+    yield content_line("BEGIN", "VCALENDAR")
+    yield content_line("VERSION", "2.0")
+    yield content_line("PRODID", prodid)
+    yield content_line("CALSCALE", "GREGORIAN")
+    yield content_line("X-WR-CALNAME", escape_text(name))
+    for properties in timezones:
+        for prop, value in properties:
+            yield content_line(prop, value)
+    for properties in components:
+        yield content_line("BEGIN", "VEVENT")
+        for prop, value in properties:
+            yield content_line(prop, value)
+        yield content_line("END", "VEVENT")
+    yield content_line("END", "VCALENDAR")
+
+
+def chunked(lines, size=16384):
+    """Group lines into chunks of roughly ``size`` characters for streaming"""
+    buffer, length = [], 0
+    for line in lines:
+        buffer.append(line)
+        length += len(line)
+        if length >= size:
+            yield "".join(buffer)
+            buffer, length = [], 0
+    if buffer:
+        yield "".join(buffer)
+
+
+def unfold(lines):
+    """Join folded continuation lines back into logical content lines"""
+    current = None
+    for raw in lines:
+        line = raw.rstrip("\r\n")
+        if line[:1] in (" ", "\t") and current is not None:
+            current += line[1:]
+            continue
+        if current is not None:
+            yield current
+        current = line
+    if current:
+        yield current
+
+
+def unescape_text(value):
+    out, chars = [], iter(value)
+    for ch in chars:
+        if ch == "\\":
+            nxt = next(chars, "")
+            out.append("\n" if nxt in ("n", "N") else nxt)
+        else:
+            out.append(ch)
+    return "".join(out)
+
+
+def parse_content_line(line):
+    """Split 'NAME;PARAM=x:value' into (NAME, {PARAM: x}, value)"""
+    head, _, value = line.partition(":")
+    name, *params = head.split(";")
+    parsed = {}
+    for param in params:
+        key, _, val = param.partition("=")
+        parsed[key.upper()] = val.strip('"')
+    return name.upper(), parsed, value
+
+
+def parse_events(lines):
+    """Yield (line_number, {NAME: (params, value)}) for each VEVENT, streaming.
+
+    Only the first occurrence of each property is kept, except EXDATE which
+    is accumulated. Nested components (VALARM) are skipped.
+    """
+    component, depth, start_line = None, 0, 0
+    for number, line in enumerate(unfold(lines), 1):
+        if not line:
+            continue
+        name, params, value = parse_content_line(line)
+        if name == "BEGIN":
+            if value.upper() == "VEVENT" and component is None:
+                component, depth, start_line = {}, 0, number
+            elif component is not None:
+                depth += 1
+            continue
+        if name == "END" and component is not None:
+            if depth:
+                depth -= 1
+            elif value.upper() == "VEVENT":
+                yield start_line, component
+                component = None
+            continue
+        if component is None or depth:
+            continue
+        if name == "EXDATE" and name in component:
+            prev_params, prev_value = component[name]
+            component[name] = (prev_params, prev_value + "," + value)
+        else:
+            component.setdefault(name, (params, value))
+
+
+def parse_datetime(value, params=None):
+    """Parse a DATE or DATE-TIME value; returns (datetime, tzid or 'UTC' or None)"""
+    params = params or {}
+    value = value.strip()
+    if params.get("VALUE") == "DATE" or len(value) == 8:
+        return datetime.strptime(value[:8], "%Y%m%d"), None
+    if value.endswith("Z"):
+        return datetime.strptime(value[:-1], "%Y%m%dT%H%M%S"), "UTC"
+    return datetime.strptime(value, "%Y%m%dT%H%M%S"), params.get("TZID")
+
+
+def parse_rrule(value):
+    """RRULE value as a dict of upper-cased parts"""
+    return {k.upper(): v for k, _, v in (part.partition("=") for part in value.split(";") if part)}
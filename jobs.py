@@ -0,0 +1,324 @@
+"""Background report jobs run in a process pool.
+
+app.py hands a report spec and the current data version to ReportJobs; the
+aggregation runs in a worker process with its own database connection and
+writes its result to a JSON file named after the spec and that version. The
+same spec asked for again before the data changes finds the file and is
+answered at once. Job state lives in the job directory (a spec file, then
+the result plus a done file, or an error file), so any web process can
+report on a job that another one ran. Nothing in here touches Flask.
+"""
+import hashlib
+import json
+import multiprocessing
+import os
+import re
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timedelta
+from threading import Lock
+
+from sqlalchemy import DateTime, Float, Integer, String, column, create_engine, select, table
+
+_JOB_ID = re.compile(r"[0-9a-f]{32}")
+_engines = {}
+
+
+def job_id(spec, version):
+    """Stable id of a spec computed against one data version"""
+    payload = json.dumps({"spec": spec, "version": version}, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+
+def _write_json(path, data):
+    """Write atomically, so readers see either nothing or the whole file"""
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as stream:
+            json.dump(data, stream, separators=(",", ":"), default=str)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def _read_json(path):
+    try:
+        with open(path, encoding="utf-8") as stream:
+            return json.load(stream)
+    except (OSError, ValueError):
+        return None
+
+
+#  Reports: each takes a connection and a spec and returns a JSON-able result
+
+_time_entry = table("time_entry", column("user_id", Integer), column("project_id", Integer),
+                    column("hours", Float), column("timestamp", DateTime))
+_user = table("user", column("id", Integer), column("name", String), column("email", String),
+              column("role", String))
+_project = table("project", column("id", Integer), column("name", String))
+
+
+def fiscal_year_bounds(year, start_month=1):
+    """[start, end) of fiscal year ``year``, which ends in that calendar year unless it starts in January"""
+    start = date(year - (1 if start_month > 1 else 0), start_month, 1)
+    return start, date(start.year + 1, start.month, 1)
+
+
+def _month_starts(start, end):
+    months, day = [], start
+    while day < end:
+        months.append(day)
+        day = date(day.year + day.month // 12, day.month % 12 + 1, 1)
+    return months
+
+
+def _working_days(start, end):
+    """Weekdays in [start, end)"""
+    days = max((end - start).days, 0)
+    weeks, extra = divmod(days, 7)
+    return weeks * 5 + sum(1 for i in range(extra) if (start + timedelta(days=i)).weekday() < 5)
+
+
+def utilization(connection, spec):
+    """Hours logged by each employee against capacity over a fiscal year, by month and by project"""
+    start, end = fiscal_year_bounds(spec["fiscal_year"], spec["fiscal_year_start_month"])
+    months = _month_starts(start, end)
+    hours_per_day = spec["hours_per_day"]
+    as_of = date.fromisoformat(spec["as_of"])
+
+    people = {}
+
+    def person(user_id):
+        if user_id not in people:
+            people[user_id] = {"hours": 0.0, "entries": 0, "months": [0.0] * len(months), "projects": {}}
+        return people[user_id]
+
+    for (user_id,) in connection.execute(select(_user.c.id).where(_user.c.role == "employee")):
+        person(user_id)
+    entries = (select(_time_entry.c.user_id, _time_entry.c.project_id, _time_entry.c.hours, _time_entry.c.timestamp)
+               .where(_time_entry.c.timestamp >= datetime.combine(start, datetime.min.time()),
+                      _time_entry.c.timestamp < datetime.combine(end, datetime.min.time())))
+    for user_id, project_id, hours, logged in connection.execution_options(yield_per=5000).execute(entries):
+        if user_id is None:
+            continue
+        totals = person(user_id)
+        totals["hours"] += hours
+        totals["entries"] += 1
+        totals["months"][(logged.year - start.year) * 12 + logged.month - start.month] += hours
+        totals["projects"][project_id] = totals["projects"].get(project_id, 0.0) + hours
+
+    users = {row.id: row for row in connection.execute(
+        select(_user.c.id, _user.c.name, _user.c.email).where(_user.c.id.in_(list(people))))} if people else {}
+    project_ids = {pid for totals in people.values() for pid in totals["projects"] if pid is not None}
+    projects = dict(connection.execute(
+        select(_project.c.id, _project.c.name).where(_project.c.id.in_(list(project_ids)))).all()) if project_ids else {}
+
+    capacity = _working_days(start, end) * hours_per_day
+    capacity_to_date = _working_days(start, min(as_of + timedelta(days=1), end)) * hours_per_day
+    employees = []
+    for user_id, totals in people.items():
+        user = users.get(user_id)
+        employees.append({
+            "id": user_id,
+            "name": user.name if user else f"User {user_id}",
+            "email": user.email if user else None,
+            "hours": round(totals["hours"], 2),
+            "entries": totals["entries"],
+            "utilization": round(totals["hours"] / capacity, 4) if capacity else None,
+            "utilization_to_date": round(totals["hours"] / capacity_to_date, 4) if capacity_to_date else None,
+            "months": [round(h, 2) for h in totals["months"]],
+            "projects": sorted(({"id": pid, "name": projects.get(pid, "No project"), "hours": round(h, 2)}
+                                for pid, h in totals["projects"].items()), key=lambda p: -p["hours"]),
+        })
+    employees.sort(key=lambda e: (-e["hours"], e["name"]))
+    total_hours = sum(e["hours"] for e in employees)
+    return {
+        "fiscal_year": spec["fiscal_year"],
+        "start": start.isoformat(),
+        "end": (end - timedelta(days=1)).isoformat(),
+        "months": [m.strftime("%Y-%m") for m in months],
+        "hours_per_day": hours_per_day,
+        "working_days": _working_days(start, end),
+        "capacity_hours": capacity,
+        "as_of": spec["as_of"],
+        "capacity_to_date": capacity_to_date,
+        "employees": employees,
+        "totals": {
+            "hours": round(total_hours, 2),
+            "entries": sum(e["entries"] for e in employees),
+            "employees": len(employees),
+            "utilization": round(total_hours / (capacity * len(employees)), 4) if capacity and employees else None,
+        },
+    }
+
+
+def utilization_table(result):
+    """(header, rows) of a utilization result, one row per employee"""
+    header = ["Employee", "Email", "Hours", "Entries", "Utilization", "Utilization to Date", *result["months"]]
+    rows = ([e["name"], e["email"], e["hours"], e["entries"], e["utilization"], e["utilization_to_date"], *e["months"]]
+            for e in result["employees"])
+    return header, rows
+
+
+REPORTS = {"utilization": (utilization, utilization_table)}
+
+
+def normalize_spec(data, fiscal_year_start_month=1):
+    """Validated, canonical report spec from request JSON; ValueError if it is not one.
+
+    ``as_of`` (the last day counted towards capacity to date) is today, or the
+    fiscal year's last day once it is over, so finished years keep one result.
+    """
+    if not isinstance(data, dict):
+        raise ValueError("expected a JSON object")
+    report = data.get("report")
+    if report not in REPORTS:
+        raise ValueError(f"report must be one of: {', '.join(sorted(REPORTS))}")
+    start_month = data.get("fiscal_year_start_month", fiscal_year_start_month)
+    if isinstance(start_month, bool) or not isinstance(start_month, int) or not 1 <= start_month <= 12:
+        raise ValueError("fiscal_year_start_month must be 1-12")
+    today = date.today()
+    year = data.get("fiscal_year", today.year + (1 if start_month > 1 and today.month >= start_month else 0))
+    if isinstance(year, bool) or not isinstance(year, int) or not 2000 <= year <= 2100:
+        raise ValueError("fiscal_year must be a year between 2000 and 2100")
+    hours_per_day = data.get("hours_per_day", 8)
+    if isinstance(hours_per_day, bool) or not isinstance(hours_per_day, (int, float)) or not 0 < hours_per_day <= 24:
+        raise ValueError("hours_per_day must be a number between 0 and 24")
+    start, end = fiscal_year_bounds(year, start_month)
+    as_of = min(max(today, start), end - timedelta(days=1))
+    return {"report": report, "fiscal_year": year, "fiscal_year_start_month": start_month,
+            "hours_per_day": hours_per_day, "as_of": as_of.isoformat()}
+
+
+#  Worker side
+
+def _engine(database_url):
+    if database_url not in _engines:
+        _engines[database_url] = create_engine(database_url)
+    return _engines[database_url]
+
+
+def run_job(database_url, directory, key, spec):
+    """Compute one report in a worker process and write its result (or error) file"""
+    began = time.monotonic()
+    try:
+        compute = REPORTS[spec["report"]][0]
+        with _engine(database_url).connect() as connection:
+            result = compute(connection, spec)
+    except Exception as exc:
+        _write_json(os.path.join(directory, f"{key}.error.json"),
+                    {"error": f"{type(exc).__name__}: {exc}", "finished_at": datetime.utcnow().isoformat()})
+        return False
+    _write_json(os.path.join(directory, f"{key}.json"), result)
+    _write_json(os.path.join(directory, f"{key}.done.json"),
+                {"finished_at": datetime.utcnow().isoformat(), "seconds": round(time.monotonic() - began, 3)})
+    return True
+
+
+class ReportJobs:
+    """Submits report specs to a process pool and tracks their files under ``directory``.
+
+    A job whose spec file is older than ``stale_after`` seconds with neither a
+    result nor an error is taken to have died with its worker and runs again
+    when next submitted.
+    """
+
+    def __init__(self, directory, database_url, workers=2, stale_after=3600):
+        self.directory = directory
+        self.database_url = database_url
+        self.workers = workers
+        self.stale_after = stale_after
+        self._pool = None
+        self._futures = {}
+        self._lock = Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key, kind=None):
+        if not _JOB_ID.fullmatch(key or ""):
+            raise KeyError(key)
+        return os.path.join(self.directory, f"{key}.{kind}.json" if kind else f"{key}.json")
+
+    def result_path(self, key):
+        return self._path(key)
+
+    def _executor(self):
+        if self._pool is None:
+            # spawn: workers must not inherit the web process's open database connections
+            self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._pool
+
+    def submit(self, spec, version):
+        """Status of the job for ``spec`` at data ``version``, starting it unless it is done or running"""
+        key = job_id(spec, version)
+        with self._lock:
+            status = self.status(key)
+            if status and status["status"] in ("done", "queued", "running"):
+                return status
+            try:
+                os.unlink(self._path(key, "error"))
+            except FileNotFoundError:
+                pass
+            _write_json(self._path(key, "spec"), {"spec": spec, "version": version,
+                                                  "submitted_at": datetime.utcnow().isoformat()})
+            try:
+                future = self._executor().submit(run_job, self.database_url, self.directory, key, spec)
+            except RuntimeError:  # pool broken by a crashed worker; start a fresh one
+                self._pool = None
+                future = self._executor().submit(run_job, self.database_url, self.directory, key, spec)
+            self._futures[key] = future
+            future.add_done_callback(lambda f, key=key: self._finished(key, f))
+        return self.status(key)
+
+    def _finished(self, key, future):
+        self._futures.pop(key, None)
+        if future.cancelled() or future.exception() is not None:
+            error = "cancelled" if future.cancelled() else f"{type(future.exception()).__name__}: {future.exception()}"
+            if not os.path.exists(self._path(key, "done")):
+                _write_json(self._path(key, "error"), {"error": error, "finished_at": datetime.utcnow().isoformat()})
+
+    def status(self, key):
+        """{id, status, spec, version, submitted_at, finished_at, seconds, error}, or None for an unknown job"""
+        try:
+            meta = _read_json(self._path(key, "spec"))
+        except KeyError:
+            return None
+        if meta is None:
+            return None
+        job = {"id": key, "spec": meta["spec"], "version": meta["version"], "submitted_at": meta["submitted_at"]}
+        done = _read_json(self._path(key, "done"))
+        if done is not None:
+            job.update(status="done", **done)
+            return job
+        error = _read_json(self._path(key, "error"))
+        if error is not None:
+            job.update(status="failed", error=error["error"], finished_at=error["finished_at"])
+            return job
+        future = self._futures.get(key)
+        if future is not None:
+            job["status"] = "running" if future.running() else "queued"
+        else:
+            age = time.time() - os.path.getmtime(self._path(key, "spec"))
+            job["status"] = "running" if age < self.stale_after else "failed"
+            if job["status"] == "failed":
+                job["error"] = "abandoned"
+        return job
+
+    def prune(self, max_age):
+        """Delete job files last written more than ``max_age`` seconds ago; returns how many"""
+        cutoff, removed = time.time() - max_age, 0
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            key = name.split(".")[0]
+            if key in self._futures or not name.endswith(".json"):
+                continue
+            if os.path.getmtime(path) < cutoff:
+                os.unlink(path)
+                removed += 1
+        return removed
+
+    def shutdown(self, wait=True):
+        if self._pool is not None:
+            self._pool.shutdown(wait=wait)
+            self._pool = None
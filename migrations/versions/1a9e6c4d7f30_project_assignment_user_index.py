@@ -0,0 +1,26 @@
+"""Index project_assignment (user_id, project_id) for the client access semi-join
+
+Revision ID: 1a9e6c4d7f30
+Revises: f3c8d1a6b254
+Create Date: 2026-10-17 14:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '1a9e6c4d7f30'
+down_revision = 'f3c8d1a6b254'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    indexes = {index['name'] for index in sa.inspect(op.get_bind()).get_indexes('project_assignment')}
+    if 'ix_project_assignment_user_project' not in indexes:
+        op.create_index('ix_project_assignment_user_project', 'project_assignment', ['user_id', 'project_id'])
+
+
+def downgrade():
+    op.drop_index('ix_project_assignment_user_project', table_name='project_assignment')
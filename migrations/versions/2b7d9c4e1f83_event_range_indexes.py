@@ -0,0 +1,35 @@
+"""Index event (start, end) and (project_id, start) for range loading and overlap checks
+
+Revision ID: 2b7d9c4e1f83
+Revises:
+Create Date: 2026-10-17 08:00:00
+
+First revision: it applies to a database created by `flask init-db` before
+migrations were added.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2b7d9c4e1f83'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+INDEXES = {
+    'ix_event_start_end': ['start', 'end'],
+    'ix_event_project_start': ['project_id', 'start'],
+}
+
+
+def upgrade():
+    indexes = {index['name'] for index in sa.inspect(op.get_bind()).get_indexes('event')}
+    for name, columns in INDEXES.items():
+        if name not in indexes:
+            op.create_index(name, 'event', columns)
+
+
+def downgrade():
+    for name in INDEXES:
+        op.drop_index(name, table_name='event')
@@ -0,0 +1,46 @@
+"""Event reminders: sent-reminder log and system notifications without a sender
+
+Revision ID: 3d9f6a2e8c54
+Revises: 6f2c8b4a9d17
+Create Date: 2026-10-17 08:30:00
+
+notification.sender_id becomes nullable (NULL = posted by the reminder
+scheduler); batch mode rebuilds the table on SQLite, which cannot alter a
+column in place.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3d9f6a2e8c54'
+down_revision = '6f2c8b4a9d17'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    if 'event_reminder' not in inspector.get_table_names():
+        op.create_table(
+            'event_reminder',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('event_id', sa.Integer(), nullable=False),
+            sa.Column('occurrence_start', sa.DateTime(), nullable=False),
+            sa.Column('sent_at', sa.DateTime(), nullable=False),
+            sa.ForeignKeyConstraint(['event_id'], ['event.id']),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('event_id', 'occurrence_start', name='uq_event_reminder'),
+        )
+    sender = next(column for column in inspector.get_columns('notification') if column['name'] == 'sender_id')
+    if not sender['nullable']:
+        with op.batch_alter_table('notification') as batch_op:
+            batch_op.alter_column('sender_id', existing_type=sa.Integer(), nullable=True)
+
+
+def downgrade():
+    # Reminders have no sender to restore, so they go with the table that logged them
+    op.execute(sa.text('DELETE FROM notification WHERE sender_id IS NULL'))
+    with op.batch_alter_table('notification') as batch_op:
+        batch_op.alter_column('sender_id', existing_type=sa.Integer(), nullable=False)
+    op.drop_table('event_reminder')
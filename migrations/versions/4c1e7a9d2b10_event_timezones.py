@@ -0,0 +1,129 @@
+"""Store event time zones and UTC epoch start/end
+
+Revision ID: 4c1e7a9d2b10
+Revises: 3d9f6a2e8c54
+Create Date: 2026-10-17 09:00:00
+
+Existing events were entered as naive wall-clock times; they are assigned
+DEFAULT_TIMEZONE (the same setting app.py falls back to) and their epoch
+columns are computed from that. Databases created with `flask init-db`
+after this change already have the columns, so every step checks first.
+"""
+import os
+from zoneinfo import ZoneInfo
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4c1e7a9d2b10'
+down_revision = '3d9f6a2e8c54'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+OLD_INDEXES = {
+    'ix_event_start_end': ['start', 'end'],
+    'ix_event_start_id': ['start', 'id'],
+    'ix_event_project_start': ['project_id', 'start'],
+}
+NEW_INDEXES = {
+    'ix_event_utc_range': ['start_utc', 'end_utc'],
+    'ix_event_start_utc_id': ['start_utc', 'id'],
+    'ix_event_project_start_utc': ['project_id', 'start_utc'],
+}
+
+
+def _columns(inspector, table):
+    return {column['name'] for column in inspector.get_columns(table)}
+
+
+def _indexes(inspector, table):
+    return {index['name'] for index in inspector.get_indexes(table)}
+
+
+def _backfill(bind, default_zone):
+    event = sa.table(
+        'event',
+        sa.column('id', sa.Integer), sa.column('start', sa.DateTime), sa.column('end', sa.DateTime),
+        sa.column('timezone', sa.String), sa.column('start_utc', sa.BigInteger),
+        sa.column('end_utc', sa.BigInteger),
+    )
+    zones = {}
+
+    def epoch(value, name):
+        if value is None:
+            return None
+        zone = zones.get(name) or zones.setdefault(name, ZoneInfo(name))
+        return int(value.replace(tzinfo=zone).timestamp())
+
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(event.c.id, event.c.start, event.c.end, event.c.timezone)
+            .where(event.c.start_utc.is_(None), event.c.id > last_id)
+            .order_by(event.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            return
+        for row in rows:
+            name = row.timezone or default_zone
+            bind.execute(
+                event.update().where(event.c.id == row.id)
+                .values(timezone=name, start_utc=epoch(row.start, name), end_utc=epoch(row.end, name))
+            )
+        last_id = rows[-1].id
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    default_zone = os.getenv('DEFAULT_TIMEZONE', 'America/New_York')
+
+    user_columns = _columns(inspector, 'user')
+    if 'timezone' not in user_columns:
+        op.add_column('user', sa.Column('timezone', sa.String(length=64), nullable=True))
+
+    event_columns = _columns(inspector, 'event')
+    if 'timezone' not in event_columns:
+        op.add_column('event', sa.Column('timezone', sa.String(length=64), nullable=True))
+    if 'start_utc' not in event_columns:
+        op.add_column('event', sa.Column('start_utc', sa.BigInteger(), nullable=True))
+    if 'end_utc' not in event_columns:
+        op.add_column('event', sa.Column('end_utc', sa.BigInteger(), nullable=True))
+
+    _backfill(bind, default_zone)
+
+    with op.batch_alter_table('event') as batch_op:
+        batch_op.alter_column('timezone', existing_type=sa.String(length=64), nullable=False)
+        batch_op.alter_column('start_utc', existing_type=sa.BigInteger(), nullable=False)
+
+    indexes = _indexes(sa.inspect(bind), 'event')
+    for name in OLD_INDEXES:
+        if name in indexes:
+            op.drop_index(name, table_name='event')
+    for name, columns in NEW_INDEXES.items():
+        if name not in indexes:
+            op.create_index(name, 'event', columns)
+    # The series index (revision 5e8a1d3c7b26) moves from wall-clock start to start_utc
+    if 'ix_event_series_range' in indexes:
+        op.drop_index('ix_event_series_range', table_name='event')
+    op.create_index('ix_event_series_range', 'event', ['recurrence_freq', 'start_utc', 'recurrence_end'])
+
+
+def downgrade():
+    indexes = _indexes(sa.inspect(op.get_bind()), 'event')
+    for name in list(NEW_INDEXES) + ['ix_event_series_range']:
+        if name in indexes:
+            op.drop_index(name, table_name='event')
+    for name, columns in OLD_INDEXES.items():
+        op.create_index(name, 'event', columns)
+    op.create_index('ix_event_series_range', 'event', ['recurrence_freq', 'start', 'recurrence_end'])
+    with op.batch_alter_table('event') as batch_op:
+        batch_op.drop_column('end_utc')
+        batch_op.drop_column('start_utc')
+        batch_op.drop_column('timezone')
+    with op.batch_alter_table('user') as batch_op:
+        batch_op.drop_column('timezone')
@@ -0,0 +1,57 @@
+"""Recurring events: recurrence rule columns, series overrides and the series range index
+
+Revision ID: 5e8a1d3c7b26
+Revises: 2b7d9c4e1f83
+Create Date: 2026-10-17 08:10:00
+
+Existing events become one-off events (recurrence_freq NULL).
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5e8a1d3c7b26'
+down_revision = '2b7d9c4e1f83'
+branch_labels = None
+depends_on = None
+
+def _columns():
+    return [
+        sa.Column('recurrence_freq', sa.String(length=10), nullable=True),
+        sa.Column('recurrence_interval', sa.Integer(), nullable=True),
+        sa.Column('recurrence_until', sa.DateTime(), nullable=True),
+        sa.Column('recurrence_count', sa.Integer(), nullable=True),
+        sa.Column('recurrence_exdates', sa.Text(), nullable=True),
+        sa.Column('recurrence_end', sa.DateTime(), nullable=True),
+        sa.Column('series_id', sa.Integer(), nullable=True),
+        sa.Column('original_start', sa.DateTime(), nullable=True),
+    ]
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    existing = {column['name'] for column in inspector.get_columns('event')}
+    # batch mode, as SQLite can only add the series_id foreign key by rebuilding the table
+    with op.batch_alter_table('event') as batch_op:
+        for column in _columns():
+            if column.name not in existing:
+                batch_op.add_column(column)
+        if 'series_id' not in existing:
+            batch_op.create_foreign_key('fk_event_series_id_event', 'event', ['series_id'], ['id'])
+    op.execute(sa.text('UPDATE event SET recurrence_interval = 1 WHERE recurrence_interval IS NULL'))
+
+    indexes = {index['name'] for index in sa.inspect(op.get_bind()).get_indexes('event')}
+    if 'ix_event_series_id' not in indexes:
+        op.create_index('ix_event_series_id', 'event', ['series_id'])
+    if 'ix_event_series_range' not in indexes:
+        op.create_index('ix_event_series_range', 'event', ['recurrence_freq', 'start', 'recurrence_end'])
+
+
+def downgrade():
+    op.drop_index('ix_event_series_range', table_name='event')
+    op.drop_index('ix_event_series_id', table_name='event')
+    with op.batch_alter_table('event') as batch_op:
+        batch_op.drop_constraint('fk_event_series_id_event', type_='foreignkey')
+        for column in reversed(_columns()):
+            batch_op.drop_column(column.name)
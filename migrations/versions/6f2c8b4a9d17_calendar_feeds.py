@@ -0,0 +1,42 @@
+"""Calendar subscription feeds: per-user feed tokens and scope change counters
+
+Revision ID: 6f2c8b4a9d17
+Revises: 5e8a1d3c7b26
+Create Date: 2026-10-17 08:20:00
+
+Tokens are issued the first time a user opens their feed settings, so
+existing users start without one; the unique index allows any number of
+NULLs. scope_version rows are created by the first write to each scope.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6f2c8b4a9d17'
+down_revision = '5e8a1d3c7b26'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    if 'calendar_token' not in {column['name'] for column in inspector.get_columns('user')}:
+        op.add_column('user', sa.Column('calendar_token', sa.String(length=64), nullable=True))
+    if 'ix_user_calendar_token' not in {index['name'] for index in inspector.get_indexes('user')}:
+        op.create_index('ix_user_calendar_token', 'user', ['calendar_token'], unique=True)
+    if 'scope_version' not in inspector.get_table_names():
+        op.create_table(
+            'scope_version',
+            sa.Column('scope', sa.String(length=40), nullable=False),
+            sa.Column('version', sa.Integer(), nullable=False),
+            sa.Column('updated_at', sa.DateTime(), nullable=False),
+            sa.PrimaryKeyConstraint('scope'),
+        )
+
+
+def downgrade():
+    op.drop_table('scope_version')
+    op.drop_index('ix_user_calendar_token', table_name='user')
+    with op.batch_alter_table('user') as batch_op:
+        batch_op.drop_column('calendar_token')
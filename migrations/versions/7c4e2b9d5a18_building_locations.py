@@ -0,0 +1,36 @@
+"""Add building latitude/longitude for offline ZIP-centroid geocoding
+
+Revision ID: 7c4e2b9d5a18
+Revises: 1a9e6c4d7f30
+Create Date: 2026-10-17 15:00:00
+
+Run `flask geocode-buildings` afterwards to locate the existing buildings.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7c4e2b9d5a18'
+down_revision = '1a9e6c4d7f30'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    columns = {column['name'] for column in inspector.get_columns('building')}
+    if 'latitude' not in columns:
+        op.add_column('building', sa.Column('latitude', sa.Float(), nullable=True))
+    if 'longitude' not in columns:
+        op.add_column('building', sa.Column('longitude', sa.Float(), nullable=True))
+    indexes = {index['name'] for index in sa.inspect(op.get_bind()).get_indexes('building')}
+    if 'ix_building_latitude_longitude' not in indexes:
+        op.create_index('ix_building_latitude_longitude', 'building', ['latitude', 'longitude'])
+
+
+def downgrade():
+    op.drop_index('ix_building_latitude_longitude', table_name='building')
+    with op.batch_alter_table('building') as batch_op:
+        batch_op.drop_column('longitude')
+        batch_op.drop_column('latitude')
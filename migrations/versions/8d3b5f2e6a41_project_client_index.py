@@ -0,0 +1,26 @@
+"""Index project.client_id for the grouped project counts on the clients list
+
+Revision ID: 8d3b5f2e6a41
+Revises: 4c1e7a9d2b10
+Create Date: 2026-10-17 10:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8d3b5f2e6a41'
+down_revision = '4c1e7a9d2b10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    indexes = {index['name'] for index in sa.inspect(op.get_bind()).get_indexes('project')}
+    if 'ix_project_client_id' not in indexes:
+        op.create_index('ix_project_client_id', 'project', ['client_id'])
+
+
+def downgrade():
+    op.drop_index('ix_project_client_id', table_name='project')
@@ -0,0 +1,26 @@
+"""Index time_entry.project_id for the project page's SUM(hours) and entry list
+
+Revision ID: 9e5a3f1c7b62
+Revises: 7c4e2b9d5a18
+Create Date: 2026-10-17 16:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9e5a3f1c7b62'
+down_revision = '7c4e2b9d5a18'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    indexes = {index['name'] for index in sa.inspect(op.get_bind()).get_indexes('time_entry')}
+    if 'ix_time_entry_project_id' not in indexes:
+        op.create_index('ix_time_entry_project_id', 'time_entry', ['project_id'])
+
+
+def downgrade():
+    op.drop_index('ix_time_entry_project_id', table_name='time_entry')
@@ -0,0 +1,81 @@
+"""Daily rollup tables for time entries and activities
+
+Revision ID: b4d8e2a6c915
+Revises: 9e5a3f1c7b62
+Create Date: 2026-10-17 17:00:00
+
+Each table is backfilled from existing rows as it is created, so reports read
+complete totals straight after the upgrade.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b4d8e2a6c915'
+down_revision = '9e5a3f1c7b62'
+branch_labels = None
+depends_on = None
+
+time_entry = sa.table(
+    'time_entry',
+    sa.column('id'), sa.column('user_id'), sa.column('project_id'), sa.column('hours'), sa.column('timestamp'),
+)
+activity = sa.table('activity', sa.column('id'), sa.column('project_id'), sa.column('happened_at'))
+
+
+def _backfill(table, columns, stamp, keys, aggregates):
+    """INSERT ... SELECT one row per key and UTC day, the same totals `flask rebuild-rollups` computes"""
+    day = sa.func.date(stamp)
+    source = (
+        sa.select(*keys, day, *aggregates)
+        .where(*[key.isnot(None) for key in keys], stamp.isnot(None))
+        .group_by(*keys, day)
+    )
+    op.execute(sa.table(table, *[sa.column(c) for c in columns]).insert().from_select(columns, source))
+
+
+def upgrade():
+    tables = set(sa.inspect(op.get_bind()).get_table_names())
+    hours = [sa.func.sum(time_entry.c.hours), sa.func.count(time_entry.c.id)]
+    if 'project_daily_hours' not in tables:
+        op.create_table(
+            'project_daily_hours',
+            sa.Column('project_id', sa.Integer(), nullable=False),
+            sa.Column('day', sa.Date(), nullable=False),
+            sa.Column('hours', sa.Float(), nullable=False),
+            sa.Column('entries', sa.Integer(), nullable=False),
+            sa.PrimaryKeyConstraint('project_id', 'day'),
+        )
+        op.create_index('ix_project_daily_hours_day', 'project_daily_hours', ['day', 'project_id'])
+        _backfill('project_daily_hours', ['project_id', 'day', 'hours', 'entries'],
+                  time_entry.c.timestamp, [time_entry.c.project_id], hours)
+    if 'user_daily_hours' not in tables:
+        op.create_table(
+            'user_daily_hours',
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('day', sa.Date(), nullable=False),
+            sa.Column('hours', sa.Float(), nullable=False),
+            sa.Column('entries', sa.Integer(), nullable=False),
+            sa.PrimaryKeyConstraint('user_id', 'day'),
+        )
+        op.create_index('ix_user_daily_hours_day', 'user_daily_hours', ['day', 'user_id'])
+        _backfill('user_daily_hours', ['user_id', 'day', 'hours', 'entries'],
+                  time_entry.c.timestamp, [time_entry.c.user_id], hours)
+    if 'project_daily_activity' not in tables:
+        op.create_table(
+            'project_daily_activity',
+            sa.Column('project_id', sa.Integer(), nullable=False),
+            sa.Column('day', sa.Date(), nullable=False),
+            sa.Column('activities', sa.Integer(), nullable=False),
+            sa.PrimaryKeyConstraint('project_id', 'day'),
+        )
+        op.create_index('ix_project_daily_activity_day', 'project_daily_activity', ['day', 'project_id'])
+        _backfill('project_daily_activity', ['project_id', 'day', 'activities'],
+                  activity.c.happened_at, [activity.c.project_id], [sa.func.count(activity.c.id)])
+
+
+def downgrade():
+    op.drop_table('project_daily_activity')
+    op.drop_table('user_daily_hours')
+    op.drop_table('project_daily_hours')
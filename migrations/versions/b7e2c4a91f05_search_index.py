@@ -0,0 +1,75 @@
+"""Full-text search index table
+
+Revision ID: b7e2c4a91f05
+Revises: 8d3b5f2e6a41
+Create Date: 2026-10-17 11:00:00
+
+Creates the search_index table for the current database (FTS5 on SQLite,
+FULLTEXT on MySQL) and indexes the existing clients, buildings, projects and
+events in batches, so search works straight after the upgrade. From then on
+the app keeps it in sync on every write.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from search import search_index_for
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7e2c4a91f05'
+down_revision = '8d3b5f2e6a41'
+branch_labels = None
+depends_on = None
+
+# Document numbering at this revision; f3c8d1a6b254 adds "user"
+ENTITIES = ("client", "building", "project", "event")
+BATCH_SIZE = 1000
+
+client = sa.table('client', sa.column('id'), sa.column('name'), sa.column('contact'), sa.column('phone'),
+                  sa.column('street'), sa.column('city'), sa.column('state'), sa.column('zip'))
+building = sa.table('building', sa.column('id'), sa.column('name'), sa.column('street'), sa.column('city'),
+                    sa.column('state'), sa.column('zip'), sa.column('notes'))
+project = sa.table('project', sa.column('id'), sa.column('name'), sa.column('description'), sa.column('status'),
+                   sa.column('client_id'))
+event = sa.table('event', sa.column('id'), sa.column('title'), sa.column('event_type'), sa.column('status'),
+                 sa.column('notes'))
+
+# (id, title, *body) per entity, the same text app.search_documents indexes
+SOURCES = {
+    'client': sa.select(client.c.id, client.c.name, client.c.contact, client.c.phone, client.c.street,
+                        client.c.city, client.c.state, client.c.zip),
+    'building': sa.select(building.c.id, building.c.name, building.c.street, building.c.city, building.c.state,
+                          building.c.zip, building.c.notes),
+    'project': sa.select(project.c.id, project.c.name, project.c.description, project.c.status,
+                         client.c.name.label('client_name'))
+               .select_from(project.outerjoin(client, client.c.id == project.c.client_id)),
+    'event': sa.select(event.c.id, event.c.title, event.c.event_type, event.c.status, event.c.notes),
+}
+
+
+def reindex(bind, index, sources, entities):
+    """Index every row of each source, keyset-paged by id, numbered for `entities`"""
+    for entity, stmt in sources.items():
+        id_column, after_id = stmt.selected_columns[0], None
+        while True:
+            page = stmt if after_id is None else stmt.where(id_column > after_id)
+            rows = bind.execute(page.order_by(id_column).limit(BATCH_SIZE)).all()
+            if not rows:
+                break
+            index.insert(bind, [(entity, row[0], row[1], " ".join(str(v) for v in row[2:] if v)) for row in rows],
+                         entities)
+            after_id = rows[-1][0]
+
+
+def upgrade():
+    bind = op.get_bind()
+    if 'search_index' in sa.inspect(bind).get_table_names():
+        return
+    index = search_index_for(bind.dialect.name)
+    index.create(bind)
+    reindex(bind, index, SOURCES, ENTITIES)
+
+
+def downgrade():
+    bind = op.get_bind()
+    search_index_for(bind.dialect.name).drop(bind)
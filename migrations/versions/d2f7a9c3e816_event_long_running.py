@@ -0,0 +1,43 @@
+"""Flag one-off events longer than MAX_EVENT_SPAN
+
+Revision ID: d2f7a9c3e816
+Revises: b4d8e2a6c915
+Create Date: 2026-10-18 09:00:00
+
+Range queries only scan events starting at most MAX_EVENT_SPAN before the
+range, plus rows flagged long_running. Existing rows longer than that (saved
+before the limit was enforced) are flagged here so they keep showing up in
+the calendar and count as busy.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd2f7a9c3e816'
+down_revision = 'b4d8e2a6c915'
+branch_labels = None
+depends_on = None
+
+MAX_EVENT_SPAN_SECONDS = 31 * 24 * 3600  # app.MAX_EVENT_SPAN when this revision was written
+
+event = sa.table('event', sa.column('start_utc'), sa.column('end_utc'), sa.column('long_running'))
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    if 'long_running' not in {column['name'] for column in inspector.get_columns('event')}:
+        op.add_column('event', sa.Column('long_running', sa.Boolean(), nullable=False, server_default=sa.false()))
+    if 'ix_event_long_running' not in {index['name'] for index in inspector.get_indexes('event')}:
+        op.create_index('ix_event_long_running', 'event', ['long_running', 'start_utc'])
+    op.execute(
+        event.update()
+        .where(event.c.end_utc.isnot(None), event.c.end_utc - event.c.start_utc > MAX_EVENT_SPAN_SECONDS)
+        .values(long_running=True)
+    )
+
+
+def downgrade():
+    op.drop_index('ix_event_long_running', table_name='event')
+    with op.batch_alter_table('event') as batch_op:
+        batch_op.drop_column('long_running')
@@ -0,0 +1,53 @@
+"""Index (sort column, id) for keyset-paged client, building, project and user lists
+
+Revision ID: e5a0c3f71b92
+Revises: b7e2c4a91f05
+Create Date: 2026-10-17 12:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5a0c3f71b92'
+down_revision = 'b7e2c4a91f05'
+branch_labels = None
+depends_on = None
+
+INDEXES = {
+    'user': {
+        'ix_user_name_id': ['name', 'id'],
+        'ix_user_role_name_id': ['role', 'name', 'id'],
+    },
+    'client': {
+        'ix_client_name_id': ['name', 'id'],
+        'ix_client_city_id': ['city', 'id'],
+        'ix_client_state_id': ['state', 'id'],
+    },
+    'building': {
+        'ix_building_name_id': ['name', 'id'],
+        'ix_building_city_id': ['city', 'id'],
+        'ix_building_state_id': ['state', 'id'],
+    },
+    'project': {
+        'ix_project_name_id': ['name', 'id'],
+        'ix_project_due_date_id': ['due_date', 'id'],
+        'ix_project_status_id': ['status', 'id'],
+    },
+}
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    for table, indexes in INDEXES.items():
+        existing = {index['name'] for index in inspector.get_indexes(table)}
+        for name, columns in indexes.items():
+            if name not in existing:
+                op.create_index(name, table, columns)
+
+
+def downgrade():
+    for table, indexes in INDEXES.items():
+        for name in indexes:
+            op.drop_index(name, table_name=table)
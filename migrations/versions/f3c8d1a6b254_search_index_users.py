@@ -0,0 +1,76 @@
+"""Add users to the search index
+
+Revision ID: f3c8d1a6b254
+Revises: e5a0c3f71b92
+Create Date: 2026-10-17 13:00:00
+
+Document ids encode the entity as id * len(ENTITIES) + position, so adding
+"user" renumbers every document. The table is recreated and every row is
+reindexed in batches under the new numbering; downgrading reindexes under
+the previous four-entity numbering.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from search import search_index_for
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3c8d1a6b254'
+down_revision = 'e5a0c3f71b92'
+branch_labels = None
+depends_on = None
+
+ENTITIES = ("client", "building", "project", "event", "user")
+PREVIOUS_ENTITIES = ENTITIES[:4]
+BATCH_SIZE = 1000
+
+client = sa.table('client', sa.column('id'), sa.column('name'), sa.column('contact'), sa.column('phone'),
+                  sa.column('street'), sa.column('city'), sa.column('state'), sa.column('zip'))
+building = sa.table('building', sa.column('id'), sa.column('name'), sa.column('street'), sa.column('city'),
+                    sa.column('state'), sa.column('zip'), sa.column('notes'))
+project = sa.table('project', sa.column('id'), sa.column('name'), sa.column('description'), sa.column('status'),
+                   sa.column('client_id'))
+event = sa.table('event', sa.column('id'), sa.column('title'), sa.column('event_type'), sa.column('status'),
+                 sa.column('notes'))
+user = sa.table('user', sa.column('id'), sa.column('name'), sa.column('email'))
+
+# (id, title, *body) per entity, the same text app.search_documents indexes
+SOURCES = {
+    'client': sa.select(client.c.id, client.c.name, client.c.contact, client.c.phone, client.c.street,
+                        client.c.city, client.c.state, client.c.zip),
+    'building': sa.select(building.c.id, building.c.name, building.c.street, building.c.city, building.c.state,
+                          building.c.zip, building.c.notes),
+    'project': sa.select(project.c.id, project.c.name, project.c.description, project.c.status,
+                         client.c.name.label('client_name'))
+               .select_from(project.outerjoin(client, client.c.id == project.c.client_id)),
+    'event': sa.select(event.c.id, event.c.title, event.c.event_type, event.c.status, event.c.notes),
+    'user': sa.select(user.c.id, user.c.name, user.c.email),
+}
+
+
+def rebuild(entities):
+    """Recreate the index and fill it from every row of `entities`, numbered for them, keyset-paged by id"""
+    bind = op.get_bind()
+    index = search_index_for(bind.dialect.name)
+    index.drop(bind)
+    index.create(bind)
+    for entity in entities:
+        stmt = SOURCES[entity]
+        id_column, after_id = stmt.selected_columns[0], None
+        while True:
+            page = stmt if after_id is None else stmt.where(id_column > after_id)
+            rows = bind.execute(page.order_by(id_column).limit(BATCH_SIZE)).all()
+            if not rows:
+                break
+            index.insert(bind, [(entity, row[0], row[1], " ".join(str(v) for v in row[2:] if v)) for row in rows],
+                         entities)
+            after_id = rows[-1][0]
+
+
+def upgrade():
+    rebuild(ENTITIES)
+
+
+def downgrade():
+    rebuild(PREVIOUS_ENTITIES)
@@ -0,0 +1,141 @@
+"""Keyset (cursor) pagination for SQLAlchemy queries.
+
+Pages are addressed by the sort key of their first/last row instead of an
+offset, so every page costs one indexed range scan no matter how deep it is.
+Cursors are opaque URL-safe strings.
+
+Sort columns may be nullable. NULL is taken to sort below every value, as
+it does on SQLite and MySQL, so NULLs come first ascending and last
+descending.
+"""
+import base64
+import json
+from datetime import date, datetime
+
+from sqlalchemy import and_, false, or_
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    if isinstance(value, date):
+        return {"d": value.isoformat()}
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict):
+        if "dt" in value:
+            return datetime.fromisoformat(value["dt"])
+        if "d" in value:
+            return date.fromisoformat(value["d"])
+    return value
+
+
+def encode_cursor(values):
+    raw = json.dumps([_encode_value(v) for v in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token):
+    """Values encoded by encode_cursor, or None if the token is malformed"""
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        values = json.loads(raw)
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(values, list):
+        return None
+    return [_decode_value(v) for v in values]
+
+
+def _equal(column, value):
+    return column.is_(None) if value is None else column == value
+
+
+def _beyond(column, descending, value):
+    """Rows strictly past ``value`` in one column's direction"""
+    if value is None:
+        return false() if descending else column.isnot(None)
+    if descending:
+        return or_(column < value, column.is_(None)) if _nullable(column) else column < value
+    return column > value
+
+
+def _nullable(column):
+    return getattr(getattr(column, "expression", column), "nullable", True)
+
+
+def _after(order, values):
+    """Filter selecting rows strictly after ``values`` in ``order``"""
+    clauses = []
+    for i, (column, descending) in enumerate(order):
+        clauses.append(and_(*[_equal(c, v) for (c, _), v in zip(order[:i], values[:i])],
+                            _beyond(column, descending, values[i])))
+    first_column, first_desc = order[0]
+    # Leading bound on the first column lets the database use a range scan
+    if values[0] is None:
+        lead = first_column.is_(None) if first_desc else None
+    elif first_desc:
+        lead = first_column <= values[0] if not _nullable(first_column) else None
+    else:
+        lead = first_column >= values[0]
+    return or_(*clauses) if lead is None else and_(lead, or_(*clauses))
+
+
+class KeysetPage:
+    def __init__(self, items, next_cursor, prev_cursor):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self):
+        return self.prev_cursor is not None
+
+
+def keyset_paginate(query, order, key, per_page, after=None, before=None):
+    """Fetch one page of ``query``.
+
+    ``order`` is a list of (column, descending) pairs ending in a unique
+    column (normally the id); ``key`` maps a row to its values for those
+    columns. Pass the ``after`` cursor for the next page or ``before`` for
+    the previous one.
+    """
+    after_values = decode_cursor(after)
+    before_values = decode_cursor(before)
+    if after_values is not None and len(after_values) == len(order):
+        query = query.filter(_after(order, after_values))
+        backwards = False
+    elif before_values is not None and len(before_values) == len(order):
+        reverse = [(column, not descending) for column, descending in order]
+        query = query.filter(_after(reverse, before_values))
+        order = reverse
+        backwards = True
+    else:
+        backwards = False
+        after_values = None
+
+    query = query.order_by(*[column.desc() if descending else column.asc() for column, descending in order])
+    rows = query.limit(per_page + 1).all()
+    more = len(rows) > per_page
+    rows = rows[:per_page]
+    if backwards:
+        rows.reverse()
+
+    next_cursor = prev_cursor = None
+    if rows:
+        first, last = encode_cursor(key(rows[0])), encode_cursor(key(rows[-1]))
+        if backwards:
+            next_cursor = last
+            prev_cursor = first if more else None
+        else:
+            next_cursor = last if more else None
+            prev_cursor = first if after_values is not None else None
+    return KeysetPage(rows, next_cursor, prev_cursor)
@@ -0,0 +1,77 @@
+"""Per-request SQL statement counting and N+1 detection used by app.py.
+
+Every statement sent to the database is counted against the active
+RequestQueries, and ORM lazy loads are tallied by relationship: the same
+relationship lazy-loaded once per row of a list is the N+1 pattern. Routes
+declare a statement budget and the eager-loading options their list
+queries need with ``query_profile``. Nothing in here touches Flask; app.py
+decides when a request is watched and what happens when it overspends.
+"""
+from collections import Counter, namedtuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# A relationship lazy-loaded at least this often in one request is reported
+REPEAT_THRESHOLD = 3
+
+
+class RequestQueries:
+    """Statements and lazy loads issued while handling one request"""
+
+    def __init__(self):
+        self.statements = 0
+        self.lazy_loads = Counter()
+
+    def repeated_lazy_loads(self, threshold=REPEAT_THRESHOLD):
+        """(relationship, count) pairs loaded one row at a time, worst first"""
+        return [(name, count) for name, count in self.lazy_loads.most_common() if count >= threshold]
+
+    def summary(self):
+        text = f"{self.statements} statements"
+        repeated = self.repeated_lazy_loads()
+        if repeated:
+            text += "; repeated lazy loads: " + ", ".join(f"{name} x{count}" for name, count in repeated)
+        return text
+
+
+def install(session, current):
+    """Count statements on every engine and lazy loads on ``session``.
+
+    ``current`` returns the RequestQueries to charge, or None when nothing is
+    being watched.
+    """
+    @event.listens_for(Engine, "before_cursor_execute")
+    def count_statement(conn, cursor, statement, parameters, context, executemany):
+        watched = current()
+        if watched is not None:
+            watched.statements += 1
+
+    @event.listens_for(session, "do_orm_execute")
+    def count_lazy_load(orm_execute_state):
+        if not orm_execute_state.is_select or orm_execute_state.lazy_loaded_from is None:
+            return
+        watched = current()
+        if watched is not None:
+            path = orm_execute_state.loader_strategy_path
+            watched.lazy_loads[str(path[-1]) if path else "?"] += 1
+
+
+Profile = namedtuple("Profile", "budget options")
+PROFILES = {}
+
+
+def query_profile(budget=None, load=()):
+    """Declare a view's statement budget and the loader options its list queries apply.
+
+    ``load`` holds SQLAlchemy loader options (selectinload, joinedload, ...).
+    Profiles are keyed by the view function's name, which is its endpoint.
+    """
+    def decorator(f):
+        PROFILES[f.__name__] = Profile(budget, tuple(load))
+        return f
+    return decorator
+
+
+def profile_for(endpoint):
+    return PROFILES.get(endpoint)
@@ -0,0 +1,362 @@
+"""In-memory scheduling structures used by app.py.
+
+Nothing in here touches Flask or the database; app.py loads rows into these
+structures and keeps them in sync when events are written.
+"""
+import random
+from calendar import monthrange
+from datetime import timedelta
+from threading import RLock
+
+
+class _Node:
+    __slots__ = ("start", "end", "key", "priority", "max_end", "left", "right")
+
+    def __init__(self, start, end, key):
+        self.start = start
+        self.end = end
+        self.key = key
+        self.priority = random.random()
+        self.max_end = end
+        self.left = None
+        self.right = None
+
+
+def _update(node):
+    node.max_end = node.end
+    if node.left is not None and node.left.max_end > node.max_end:
+        node.max_end = node.left.max_end
+    if node.right is not None and node.right.max_end > node.max_end:
+        node.max_end = node.right.max_end
+
+
+def _rotate_right(node):
+    pivot = node.left
+    node.left = pivot.right
+    pivot.right = node
+    _update(node)
+    _update(pivot)
+    return pivot
+
+
+def _rotate_left(node):
+    pivot = node.right
+    node.right = pivot.left
+    pivot.left = node
+    _update(node)
+    _update(pivot)
+    return pivot
+
+
+class IntervalTree:
+    """Augmented treap of (start, end, key) intervals.
+
+    Nodes are ordered by (start, key) and carry the largest end in their
+    subtree, so an overlap query only descends into subtrees that can
+    contain a match: O(log n + k) on average.
+    """
+
+    def __init__(self):
+        self._root = None
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def insert(self, start, end, key):
+        self._root = self._insert(self._root, _Node(start, end, key))
+        self._size += 1
+
+    def _insert(self, node, new):
+        if node is None:
+            return new
+        if (new.start, new.key) < (node.start, node.key):
+            node.left = self._insert(node.left, new)
+            if node.left.priority > node.priority:
+                return _rotate_right(node)
+        else:
+            node.right = self._insert(node.right, new)
+            if node.right.priority > node.priority:
+                return _rotate_left(node)
+        _update(node)
+        return node
+
+    def remove(self, start, key):
+        """Remove the interval stored under (start, key); returns True if found"""
+        size = self._size
+        self._root = self._remove(self._root, start, key)
+        return self._size < size
+
+    def _remove(self, node, start, key):
+        if node is None:
+            return None
+        if (start, key) < (node.start, node.key):
+            node.left = self._remove(node.left, start, key)
+        elif (start, key) > (node.start, node.key):
+            node.right = self._remove(node.right, start, key)
+        else:
+            self._size -= 1
+            return self._merge(node.left, node.right)
+        _update(node)
+        return node
+
+    def _merge(self, left, right):
+        if left is None:
+            return right
+        if right is None:
+            return left
+        if left.priority > right.priority:
+            left.right = self._merge(left.right, right)
+            _update(left)
+            return left
+        right.left = self._merge(left, right.left)
+        _update(right)
+        return right
+
+    def overlapping(self, start, end):
+        """Yield (start, end, key) for intervals overlapping [start, end).
+
+        Zero-length intervals (point events) match when they fall inside
+        the window.
+        """
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            if node is None or node.max_end < start:
+                continue
+            stack.append(node.left)
+            if node.start < end:
+                if node.end > start or node.start >= start:
+                    yield node.start, node.end, node.key
+                stack.append(node.right)
+
+
+class EventIndex:
+    """Interval trees of event times, one per project id (None = no project).
+
+    ``events`` remembers where each event id lives so updates and deletes can
+    be applied incrementally instead of rebuilding the trees. ``version`` is
+    the caller's change counter for the data the trees reflect; a caller
+    that sees a different counter knows someone else has written since.
+    """
+
+    def __init__(self):
+        self._lock = RLock()
+        self.trees = {}
+        self.events = {}
+        self.loaded = False
+        self.version = None
+
+    def clear(self):
+        with self._lock:
+            self.trees = {}
+            self.events = {}
+            self.loaded = False
+            self.version = None
+
+    def load(self, rows, version=None):
+        """Rebuild from (id, project_id, start, end) rows, read at change counter ``version``"""
+        with self._lock:
+            self.trees = {}
+            self.events = {}
+            for event_id, project_id, start, end in rows:
+                self._add(event_id, project_id, start, end)
+            self.loaded = True
+            self.version = version
+
+    def advance(self, count):
+        """Account for ``count`` counter bumps made by writes this index has applied itself"""
+        with self._lock:
+            if self.version is not None:
+                self.version += count
+
+    def _add(self, event_id, project_id, start, end):
+        if end is None or end < start:
+            end = start
+        self.trees.setdefault(project_id, IntervalTree()).insert(start, end, event_id)
+        self.events[event_id] = (project_id, start)
+
+    def _discard(self, event_id):
+        placed = self.events.pop(event_id, None)
+        if placed is None:
+            return
+        project_id, start = placed
+        tree = self.trees.get(project_id)
+        if tree is not None:
+            tree.remove(start, event_id)
+            if not len(tree):
+                del self.trees[project_id]
+
+    def upsert(self, event_id, project_id, start, end):
+        with self._lock:
+            self._discard(event_id)
+            self._add(event_id, project_id, start, end)
+
+    def remove(self, event_id):
+        with self._lock:
+            self._discard(event_id)
+
+    def overlapping(self, start, end, project_ids, exclude=None):
+        """Event ids in any of ``project_ids`` overlapping [start, end)"""
+        found = set()
+        with self._lock:
+            for project_id in project_ids:
+                tree = self.trees.get(project_id)
+                if tree is None:
+                    continue
+                for _, _, event_id in tree.overlapping(start, end):
+                    if event_id != exclude:
+                        found.add(event_id)
+        return found
+
+
+FREQUENCIES = ("DAILY", "WEEKLY", "MONTHLY", "YEARLY")
+
+
+class Recurrence:
+    """RRULE-style recurrence (FREQ, INTERVAL, UNTIL, COUNT, EXDATE).
+
+    Occurrence k starts at ``dtstart`` plus k steps. Occurrences are computed
+    directly from their index, so expanding a window costs O(occurrences in
+    the window) however long ago the series started. As in RFC 5545,
+    month/year steps that land on a missing day (Feb 30) are skipped and do
+    not count towards COUNT.
+    """
+
+    def __init__(self, dtstart, freq, interval=1, until=None, count=None, exdates=()):
+        if freq not in FREQUENCIES:
+            raise ValueError(f"unsupported frequency {freq!r}")
+        self.dtstart = dtstart
+        self.freq = freq
+        self.interval = max(int(interval or 1), 1)
+        self.until = until
+        self.count = count
+        self.exdates = frozenset(exdates)
+        if freq == "DAILY":
+            self._step = timedelta(days=self.interval)
+        elif freq == "WEEKLY":
+            self._step = timedelta(weeks=self.interval)
+        else:
+            self._step = None
+            self._months = self.interval * (12 if freq == "YEARLY" else 1)
+        self.last_index = self._find_last_index()
+
+    def _raw(self, k):
+        """Start of raw occurrence k, or None when it falls on a missing day"""
+        if self._step is not None:
+            return self.dtstart + k * self._step
+        month0 = self.dtstart.month - 1 + k * self._months
+        try:
+            return self.dtstart.replace(year=self.dtstart.year + month0 // 12, month=month0 % 12 + 1)
+        except ValueError:
+            return None
+
+    def _first_index_at_or_after(self, moment):
+        if moment <= self.dtstart:
+            return 0
+        if self._step is not None:
+            k = -(-(moment - self.dtstart) // self._step)
+        else:
+            months = (moment.year - self.dtstart.year) * 12 + moment.month - self.dtstart.month
+            k = max(months // self._months, 0)
+            while self._month_start(k) < moment:
+                k += 1
+        return k
+
+    def _month_start(self, k):
+        # Raw occurrence k with the day clamped, used only for index arithmetic
+        month0 = self.dtstart.month - 1 + k * self._months
+        year, month = self.dtstart.year + month0 // 12, month0 % 12 + 1
+        day = min(self.dtstart.day, monthrange(year, month)[1])
+        return self.dtstart.replace(year=year, month=month, day=day)
+
+    def _find_last_index(self):
+        last = None
+        if self.until is not None:
+            if self.until < self.dtstart:
+                return -1
+            last = self._first_index_at_or_after(self.until)
+            if self._raw(last) is None or self._raw(last) > self.until:
+                last -= 1
+        if self.count is not None:
+            if self._step is not None or self.dtstart.day <= 28:
+                by_count = self.count - 1
+            else:
+                by_count, valid = -1, 0
+                while valid < self.count:
+                    by_count += 1
+                    if self._raw(by_count) is not None:
+                        valid += 1
+            last = by_count if last is None else min(last, by_count)
+        return last
+
+    def _emit(self, k):
+        start = self._raw(k)
+        if start is None or start in self.exdates:
+            return None
+        return start
+
+    def after(self, moment, inclusive=False):
+        """Occurrence starts after ``moment`` in ascending order (lazy, may be infinite)"""
+        k = self._first_index_at_or_after(moment)
+        while self.last_index is None or k <= self.last_index:
+            start = self._emit(k)
+            if start is not None and (start > moment or (inclusive and start == moment)):
+                yield start
+            k += 1
+
+    def before(self, moment):
+        """Occurrence starts at or before ``moment`` in descending order"""
+        k = self._first_index_at_or_after(moment)
+        if self.last_index is not None:
+            k = min(k, self.last_index)
+        while k >= 0:
+            start = self._emit(k)
+            if start is not None and start <= moment:
+                yield start
+            k -= 1
+
+    def between(self, range_start, range_end, duration=timedelta(0)):
+        """Occurrence starts whose [start, start + duration) overlaps [range_start, range_end)"""
+        for start in self.after(range_start - duration, inclusive=True):
+            if start >= range_end:
+                return
+            if start + duration > range_start or start >= range_start:
+                yield start
+
+    def last_start(self):
+        """Start of the final occurrence (ignoring EXDATEs), or None if open-ended"""
+        if self.last_index is None:
+            return None
+        for k in range(self.last_index, -1, -1):
+            start = self._raw(k)
+            if start is not None:
+                return start
+        return None
+
+
+def merge_intervals(intervals):
+    """Sweep-line merge of (start, end) pairs sorted by start into disjoint busy blocks"""
+    merged = []
+    for start, end in intervals:
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1][1] = end
+        else:
+            merged.append([start, end])
+    return [tuple(block) for block in merged]
+
+
+def free_slots(busy, window_start, window_end, min_duration):
+    """Gaps of at least ``min_duration`` between merged busy blocks inside the window"""
+    slots = []
+    cursor = window_start
+    for start, end in busy:
+        if start > cursor and min(start, window_end) - cursor >= min_duration:
+            slots.append((cursor, min(start, window_end)))
+        cursor = max(cursor, end)
+        if cursor >= window_end:
+            return slots
+    if window_end - cursor >= min_duration:
+        slots.append((cursor, window_end))
+    return slots
@@ -0,0 +1,202 @@
+"""Full-text search index over clients, buildings, projects, events and users.
+
+Every searchable row is one document (title + body) in a single
+``search_index`` table: an FTS5 virtual table on SQLite, an InnoDB table
+with a FULLTEXT index on MySQL, and a plain table matched with LIKE on
+anything else. Document ids encode (entity, id), so a row's document is
+replaced or deleted by primary key. app.py decides what text each row
+contributes and keeps the index in step with writes; this module only
+stores and queries documents.
+"""
+import re
+
+import sqlalchemy as sa
+
+ENTITIES = ("client", "building", "project", "event", "user")
+MAX_TERMS = 8
+_TERM_RE = re.compile(r"\w+", re.UNICODE)
+_CHUNK = 500
+
+
+def doc_id(entity, entity_id, entities=ENTITIES):
+    """Document id of a row; `entities` is the numbering in use (migrations pass the one of their revision)"""
+    return entity_id * len(entities) + entities.index(entity)
+
+
+def query_terms(q):
+    """Lower-cased word tokens of a search box query, each matched as a prefix"""
+    return _TERM_RE.findall((q or "").lower())[:MAX_TERMS]
+
+
+class SearchIndex:
+    """Base class: row storage is shared, matching and ranking are per database"""
+
+    key = "doc_id"
+
+    def __init__(self):
+        self.table = sa.table(
+            "search_index",
+            sa.column(self.key), sa.column("entity"), sa.column("entity_id"),
+            sa.column("title"), sa.column("body"),
+        )
+
+    def create(self, connection):
+        raise NotImplementedError
+
+    def drop(self, connection):
+        connection.execute(sa.text("DROP TABLE IF EXISTS search_index"))
+
+    def insert(self, connection, documents, entities=ENTITIES):
+        """Add (entity, entity_id, title, body) documents that are not indexed yet"""
+        rows = [
+            {self.key: doc_id(entity, entity_id, entities), "entity": entity, "entity_id": entity_id,
+             "title": title or "", "body": body or ""}
+            for entity, entity_id, title, body in documents
+        ]
+        if rows:
+            connection.execute(self.table.insert(), rows)
+
+    def delete(self, connection, keys):
+        """Remove the documents of (entity, entity_id) pairs"""
+        ids = [doc_id(entity, entity_id) for entity, entity_id in keys]
+        key = self.table.c[self.key]
+        for i in range(0, len(ids), _CHUNK):
+            connection.execute(self.table.delete().where(key.in_(ids[i:i + _CHUNK])))
+
+    def upsert(self, connection, documents):
+        documents = list(documents)
+        self.delete(connection, [(entity, entity_id) for entity, entity_id, _, _ in documents])
+        self.insert(connection, documents)
+
+    def matches(self, terms):
+        raise NotImplementedError
+
+    def score(self, terms):
+        """Relevance expression, higher is better"""
+        raise NotImplementedError
+
+    def ranked(self, stmt, terms, limit):
+        """stmt ordered best first and cut to `limit`, with ranking left to the full-text engine"""
+        return stmt.order_by(sa.desc("score")).limit(limit)
+
+    def of_entity(self, entity):
+        # Filter on the document id rather than the entity column, which FTS5 would have to read
+        return self.table.c[self.key] % len(ENTITIES) == ENTITIES.index(entity)
+
+    def ids_matching(self, entity, q):
+        """SELECT of the ids of `entity` rows matching q, for use in an IN filter"""
+        terms = query_terms(q)
+        t = self.table
+        return sa.select(t.c.entity_id).where(
+            self.matches(terms) if terms else sa.false(), self.of_entity(entity))
+
+    def search(self, connection, q, allowed, limit):
+        """Top `limit` (entity, entity_id, score) hits, best first.
+
+        ``allowed`` maps each entity to search to None (every row), a list of
+        ids or a SELECT of the ids the caller may see. Every match is ranked;
+        the limit applies to the ranked list.
+        """
+        terms = query_terms(q)
+        if not terms or not allowed:
+            return []
+        t = self.table
+        key = t.c[self.key]
+        scopes = []
+        for entity, ids in allowed.items():
+            if ids is None:
+                scopes.append(self.of_entity(entity))
+            elif isinstance(ids, (list, tuple, set)):
+                scopes.append(key.in_([doc_id(entity, i) for i in ids]))
+            else:
+                scopes.append(sa.and_(self.of_entity(entity), t.c.entity_id.in_(ids)))
+        stmt = (
+            sa.select(t.c.entity, t.c.entity_id, self.score(terms).label("score"))
+            .where(self.matches(terms), sa.or_(*scopes))
+        )
+        stmt = self.ranked(stmt, terms, limit)
+        return [(row.entity, row.entity_id, float(row.score or 0)) for row in connection.execute(stmt)]
+
+
+class SQLiteSearchIndex(SearchIndex):
+    """FTS5 with prefix indexes; ranked by BM25 with the title weighted over the body"""
+
+    key = "rowid"
+
+    def create(self, connection):
+        connection.execute(sa.text(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5("
+            "entity UNINDEXED, entity_id UNINDEXED, title, body, "
+            "prefix='2 3', tokenize='unicode61 remove_diacritics 2')"
+        ))
+
+    def matches(self, terms):
+        expression = " ".join(f'"{term}"*' for term in terms)
+        return sa.literal_column("search_index").op("MATCH")(expression)
+
+    # The weights bm25() applies through FTS5's rank column: title over body, the unindexed columns ignored
+    RANK = "bm25(0.0, 0.0, 10.0, 1.0)"
+
+    def score(self, terms):
+        return -sa.literal_column("rank")
+
+    def ranked(self, stmt, terms, limit):
+        # ORDER BY rank is sorted inside FTS5; ORDER BY an arbitrary bm25() expression would be sorted by SQLite
+        rank = sa.literal_column("rank")
+        return stmt.where(rank.op("MATCH")(self.RANK)).order_by(rank).limit(limit)
+
+
+class MySQLSearchIndex(SearchIndex):
+    """InnoDB FULLTEXT in boolean mode. Terms shorter than innodb_ft_min_token_size (3) are not indexed."""
+
+    def create(self, connection):
+        connection.execute(sa.text(
+            "CREATE TABLE IF NOT EXISTS search_index ("
+            "doc_id BIGINT NOT NULL PRIMARY KEY, entity VARCHAR(20) NOT NULL, entity_id INT NOT NULL, "
+            "title VARCHAR(255) NOT NULL, body TEXT NOT NULL, "
+            "FULLTEXT KEY ft_search_index (title, body)) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4"
+        ))
+
+    def _match(self, terms):
+        from sqlalchemy.dialects.mysql import match
+        return match(self.table.c.title, self.table.c.body,
+                     against=" ".join(f"+{term}*" for term in terms)).in_boolean_mode()
+
+    def matches(self, terms):
+        return self._match(terms) > 0
+
+    def score(self, terms):
+        return self._match(terms)
+
+
+class LikeSearchIndex(SearchIndex):
+    """Portable fallback: every term must prefix-match a word start in the title or body"""
+
+    def create(self, connection):
+        connection.execute(sa.text(
+            "CREATE TABLE IF NOT EXISTS search_index ("
+            "doc_id BIGINT NOT NULL PRIMARY KEY, entity VARCHAR(20) NOT NULL, entity_id INTEGER NOT NULL, "
+            "title VARCHAR(255) NOT NULL, body TEXT NOT NULL)"
+        ))
+
+    def matches(self, terms):
+        t = self.table
+        return sa.and_(*[
+            sa.or_(*[column.ilike(pattern) for column in (t.c.title, t.c.body)
+                     for pattern in (f"{term}%", f"% {term}%")])
+            for term in terms
+        ])
+
+    def score(self, terms):
+        return sa.case((self.table.c.title.ilike(f"{terms[0]}%"), 1), else_=0)
+
+
+_INDEXES = {}
+
+
+def search_index_for(dialect_name):
+    """Shared SearchIndex for a SQLAlchemy dialect name"""
+    if dialect_name not in _INDEXES:
+        cls = {"sqlite": SQLiteSearchIndex, "mysql": MySQLSearchIndex, "mariadb": MySQLSearchIndex}
+        _INDEXES[dialect_name] = cls.get(dialect_name, LikeSearchIndex)()
+    return _INDEXES[dialect_name]
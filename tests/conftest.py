@@ -0,0 +1,140 @@
+import os
+import sys
+import tempfile
+from datetime import date, datetime, timedelta
+
+import pytest
+
+# app.py reads DATABASE_URL at import time
+_db_file = tempfile.NamedTemporaryFile(prefix="pms-test-", suffix=".db", delete=False)
+_db_file.close()
+os.environ["DATABASE_URL"] = "sqlite:///" + _db_file.name
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as pms  # noqa: E402
+
+PASSWORD = "test-pass"
+EMPLOYEES = 5
+CLIENT_USERS = 8
+CLIENTS = 25
+BUILDINGS = 25
+PROJECTS = 80
+EVENTS = 400
+SERIES = 15
+TIME_ENTRIES = 1500
+ACTIVITIES = 400
+NOTIFICATIONS = 60
+ZIPS = ("08401", "08540", "10001", "19103", "19801", "99999")  # the last is not in the seed centroids
+
+
+def seed():
+    """A realistically sized tree: every list view pages and every user has many related rows"""
+    db = pms.db
+    now = datetime(2026, 6, 15, 12, 0)
+    users = [pms.User(email=f"emp{i}@test", name=f"Employee {i}", role="employee") for i in range(EMPLOYEES)]
+    users += [pms.User(email=f"client{i}@test", name=f"Client User {i}", role="client") for i in range(CLIENT_USERS)]
+    for user in users:
+        user.set_password(PASSWORD)
+    clients = [pms.Client(name=f"Client {i}", contact=f"Contact {i}", city="Atlantic City", state="NJ",
+                          zip=ZIPS[i % len(ZIPS)]) for i in range(CLIENTS)]
+    buildings = [pms.Building(name=f"Building {i}", city="Princeton", state="NJ", zip=ZIPS[i % len(ZIPS)])
+                 for i in range(BUILDINGS)]
+    db.session.add_all(users + clients + buildings)
+    db.session.flush()
+
+    statuses = ("Planned", "In Progress", "Done", "On Hold")
+    projects = [pms.Project(name=f"Project {i}", client_id=clients[i % CLIENTS].id,
+                            building_id=buildings[i % BUILDINGS].id, status=statuses[i % len(statuses)],
+                            description=f"Scope of work {i}", due_date=date(2026, 1, 1) + timedelta(days=5 * i))
+                for i in range(PROJECTS)]
+    db.session.add_all(projects)
+    db.session.flush()
+
+    employees, client_users = users[:EMPLOYEES], users[EMPLOYEES:]
+    for i, user in enumerate(client_users):
+        for j in range(3 + i % 6):
+            db.session.add(pms.ProjectAssignment(project_id=projects[(i * 7 + j) % PROJECTS].id, user_id=user.id))
+    for i in range(EVENTS):
+        start = now + timedelta(days=i % 360 - 180, hours=i % 9)
+        db.session.add(pms.Event(title=f"Event {i}", event_type=("Site Visit", "Client Meeting")[i % 2],
+                                 start=start, end=start + timedelta(hours=2), project_id=projects[i % PROJECTS].id))
+    for i in range(SERIES):
+        start = now - timedelta(days=60 - i)
+        db.session.add(pms.Event(title=f"Standup {i}", event_type="Client Meeting", start=start,
+                                 end=start + timedelta(minutes=30), project_id=projects[i * 3].id,
+                                 recurrence_freq="WEEKLY", recurrence_interval=1))
+    db.session.flush()
+    for series in pms.Event.query.filter(pms.Event.recurrence_freq.isnot(None)).limit(5):
+        # A moved occurrence: an override row pointing at its series
+        moved = series.start + timedelta(weeks=10)
+        db.session.add(pms.Event(title=f"{series.title} (moved)", event_type=series.event_type,
+                                 start=moved + timedelta(hours=3), end=moved + timedelta(hours=4),
+                                 project_id=series.project_id, series_id=series.id, original_start=moved))
+    # A client whose recent window is nearly empty, so its event list also looks for older events
+    quiet = pms.Client(name="Quiet Client")
+    db.session.add(quiet)
+    db.session.flush()
+    quiet_project = pms.Project(name="Quiet Project", client_id=quiet.id, building_id=buildings[0].id,
+                                 status="On Hold")
+    db.session.add(quiet_project)
+    db.session.flush()
+    for days in (-5, 3, -200, -230, -260, -290, -320):
+        start = now + timedelta(days=days)
+        db.session.add(pms.Event(title=f"Quiet {days}", start=start, end=start + timedelta(hours=1),
+                                 project_id=quiet_project.id))
+    db.session.add(pms.Event(title="Quiet standup", start=now - timedelta(days=30), project_id=quiet_project.id,
+                             end=now - timedelta(days=30) + timedelta(minutes=15), recurrence_freq="WEEKLY"))
+    for i in range(TIME_ENTRIES):
+        db.session.add(pms.TimeEntry(user_id=employees[i % EMPLOYEES].id, project_id=projects[i % PROJECTS].id,
+                                     hours=1 + i % 7, description=f"Work {i}",
+                                     timestamp=now - timedelta(hours=5 * i)))
+    for i in range(ACTIVITIES):
+        db.session.add(pms.Activity(user_id=employees[i % EMPLOYEES].id, project_id=projects[i % PROJECTS].id,
+                                    happened_at=now - timedelta(hours=3 * i)))
+    for i in range(NOTIFICATIONS):
+        db.session.add(pms.Notification(sender_id=users[i % len(users)].id,
+                                        recipient_id=employees[i % EMPLOYEES].id if i % 3 else None,
+                                        project_id=projects[i % PROJECTS].id if i % 2 else None,
+                                        message=f"Message {i}", is_read=bool(i % 4)))
+    db.session.commit()
+
+
+@pytest.fixture(scope="session")
+def app(tmp_path_factory):
+    pms.app.config.update(TESTING=True, REPORT_JOBS_DIR=str(tmp_path_factory.mktemp("report_jobs")))
+    with pms.app.app_context():
+        pms.db.drop_all()
+        pms.db.create_all()
+        index = pms.search_index()
+        index.drop(pms.db.session.connection())
+        index.create(pms.db.session.connection())
+        pms.db.session.commit()
+        seed()
+    yield pms.app
+    os.unlink(_db_file.name)
+
+
+@pytest.fixture(autouse=True)
+def cold_caches():
+    """Each test sees the first, uncached request: the worst case a budget has to cover"""
+    for cache in (pms.dashboard_cache, pms.access_cache, pms.project_detail_cache):
+        cache.clear()
+    yield
+
+
+def login(app, email):
+    client = app.test_client()
+    response = client.post("/", data={"email": email, "password": PASSWORD})
+    assert response.status_code == 302
+    return client
+
+
+@pytest.fixture
+def employee(app):
+    return login(app, "emp0@test")
+
+
+@pytest.fixture
+def client_user(app):
+    # The client user with the most assigned projects
+    return login(app, f"client{CLIENT_USERS - 3}@test")
@@ -0,0 +1,24 @@
+"""Cached project access follows assignment changes made by other processes"""
+import app as pms
+
+
+def test_unassignment_in_another_process_revokes_access(app, client_user):
+    with app.app_context():
+        user = pms.User.query.filter_by(email="client5@test").one()
+        project_id = pms.ProjectAssignment.query.filter_by(user_id=user.id).first().project_id
+        user_id = user.id
+    assert client_user.get(f"/projects/{project_id}").status_code == 200  # caches the user's access
+
+    # Another worker unassigns the user: its commit hooks never run here, only the version bump is shared
+    assignment, version = pms.ProjectAssignment.__table__, pms.ScopeVersion.__table__
+    with app.app_context(), pms.db.engine.begin() as connection:
+        row = connection.execute(assignment.select().where(assignment.c.user_id == user_id,
+                                                           assignment.c.project_id == project_id)).one()
+        connection.execute(assignment.delete().where(assignment.c.id == row.id))
+        pms.bump_scope_versions(connection, {f"user:{user_id}", f"project:{project_id}"})
+    try:
+        assert client_user.get(f"/projects/{project_id}").status_code in (302, 403, 404)
+    finally:
+        with app.app_context(), pms.db.engine.begin() as connection:
+            connection.execute(assignment.insert().values(row._asdict()))
+            pms.bump_scope_versions(connection, {f"user:{user_id}", f"project:{project_id}"})
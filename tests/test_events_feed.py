@@ -0,0 +1,59 @@
+"""The calendar's JSON feed: range bounds and revalidation"""
+from datetime import datetime, timedelta
+
+import app as pms
+
+RANGE = "/api/events?start=2026-08-03&end=2026-08-10"
+
+
+def test_unchanged_feed_revalidates_without_event_queries(employee):
+    response = employee.get(RANGE)
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+    revalidated = employee.get(RANGE, headers={"If-None-Match": etag})
+    assert revalidated.status_code == 304
+    assert int(revalidated.headers["X-Query-Count"]) < int(response.headers["X-Query-Count"])
+    assert employee.get(RANGE.replace("08-10", "08-11"), headers={"If-None-Match": etag}).status_code == 200
+
+
+def test_event_write_changes_the_etag(app, employee):
+    etag = employee.get(RANGE).headers["ETag"]
+    response = employee.post("/events/create", data={"title": "Crane on site", "start": "2026-07-27T08:00",
+                                                      "end": "2026-08-05T17:00", "project_id": 1})
+    assert response.status_code == 302
+    response = employee.get(RANGE, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    # Starts before the range but still overlaps it
+    assert "Crane on site" in [item["title"] for item in response.get_json()]
+
+
+def test_events_longer_than_the_span_are_rejected(app, employee):
+    response = employee.post("/events/create", data={"title": "Whole summer", "start": "2026-06-01T08:00",
+                                                     "end": "2026-09-01T17:00", "project_id": 1},
+                             follow_redirects=True)
+    assert b"Event not created: events can last at most 31 days." in response.data
+    with app.app_context():
+        assert pms.Event.query.filter_by(title="Whole summer").count() == 0
+        event = pms.Event.query.filter_by(title="Event 1").one()
+        start, end, event_id = event.start, event.end, event.id
+    response = employee.post(f"/events/edit/{event_id}", data={"title": "Event 1 (edited)",
+                                                               "start": start.isoformat(),
+                                                               "end": "2027-01-01T00:00"},
+                             follow_redirects=True)
+    assert b"Event not updated: events can last at most 31 days." in response.data
+    with app.app_context():
+        event = pms.db.session.get(pms.Event, event_id)
+        assert (event.title, event.end) == ("Event 1", end)
+
+
+def test_existing_long_events_stay_in_the_feed(app, employee):
+    """Rows saved before the span limit are flagged long_running and still found far past their start"""
+    with app.app_context():
+        start = datetime(2026, 3, 2, 8, 0)
+        lease = pms.Event(title="Crane lease", start=start, end=start + timedelta(days=120), project_id=3)
+        pms.db.session.add(lease)
+        pms.db.session.commit()
+        assert lease.long_running
+    response = employee.get("/api/events?start=2026-06-01&end=2026-06-08")
+    assert "Crane lease" in [item["title"] for item in response.get_json()]
+
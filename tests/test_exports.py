@@ -0,0 +1,15 @@
+"""Dataset exports: filters must apply to the dataset"""
+
+
+def test_filter_the_dataset_lacks_is_rejected(employee):
+    response = employee.get("/export/projects.csv?user_id=1")
+    assert response.status_code == 400
+    assert b"Not a filter for projects exports: user_id" in response.data
+    assert employee.get("/export/time-entries.csv?event_type=meeting").status_code == 400
+
+
+def test_filter_the_dataset_has_is_applied(employee):
+    response = employee.get("/export/projects.csv?project_id=1")
+    assert response.status_code == 200
+    rows = response.get_data(as_text=True).splitlines()
+    assert len(rows) == 2 and rows[1].startswith("1,")
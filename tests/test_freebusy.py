@@ -0,0 +1,28 @@
+"""Busy blocks include every event that overlaps the window, however early it started"""
+from datetime import datetime, timedelta
+
+import app as pms
+
+
+def busy(employee, project_id, start, end):
+    response = employee.get(f"/api/freebusy?project_id={project_id}&start={start}&end={end}")
+    assert response.status_code == 200
+    return response.get_json()["busy"]
+
+
+def test_events_that_start_before_the_window(employee):
+    employee.post("/events/create", data={"title": "Scaffold up", "start": "2026-09-01T08:00",
+                                          "end": "2026-09-12T17:00", "project_id": 2})
+    blocks = busy(employee, 2, "2026-09-10T09:00", "2026-09-10T12:00")
+    assert len(blocks) == 1 and blocks[0][0].startswith("2026-09-10T09:00")
+
+
+def test_existing_long_events_count_as_busy(app, employee):
+    """A room booked before the span limit must not be offered as free months into the booking"""
+    with app.app_context():
+        start = datetime(2026, 10, 1, 8, 0)
+        pms.db.session.add(pms.Event(title="Room closed for renovation", start=start,
+                                     end=start + timedelta(days=90), project_id=4))
+        pms.db.session.commit()
+    blocks = busy(employee, 4, "2026-12-14T09:00", "2026-12-14T17:00")
+    assert len(blocks) == 1 and blocks[0][0].startswith("2026-12-14T09:00")
@@ -0,0 +1,84 @@
+"""The location index stays exact while points are added, moved and removed in place"""
+import random
+
+import app as pms
+from geo import LocationIndex, haversine_miles
+
+
+def brute_force(points, lat, lon, k):
+    hits = sorted((haversine_miles(lat, lon, plat, plon), key) for key, (plat, plon) in points.items())
+    return [key for _, key in hits[:k]]
+
+
+def test_incremental_writes_match_a_rebuilt_index():
+    rng = random.Random(7)
+    index = LocationIndex()
+    index.load((i, rng.uniform(25, 49), rng.uniform(-124, -67)) for i in range(500))
+    index.nearest(40, -75, 1)  # builds the tree; every later write changes it in place
+    points = dict(index.points)
+    for step in range(400):
+        key = rng.randrange(700)
+        if step % 3 == 0:
+            index.remove(key)
+            points.pop(key, None)
+        else:
+            lat, lon = rng.uniform(25, 49), rng.uniform(-124, -67)
+            index.upsert(key, lat, lon)
+            points[key] = (lat, lon)
+        if step % 50 == 0:
+            lat, lon = rng.uniform(25, 49), rng.uniform(-124, -67)
+            assert [key for key, _ in index.nearest(lat, lon, 10)] == brute_force(points, lat, lon, 10)
+            within = {key for key, miles in index.within(lat, lon, 300)}
+            assert within == {key for key, (plat, plon) in points.items()
+                              if haversine_miles(lat, lon, plat, plon) <= 300}
+    assert len(index) == len(points)
+
+
+def tree_depth(node):
+    depth, stack = 0, [(node, 1)]
+    while stack:
+        node, level = stack.pop()
+        if node is not None:
+            depth = max(depth, level)
+            stack += [(node.left, level + 1), (node.right, level + 1)]
+    return depth
+
+
+def test_buildings_sharing_a_centroid_do_not_chain_the_tree():
+    rng = random.Random(11)
+    index = LocationIndex()
+    index.load((i, rng.uniform(25, 49), rng.uniform(-124, -67)) for i in range(4000))
+    index.nearest(40, -75, 1)
+    # Fewer than half the points, so only the depth check can trigger the rebuild
+    for key in range(4000, 5900):
+        index.upsert(key, 39.36, -74.43)
+        if key % 100 == 0:
+            assert tree_depth(index._root()) <= 4 * len(index.points).bit_length() + 1
+    nearest = index.nearest(39.36, -74.43, 3)
+    assert len(nearest) == 3 and all(miles < 0.01 for _, miles in nearest)
+
+
+def test_unlocated_keys_are_tracked():
+    index = LocationIndex()
+    index.load([(1, 40.0, -75.0), (2, None, None)])
+    assert index.unlocated == {2}
+    index.upsert(2, 40.1, -75.1)
+    index.upsert(1, None, None)
+    assert index.unlocated == {1}
+    assert [key for key, _ in index.nearest(40, -75, 5)] == [2]
+    index.remove(1)
+    assert not index.unlocated
+
+
+def test_nearby_reports_unlocated_buildings(employee):
+    response = employee.get("/api/buildings/near?building=1&radius=50")
+    assert response.status_code == 200
+    assert response.get_json()["unlocated"] > 0  # the seed's 99999 buildings
+
+
+def test_saving_an_unlocated_building_warns(app, employee):
+    response = employee.post("/buildings/create", data={"name": "Nowhere Depot", "zip": "99999"},
+                             follow_redirects=True)
+    assert b"will not appear in nearby searches" in response.data
+    with app.app_context():
+        assert pms.Building.query.filter_by(name="Nowhere Depot").one().latitude is None
@@ -0,0 +1,75 @@
+"""VTIMEZONE components agree with the zone database, and feeds define every TZID they use"""
+import calendar
+import random
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+import pytest
+
+import app as pms
+import ical
+
+ZONES = ["America/New_York", "Europe/London", "Asia/Kolkata", "Australia/Sydney", "America/Sao_Paulo",
+         "Pacific/Auckland", "America/Santiago", "Europe/Moscow"]
+
+
+def parse_offset(value):
+    sign = -1 if value[0] == "-" else 1
+    return sign * timedelta(hours=int(value[1:3]), minutes=int(value[3:5]), seconds=int(value[5:7] or 0))
+
+
+def onsets(properties, until_year):
+    """UTC instants at which each observance starts, with the offset it sets"""
+    found, current = [], None
+    for name, value in properties:
+        if name == "BEGIN" and value in ("STANDARD", "DAYLIGHT"):
+            current = {}
+        elif name == "END" and value in ("STANDARD", "DAYLIGHT"):
+            start, before = current["DTSTART"], parse_offset(current["TZOFFSETFROM"])
+            after = parse_offset(current["TZOFFSETTO"])
+            found.append((start - before, after))
+            if "RRULE" in current:
+                rule = dict(part.split("=") for part in current["RRULE"].split(";"))
+                until = datetime.strptime(rule["UNTIL"], "%Y%m%dT%H%M%SZ") if "UNTIL" in rule else None
+                nth, weekday = int(rule["BYDAY"][:-2] or 1), ical._WEEKDAYS.index(rule["BYDAY"][-2:])
+                monthdays = [int(d) for d in rule["BYMONTHDAY"].split(",")] if "BYMONTHDAY" in rule else None
+                for year in range(start.year + 1, until_year + 1):
+                    days = [d for d in range(1, calendar.monthrange(year, start.month)[1] + 1)
+                            if calendar.weekday(year, start.month, d) == weekday
+                            and (monthdays is None or d in monthdays)]
+                    local = datetime.combine(datetime(year, start.month, days[nth - 1 if nth > 0 else nth]),
+                                             start.time())
+                    if until is not None and local - before > until:
+                        break
+                    found.append((local - before, after))
+            current = None
+        elif current is not None:
+            current[name] = value
+    return sorted(found)
+
+
+@pytest.mark.parametrize("tzid", ZONES)
+def test_vtimezone_matches_zoneinfo(tzid):
+    properties = ical.vtimezone(tzid, 2005, 2026)
+    table = onsets(properties, 2040)
+    zone, rng = ZoneInfo(tzid), random.Random(tzid)
+    for _ in range(2000):
+        # Later than last_year too: the open-ended rules have to carry on
+        moment = datetime(2005, 1, 2) + timedelta(seconds=rng.randrange(35 * 365 * 86400))
+        offset = [after for onset, after in table if onset <= moment][-1]
+        assert offset == moment.replace(tzinfo=timezone.utc).astimezone(zone).utcoffset(), moment
+
+
+def test_feed_defines_each_tzid(app, employee):
+    with app.app_context():
+        user = pms.User.query.filter_by(email="emp0@test").one()
+        if not user.calendar_token:
+            user.calendar_token = "feed-token"
+            pms.db.session.commit()
+        token = user.calendar_token
+    body = employee.get(f"/calendar/{token}/me.ics").get_data(as_text=True)
+    lines = list(ical.unfold(body.splitlines()))
+    used = {params["TZID"] for params in (ical.parse_content_line(line)[1] for line in lines) if "TZID" in params}
+    defined = {line.split(":", 1)[1] for line in lines if line.startswith("TZID:")}
+    assert used and used <= defined
+    assert body.index("BEGIN:VTIMEZONE") < body.index("BEGIN:VEVENT")
@@ -0,0 +1,43 @@
+"""Bulk assignment reports what its own INSERT did"""
+from datetime import datetime
+
+import pytest
+from sqlalchemy import event
+
+import app as pms
+
+
+@pytest.fixture
+def concurrent_assignment(app):
+    """Commit an assignment of (user, project) just before the bulk INSERT runs, as another request might"""
+    injected = {}
+
+    def before_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("INSERT INTO project_assignment") and injected.get("pair") and not injected.get("done"):
+            injected["done"] = True
+            cursor.connection.execute(
+                "INSERT INTO project_assignment (project_id, user_id, assigned_at) VALUES (?, ?, ?)",
+                (*injected["pair"], datetime.utcnow()))
+
+    with app.app_context():
+        engine = pms.db.engine
+    event.listen(engine, "before_cursor_execute", before_execute)
+    yield injected
+    event.remove(engine, "before_cursor_execute", before_execute)
+
+
+def test_assignment_won_by_a_concurrent_request_is_reported_as_existing(app, employee, concurrent_assignment):
+    with app.app_context():
+        user = pms.User.query.filter_by(email="client0@test").one()
+        assigned = {a.project_id for a in pms.ProjectAssignment.query.filter_by(user_id=user.id)}
+        free = [pid for pid in range(1, 81) if pid not in assigned][:3]
+        user_id = user.id
+    concurrent_assignment["pair"] = (free[1], user_id)
+    response = employee.post("/api/projects/bulk/assign", json={"ids": free, "user_id": user_id})
+    assert response.status_code == 200
+    results = {r["id"]: r["result"] for r in response.get_json()["results"]}
+    assert results == {free[0]: "assigned", free[1]: "exists", free[2]: "assigned"}
+    with app.app_context():
+        rows = pms.ProjectAssignment.query.filter(pms.ProjectAssignment.user_id == user_id,
+                                                  pms.ProjectAssignment.project_id.in_(free)).count()
+        assert rows == 3
@@ -0,0 +1,83 @@
+"""Each budgeted view stays within its query_profile budget on a realistically sized database"""
+import logging
+
+import pytest
+
+import app as pms
+
+EMPLOYEE_VIEWS = [
+    "/dashboard",
+    "/clients",
+    "/clients/1",
+    "/clients/1/events",
+    "/buildings",
+    "/api/buildings/near?building=1",
+    "/projects",
+    "/projects/1",
+    "/events",
+    "/admin/users",
+    "/notifications",
+    "/timecard",
+    "/reports",
+    "/api/reports/data",
+    "/api/reports/timeseries?metric=hours&bucket=week&group_by=client",
+]
+CLIENT_VIEWS = [
+    "/dashboard",
+    "/projects",
+    "/events",
+]
+
+
+def assert_within_budget(response, caplog):
+    assert int(response.headers["X-Query-Count"]) <= int(response.headers["X-Query-Budget"])
+    overspent = [r.getMessage() for r in caplog.records if r.levelno >= logging.WARNING]
+    assert not overspent
+
+
+@pytest.mark.parametrize("path", EMPLOYEE_VIEWS)
+def test_employee_views(employee, caplog, path):
+    response = employee.get(path)
+    assert response.status_code == 200
+    assert_within_budget(response, caplog)
+
+
+@pytest.mark.parametrize("path", CLIENT_VIEWS)
+def test_client_views(client_user, caplog, path):
+    response = client_user.get(path)
+    assert response.status_code == 200
+    assert_within_budget(response, caplog)
+
+
+def test_sparse_client_detail(app, employee, caplog):
+    """Few events in the recent window: the page also checks for older ones"""
+    with app.app_context():
+        client_id = pms.Client.query.filter_by(name="Quiet Client").one().id
+    response = employee.get(f"/clients/{client_id}")
+    assert response.status_code == 200
+    assert b"Show older" in response.data
+    assert_within_budget(response, caplog)
+    response = employee.get(f"/clients/{client_id}/events")
+    assert response.status_code == 200
+    assert_within_budget(response, caplog)
+
+
+def test_client_project_detail(app, client_user, caplog):
+    with app.app_context():
+        user = pms.User.query.filter_by(email="client5@test").one()
+        project_id = pms.ProjectAssignment.query.filter_by(user_id=user.id).first().project_id
+    response = client_user.get(f"/projects/{project_id}")
+    assert response.status_code == 200
+    assert_within_budget(response, caplog)
+
+
+def test_timecard_post_without_scope_versions(app, employee, caplog):
+    """The first write after an upgrade has no scope_version rows to update yet"""
+    with app.app_context():
+        pms.db.session.execute(pms.db.delete(pms.ScopeVersion))
+        pms.db.session.commit()
+    response = employee.post("/timecard", data={"project_id": 1, "hours": "2", "description": "Framing"})
+    assert response.status_code == 302
+    assert_within_budget(response, caplog)
+    response = employee.post("/timecard", data={"project_id": 2, "hours": "1", "description": "Inspection"})
+    assert_within_budget(response, caplog)
@@ -0,0 +1,23 @@
+"""The reports timeline: grouping and the folded "Other" series"""
+from datetime import datetime
+
+import app as pms
+
+
+def test_other_series_is_distinct_from_no_client(app, employee):
+    with app.app_context():
+        user = pms.User.query.filter_by(email="emp0@test").one()
+        project = pms.Project(name="Walk-in repair", status="Active")
+        pms.db.session.add(project)
+        pms.db.session.flush()
+        entries = [pms.TimeEntry(user_id=user.id, project_id=project.id, hours=80, timestamp=datetime(2019, 3, 4, 9)),
+                   pms.TimeEntry(user_id=user.id, project_id=1, hours=40, timestamp=datetime(2019, 3, 4, 9)),
+                   pms.TimeEntry(user_id=user.id, project_id=2, hours=2, timestamp=datetime(2019, 3, 5, 9)),
+                   pms.TimeEntry(user_id=user.id, project_id=3, hours=1, timestamp=datetime(2019, 3, 6, 9))]
+        pms.db.session.add_all(entries)
+        pms.db.session.commit()
+    response = employee.get("/api/reports/timeseries?metric=hours&bucket=month&group_by=client"
+                            "&from=2019-03-01&to=2019-03-31&limit=2")
+    series = response.get_json()["series"]
+    assert [(s["id"], s["label"], s["other"], s["values"]) for s in series] == [
+        (None, "No client", False, [80]), (1, "Client 0", False, [40]), ("other", "Other", True, [3])]
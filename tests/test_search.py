@@ -0,0 +1,28 @@
+"""Search ranks every match by relevance, however many there are"""
+import sqlalchemy as sa
+
+from search import SQLiteSearchIndex
+
+
+def test_broad_queries_rank_older_documents_too():
+    engine = sa.create_engine("sqlite://")
+    index = SQLiteSearchIndex()
+    with engine.begin() as connection:
+        index.create(connection)
+        # The best match is the oldest document, behind thousands of weaker, newer ones
+        index.insert(connection, [("project", 1, "Pump room retrofit", "")])
+        index.insert(connection, [("event", i, f"Visit {i}", "check the pump") for i in range(2, 3002)])
+        hits = index.search(connection, "pump", {"project": None, "event": None}, limit=5)
+    assert len(hits) == 5
+    assert hits[0][:2] == ("project", 1)
+    assert [score for _, _, score in hits] == sorted((score for _, _, score in hits), reverse=True)
+
+
+def test_search_respects_allowed_ids():
+    engine = sa.create_engine("sqlite://")
+    index = SQLiteSearchIndex()
+    with engine.begin() as connection:
+        index.create(connection)
+        index.insert(connection, [("project", i, f"Pump {i}", "") for i in range(1, 6)])
+        hits = index.search(connection, "pump", {"project": [2, 4]}, limit=10)
+    assert sorted(entity_id for _, entity_id, _ in hits) == [2, 4]